@@ -0,0 +1,78 @@
+import json
+
+from Clock import Clock
+from Status import PackageStatus
+
+
+# the batch query answers many package status queries in a single run, without the interactive menu. Queries are read
+# one per line as JSON objects such as {"package_id": 9, "time": "10:25 AM"}, and one JSON object is written per query
+# in the same order (the JSON Lines format). The day is simulated once, before any query is read, and each query is
+# then a lookup in the delivery timeline
+class BatchQuery:
+
+    # number of results gathered before they are written to the output together
+    writeBatchSize = 1000
+
+    # reads queries from the input stream and writes one result per query to the output stream. Blank lines are
+    # skipped, and a query that cannot be answered produces a result with an "error" field rather than stopping the run
+    #
+    # time complexity = O(q log n), space complexity = O(1) beyond the buffered results, where q is the number of
+    # queries
+    @staticmethod
+    def runBatch(inputStream, outputStream, pkgTable, timeline):
+        timeCache = dict()
+        pendingResults = []
+        for line in inputStream:
+            if not line.strip():
+                continue
+            pendingResults.append(json.dumps(BatchQuery.answerQuery(line, pkgTable, timeline, timeCache)) + "\n")
+            if len(pendingResults) >= BatchQuery.writeBatchSize:
+                outputStream.writelines(pendingResults)
+                pendingResults.clear()
+        outputStream.writelines(pendingResults)
+        outputStream.flush()
+
+    # answers a single query line, returning the result as a dictionary. Parsed times are kept in the time cache, since
+    # many queries tend to ask about the same few times
+    #
+    # time complexity = O(log n), space complexity = O(1)
+    @staticmethod
+    def answerQuery(line, pkgTable, timeline, timeCache):
+        try:
+            query = json.loads(line)
+            pkgID = query["package_id"]
+            requestedTime = query["time"]
+        except (ValueError, TypeError, KeyError):
+            return {"error": "Query must be a JSON object with 'package_id' and 'time' fields"}
+
+        result = {"package_id": pkgID, "time": requestedTime}
+        requestedMinutes = BatchQuery.parseTime(requestedTime, timeCache)
+        if requestedMinutes is None:
+            result["error"] = "Time must be minutes since midnight or a string in format 'H:MM <AM/PM>'"
+            return result
+        if not isinstance(pkgID, int) or isinstance(pkgID, bool) or pkgID not in pkgTable:
+            result["error"] = "Unknown package ID"
+            return result
+
+        pkg = pkgTable.lookup(pkgID)
+        status, truckID, statusTime = timeline.getPackageStatus(pkgID, requestedMinutes)
+        result["status"] = status.name.lower()
+        result["truck"] = truckID
+        result["status_since"] = Clock.convertIntToTime(statusTime) if status != PackageStatus.AT_HUB else None
+        result["delivery_deadline"] = Clock.convertIntToTime(pkg.deliveryDeadline)
+        return result
+
+    # converts a query's time into minutes since midnight, or returns None if it is not a valid time. Times may be given
+    # as an integer number of minutes, or as a string in the same format the interactive menu accepts
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def parseTime(requestedTime, timeCache):
+        if isinstance(requestedTime, int) and not isinstance(requestedTime, bool):
+            return requestedTime if 0 <= requestedTime < 1440 else None
+        if not isinstance(requestedTime, str):
+            return None
+        if requestedTime not in timeCache:
+            timeStr = requestedTime.strip()
+            timeCache[requestedTime] = Clock.convertTimeToInt(timeStr) if Clock.getValidInput(timeStr) else None
+        return timeCache[requestedTime]
@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from Clock import Clock
+from Hub import Hub
+from DeliveryDay import DeliveryDay
+from Dispatcher import Dispatcher
+from LocationsInit import LocationsInit
+from PackageInit import PackageInit
+from DistanceMatrix import DistanceMatrix
+from ScenarioGenerator import ScenarioGenerator
+
+
+# the benchmark runner times each stage of the delivery day on synthetic scenarios of increasing size, so it can be seen
+# how the program scales. The results are saved as JSON, and a later run can be compared against a saved baseline to
+# spot stages that have become slower. Timings are only comparable between runs on the same machine
+#
+# the stages timed are reading the addresses and distances (LocationsInit - both the first load, which parses the csv
+# file, and a later load from the cached sidecar), reading the packages (PackageInit), loading every truck
+# (DeliveryDay.loadTruck), determining every route (RouteBuilder, as part of loading), simulating the whole day, and
+# answering status queries (Dispatcher)
+#
+# besides the timings, each scenario reports the trucks used, the total miles, the number of late packages and the
+# time the last truck returns. The generated deadlines are not planned to be met, so some packages are expected to be
+# late - at seed 0, 3, 39 and 395 packages at 100, 1,000 and 10,000 packages. A change in these counts shows a change
+# in the plans rather than the timings
+class Benchmark:
+
+    # the default numbers of packages to benchmark
+    defaultSizes = (100, 1000, 10000, 100000)
+
+    # number of random package and truck status queries answered at each size
+    numQueries = 10000
+
+    # a stage counts as slower than its baseline if it takes more than this many times as long, and at least this many
+    # seconds longer - so the noise in very fast stages is not reported
+    regressionRatio = 1.5
+    regressionFloor = 0.02
+
+    # runs the benchmark at each size and returns the results. Each size is run the given number of times, and the
+    # fastest time of each stage is kept, which steadies the timings against other work on the machine. Scenarios are
+    # written to a temporary directory, unless a directory is given to keep them in
+    #
+    # time and space complexity = that of the largest scenario's delivery day
+    @staticmethod
+    def runBenchmarks(sizes, seed=0, scenarioDir=None, repeats=1, routeBuildWorkers=1):
+        results = {"environment": Benchmark.getEnvironment(), "seed": seed, "repeats": repeats,
+                   "routeBuildWorkers": routeBuildWorkers, "sizes": {}}
+        with tempfile.TemporaryDirectory() as temporaryDir:
+            for numPkgs in sizes:
+                sizeDir = os.path.join(scenarioDir or temporaryDir, "scenario-" + str(numPkgs))
+                sizeResults = Benchmark.runScenario(sizeDir, numPkgs, seed, routeBuildWorkers)
+                for _ in range(repeats - 1):
+                    repeatStages = Benchmark.runScenario(sizeDir, numPkgs, seed, routeBuildWorkers)["stages"]
+                    for stage, seconds in repeatStages.items():
+                        sizeResults["stages"][stage] = min(sizeResults["stages"][stage], seconds)
+                results["sizes"][str(numPkgs)] = sizeResults
+        return results
+
+    # generates one scenario and times each stage of its delivery day, with the routes built by the given number of
+    # worker processes
+    #
+    # time and space complexity = that of the scenario's delivery day
+    @staticmethod
+    def runScenario(sizeDir, numPkgs, seed, routeBuildWorkers=1):
+        stages = dict()
+        startTime = time.perf_counter()
+        settings = ScenarioGenerator.generate(sizeDir, numPkgs, seed)
+        stages["scenarioGeneration"] = time.perf_counter() - startTime
+
+        distancePath = os.path.join(sizeDir, ScenarioGenerator.distanceFileName)
+        addressPath = os.path.join(sizeDir, ScenarioGenerator.addressFileName)
+        packagePath = os.path.join(sizeDir, ScenarioGenerator.packageFileName)
+
+        # the first distance load parses the csv file and writes the sidecar, and the second maps the sidecar
+        sidecarPath = distancePath + DistanceMatrix.sidecarSuffix
+        if os.path.exists(sidecarPath):
+            os.remove(sidecarPath)
+        startTime = time.perf_counter()
+        locationIDMap = LocationsInit.getLocationIDMap(addressPath)
+        LocationsInit.initMasterAdjacencyMatrix(distancePath)
+        stages["locationsInit"] = time.perf_counter() - startTime
+        startTime = time.perf_counter()
+        LocationsInit.initMasterAdjacencyMatrix(distancePath)
+        stages["locationsInitCached"] = time.perf_counter() - startTime
+
+        startTime = time.perf_counter()
+        PackageInit.getPkgTable(locationIDMap, numPkgs, packagePath)
+        stages["packageInit"] = time.perf_counter() - startTime
+
+        # the day is simulated from a fresh Hub, with the time spent loading trucks added up as they depart. The csv
+        # files are read before the day starts, so the day's time does not include the stages already timed above
+        numTotalPackages = settings.pop("numTotalPackages")
+        day = DeliveryDay(Hub(distancePath, addressPath, routeBuildWorkers=routeBuildWorkers, **settings), packagePath,
+                          numTotalPackages, ScenarioGenerator.loadAddressCorrections(sizeDir))
+        day.hub.masterDistanceList
+        day.masterPkgTable
+        loadTruckTime = [0.0]
+        loadTruck = day.loadTruck
+
+        def timedLoadTruck(truck, pkgList):
+            loadStart = time.perf_counter()
+            loadTruck(truck, pkgList)
+            loadTruckTime[0] += time.perf_counter() - loadStart
+
+        day.loadTruck = timedLoadTruck
+        startTime = time.perf_counter()
+        day.startDeliveryDay()
+        stages["deliveryDay"] = time.perf_counter() - startTime
+        stages["loadTruck"] = loadTruckTime[0]
+        stages["routeBuilder"] = sum(truck.routeSolveTime for truck in day.trucks)
+
+        # status queries at random times of the day, for random packages and trucks
+        rng = random.Random(seed)
+        pkgIDs = day.masterPkgTable.getKeys()
+        queries = [(rng.choice(pkgIDs), rng.choice(day.timeline.truckIDs), rng.randrange(480, 1080))
+                   for _ in range(Benchmark.numQueries)]
+        startTime = time.perf_counter()
+        for pkgID, truckID, requestedTime in queries:
+            Dispatcher.getPackageStatusText(day.timeline, pkgID, requestedTime)
+            Dispatcher.getTruckStatusText(day.timeline, truckID, requestedTime)
+        stages["dispatcherQueries"] = time.perf_counter() - startTime
+
+        # a package held at the Hub for a wrong address that was never corrected is never delivered, and counts as late
+        latePackages = sum(1 for pkg in day.getAllPackages()
+                           if pkg.timeDelivered is None or pkg.timeDelivered > pkg.deliveryDeadline)
+        return {"packages": numTotalPackages,
+                "locations": len(locationIDMap),
+                "trucks": len(day.trucks),
+                "totalMiles": round(sum(truck.cumulativeMiles for truck in day.trucks), 1),
+                "latePackages": latePackages,
+                "lastReturn": Clock.convertIntToTime(max(truck.timeOfReturn for truck in day.trucks)),
+                "stages": {stage: round(seconds, 6) for stage, seconds in stages.items()}}
+
+    # returns a description of the machine and library versions the benchmark ran with
+    @staticmethod
+    def getEnvironment():
+        return {"python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "processor": platform.processor() or platform.machine()}
+
+    # compares results against a baseline, and returns a list of (size, stage, baseline seconds, seconds) for each stage
+    # that has become slower. Sizes and stages missing from either run are skipped
+    #
+    # time and space complexity = O(s), where s is the number of sizes and stages compared
+    @staticmethod
+    def findRegressions(results, baseline):
+        regressions = []
+        for size, sizeResults in results["sizes"].items():
+            baselineStages = baseline["sizes"].get(size, {}).get("stages", {})
+            for stage, seconds in sizeResults["stages"].items():
+                baselineSeconds = baselineStages.get(stage)
+                if baselineSeconds is None:
+                    continue
+                if seconds > baselineSeconds * Benchmark.regressionRatio and \
+                        seconds - baselineSeconds > Benchmark.regressionFloor:
+                    regressions.append((size, stage, baselineSeconds, seconds))
+        return regressions
+
+    # prints a table of the stage timings, one column per size
+    @staticmethod
+    def printResults(results):
+        sizes = list(results["sizes"])
+        stages = list(results["sizes"][sizes[0]]["stages"]) if sizes else []
+        print("stage".ljust(22) + "".join(("n=" + size).rjust(14) for size in sizes))
+        for stage in stages:
+            print(stage.ljust(22) + "".join(format(results["sizes"][size]["stages"][stage], ".4f").rjust(14)
+                                            for size in sizes))
+        for field in ("trucks", "totalMiles", "latePackages", "lastReturn"):
+            print(field.ljust(22) + "".join(str(results["sizes"][size][field]).rjust(14) for size in sizes))
+
+    # reads the command line options, runs the benchmark, and saves and compares the results. Exits with status 1 if
+    # any stage is slower than the baseline
+    @staticmethod
+    def main(args):
+        parser = argparse.ArgumentParser(description="Benchmark the WGUPS delivery day on synthetic scenarios")
+        parser.add_argument("--sizes", type=int, nargs="+", default=list(Benchmark.defaultSizes),
+                            help="numbers of packages to benchmark (default: 100 1000 10000 100000)")
+        parser.add_argument("--seed", type=int, default=0, help="random seed for the scenarios (default: 0)")
+        parser.add_argument("--repeat", type=int, default=1,
+                            help="run each size this many times and keep the fastest time of each stage (default: 1)")
+        parser.add_argument("--route-workers", type=int, default=1,
+                            help="worker processes that build the routes in parallel - 0 uses one per CPU (default: 1)")
+        parser.add_argument("--output", metavar="FILE", help="save the results as JSON to FILE")
+        parser.add_argument("--baseline", metavar="FILE", help="compare the results with a saved JSON baseline")
+        parser.add_argument("--scenario-dir", metavar="DIR",
+                            help="keep the generated scenarios in DIR instead of a temporary directory")
+        options = parser.parse_args(args)
+
+        results = Benchmark.runBenchmarks(options.sizes, options.seed, options.scenario_dir, options.repeat,
+                                           options.route_workers)
+        Benchmark.printResults(results)
+        if options.output:
+            with open(options.output, 'w') as write_obj:
+                json.dump(results, write_obj, indent=2)
+
+        if options.baseline:
+            with open(options.baseline, 'r') as read_obj:
+                regressions = Benchmark.findRegressions(results, json.load(read_obj))
+            for size, stage, baselineSeconds, seconds in regressions:
+                print("REGRESSION n=" + size + " " + stage + ": " + format(baselineSeconds, ".4f") + "s -> " +
+                      format(seconds, ".4f") + "s")
+            if regressions:
+                sys.exit(1)
+            print("No stage is slower than the baseline")
+
+
+if __name__ == "__main__":
+    Benchmark.main(sys.argv[1:])
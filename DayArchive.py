@@ -0,0 +1,329 @@
+import datetime
+import sqlite3
+from collections.abc import Mapping
+from types import MappingProxyType, SimpleNamespace
+
+from DeliveryTimeline import DeliveryTimeline
+from PackageStore import PackageStore
+from Status import PackageStatus, TruckStatus
+from StatusServer import StatusSnapshot
+from WGUPSPackage import WGUPSPackage
+
+
+# the day archive keeps finished delivery days in a local SQLite file, so a day's statuses can be looked up again after
+# the program restarts - or on any later day - without the csv files being read or the day being simulated again. Each
+# day is stored under a label, by default the date it was saved, with:
+#
+#   packages    -   every package's details, the truck it was loaded onto, and the times it was loaded and delivered
+#   trucks      -   every truck's departure and return times, total miles, and the solver its route was built with
+#   stops       -   every stop each truck made, in order - its arrival time, location, the miles of the leg driven
+#                   to it, and the truck's miles so far
+#
+# packages are indexed by package ID, by truck, and by delivery time, and stops by truck and by arrival time. Opening a
+# stored day only reads its trucks - a package or a truck's stops are read from the file the first time a query asks for
+# them, through the indexes, so a day of any size opens in milliseconds
+class DayArchive:
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS days (
+            dayID INTEGER PRIMARY KEY, label TEXT NOT NULL UNIQUE, savedAt TEXT NOT NULL,
+            numPackages INTEGER NOT NULL, numTrucks INTEGER NOT NULL, totalMiles REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS packages (
+            dayID INTEGER NOT NULL, pkgID INTEGER NOT NULL, name TEXT NOT NULL, address TEXT NOT NULL,
+            city TEXT NOT NULL, state TEXT NOT NULL, zip TEXT NOT NULL, locationID INTEGER NOT NULL,
+            deadline INTEGER NOT NULL, mass REAL NOT NULL, notes TEXT NOT NULL, truckID INTEGER, timeLoaded INTEGER,
+            timeDelivered INTEGER, PRIMARY KEY (dayID, pkgID)) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS packagesByTruck ON packages (dayID, truckID, timeLoaded);
+        CREATE INDEX IF NOT EXISTS packagesByDeliveryTime ON packages (dayID, timeDelivered);
+        CREATE TABLE IF NOT EXISTS trucks (
+            dayID INTEGER NOT NULL, truckID INTEGER NOT NULL, timeDeparted INTEGER, timeReturned INTEGER,
+            totalMiles REAL NOT NULL, routeSolver TEXT, PRIMARY KEY (dayID, truckID)) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS stops (
+            dayID INTEGER NOT NULL, truckID INTEGER NOT NULL, stopIndex INTEGER NOT NULL, arrivalTime INTEGER NOT NULL,
+            locationID INTEGER NOT NULL, legMiles REAL NOT NULL, miles REAL NOT NULL,
+            PRIMARY KEY (dayID, truckID, stopIndex)) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS stopsByArrivalTime ON stops (dayID, arrivalTime);
+    """
+
+    # the package columns read back into a package, in order
+    packageColumns = ("pkgID, name, address, city, state, zip, locationID, deadline, mass, notes, truckID, "
+                      "timeLoaded, timeDelivered")
+
+    # the archive is opened from the SQLite file at the given path, which is created if it does not exist
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(DayArchive.schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exceptionInfo):
+        self.close()
+
+    # closes the file. Days opened from the archive cannot be queried once it is closed
+    def close(self):
+        self.connection.close()
+
+    # stores a finished delivery day under the given label, or under today's date if none is given, replacing any day
+    # already stored under that label. The day is written in a single transaction, so a reader never sees it half
+    # written. A ValueError is raised if the day has not been closed. Returns the label
+    #
+    # time complexity = O(n log n), for the indexes, space complexity = O(n)
+    def saveDay(self, day, label=None):
+        if day.timeline is None or day.simulator is not None:
+            raise ValueError("Only a delivery day that has been closed can be saved")
+        if label is None:
+            label = datetime.date.today().isoformat()
+        packages = day.getAllPackages()
+        totalMiles = sum(truck.cumulativeMiles for truck in day.trucks)
+
+        with self.connection:
+            self.removeDay(label)
+            dayID = self.connection.execute(
+                "INSERT INTO days (label, savedAt, numPackages, numTrucks, totalMiles) VALUES (?, ?, ?, ?, ?)",
+                (label, datetime.datetime.now().isoformat(timespec="seconds"), len(packages), len(day.trucks),
+                 totalMiles)).lastrowid
+            self.connection.executemany(
+                "INSERT INTO packages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((dayID, pkg.pkgID, pkg.nameOnAddress, pkg.address, pkg.city, pkg.state, pkg.zip,
+                  pkg.deliveryLocationID, pkg.deliveryDeadline, pkg.mass, pkg.notes, pkg.truckLoadedOnto,
+                  pkg.timeLoaded, pkg.timeDelivered) for pkg in packages))
+            self.connection.executemany(
+                "INSERT INTO trucks VALUES (?, ?, ?, ?, ?, ?)",
+                ((dayID, truck.truckID, truck.routeStartTime if truck.hasDeparted else None, truck.timeOfReturn,
+                  truck.cumulativeMiles, truck.routeSolver) for truck in day.trucks))
+            self.connection.executemany(
+                "INSERT INTO stops VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((dayID, truck.truckID, stopIndex, truck.stopTimes[stopIndex], truck.stopLocations[stopIndex],
+                  truck.stopMiles[stopIndex] - (truck.stopMiles[stopIndex - 1] if stopIndex > 0 else 0.0),
+                  truck.stopMiles[stopIndex])
+                 for truck in day.trucks for stopIndex in range(len(truck.stopTimes))))
+        return label
+
+    # removes the day stored under the given label, if there is one. Returns True if a day was removed
+    #
+    # time complexity = O(n log n), space complexity = O(1)
+    def deleteDay(self, label):
+        with self.connection:
+            return self.removeDay(label)
+
+    # removes the day stored under the given label within the transaction already begun, and returns True if there was
+    # one
+    #
+    # time complexity = O(n log n), space complexity = O(1)
+    def removeDay(self, label):
+        row = self.connection.execute("SELECT dayID FROM days WHERE label = ?", (label,)).fetchone()
+        if row is None:
+            return False
+        for table in ("stops", "trucks", "packages", "days"):
+            self.connection.execute("DELETE FROM " + table + " WHERE dayID = ?", row)
+        return True
+
+    # returns the days stored in the archive, in the order they were saved, as a list of dictionaries holding each day's
+    # label, the time it was saved, its number of packages and trucks, and its total miles
+    #
+    # time and space complexity = O(d), where d is the number of days stored
+    def listDays(self):
+        rows = self.connection.execute("SELECT label, savedAt, numPackages, numTrucks, totalMiles FROM days "
+                                       "ORDER BY dayID").fetchall()
+        return [{"label": label, "savedAt": savedAt, "packages": numPackages, "trucks": numTrucks,
+                 "totalMiles": round(totalMiles, 2)} for label, savedAt, numPackages, numTrucks, totalMiles in rows]
+
+    # opens the day stored under the given label, or the day saved most recently if no label is given. A ValueError is
+    # raised if there is no such day
+    #
+    # time complexity = O(t log t), space complexity = O(t)
+    def openDay(self, label=None):
+        if label is None:
+            row = self.connection.execute("SELECT dayID, label, numPackages FROM days "
+                                          "ORDER BY dayID DESC LIMIT 1").fetchone()
+        else:
+            row = self.connection.execute("SELECT dayID, label, numPackages FROM days WHERE label = ?",
+                                          (label,)).fetchone()
+        if row is None:
+            raise ValueError("No day " + ("has been saved" if label is None else "is saved as '" + label + "'") +
+                             " in " + self.path)
+        return ArchivedDay(self.connection, *row)
+
+
+# a day opened from the archive. It answers the same queries as a simulated day - it stands in for the day, for its
+# package hash table, and its timeline is an ArchivedTimeline - so the menu, batch queries and the status server can all
+# be run from it. Packages it returns are copies read from the file, and changing them changes nothing that is stored
+class ArchivedDay:
+
+    def __init__(self, connection, dayID, label, numPackages):
+        self.connection = connection
+        self.dayID = dayID
+        self.label = label
+        self.numTotalPackages = numPackages
+        self.masterPkgTable = self
+        self.timeline = ArchivedTimeline(connection, dayID)
+
+    def __contains__(self, pkgID):
+        return self.connection.execute("SELECT 1 FROM packages WHERE dayID = ? AND pkgID = ?",
+                                       (self.dayID, pkgID)).fetchone() is not None
+
+    def __len__(self):
+        return self.numTotalPackages
+
+    # returns the package with the given ID, or None if the day has no such package
+    #
+    # time complexity = O(log n), space complexity = O(1)
+    def lookup(self, pkgID):
+        row = self.connection.execute("SELECT " + DayArchive.packageColumns + " FROM packages WHERE dayID = ? AND "
+                                      "pkgID = ?", (self.dayID, pkgID)).fetchone()
+        return None if row is None else ArchivedDay.makePackage(row, PackageStore())
+
+    # returns every package ID of the day, in order
+    #
+    # time and space complexity = O(n)
+    def getKeys(self):
+        return [row[0] for row in self.connection.execute("SELECT pkgID FROM packages WHERE dayID = ? ORDER BY pkgID",
+                                                          (self.dayID,))]
+
+    # returns every package of the day, in order of package ID
+    #
+    # time and space complexity = O(n)
+    def getValues(self):
+        return self.selectPackages("ORDER BY pkgID", ())
+
+    def getAllPackages(self):
+        return self.getValues()
+
+    # returns the packages loaded onto the given truck, in the order they were loaded
+    #
+    # time complexity = O(log n + p), space complexity = O(p), where p is the number of packages found
+    def lookupByTruck(self, truckID):
+        return self.selectPackages("AND truckID = ? ORDER BY timeLoaded, pkgID", (truckID,))
+
+    # returns the packages delivered at or after the start time and before the end time, in minutes since midnight, in
+    # order of delivery
+    #
+    # time complexity = O(log n + p), space complexity = O(p)
+    def lookupDeliveredBetween(self, startTime, endTime):
+        return self.selectPackages("AND timeDelivered >= ? AND timeDelivered < ? ORDER BY timeDelivered, pkgID",
+                                   (startTime, endTime))
+
+    # returns the packages of the day matching the given condition, which follows the day in the WHERE clause
+    #
+    # time and space complexity = O(p)
+    def selectPackages(self, condition, parameters):
+        store = PackageStore()
+        return [ArchivedDay.makePackage(row, store) for row in self.connection.execute(
+            "SELECT " + DayArchive.packageColumns + " FROM packages WHERE dayID = ? " + condition,
+            (self.dayID,) + parameters)]
+
+    # returns a status server snapshot of the day. Package details are read from the file as queries ask for them, so
+    # taking the snapshot does not read every package
+    #
+    # time and space complexity = O(1)
+    def getStatusSnapshot(self):
+        return StatusSnapshot(self.timeline, ArchivedRows(
+            self.connection, self.dayID,
+            "SELECT address, city, zip, deadline FROM packages WHERE dayID = ? AND pkgID = ?",
+            "SELECT pkgID FROM packages WHERE dayID = ? ORDER BY pkgID", ArchivedRows.getSingleRow))
+
+    # returns a package added to the given store from a row of the packages table
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def makePackage(row, store):
+        pkgID, name, address, city, state, zc, locationID, deadline, mass, notes, truckID, timeLoaded, \
+            timeDelivered = row
+        pkg = WGUPSPackage(name, pkgID, address, locationID, city, state, zc, deadline, mass, notes, store)
+        pkg.truckLoadedOnto = truckID
+        pkg.timeLoaded = timeLoaded
+        pkg.timeDelivered = timeDelivered
+        if timeDelivered is not None:
+            pkg.status = PackageStatus.DELIVERED
+        elif truckID is not None:
+            pkg.status = PackageStatus.EN_ROUTE
+        return pkg
+
+
+# the timeline of a day opened from the archive. It holds the same mappings as the timeline of a simulated day, so it
+# answers status queries with the same code - but only the truck events are read when it is opened, and each package's
+# events and each truck's stops are read from the file when they are looked up
+class ArchivedTimeline(DeliveryTimeline):
+
+    # time complexity = O(t log t), space complexity = O(t)
+    def __init__(self, connection, dayID):
+        truckRows = connection.execute("SELECT truckID, timeDeparted, timeReturned FROM trucks WHERE dayID = ? "
+                                       "ORDER BY truckID", (dayID,)).fetchall()
+        self.truckEvents = MappingProxyType({truckID: ArchivedTimeline.getStoredTruckEvents(timeDeparted, timeReturned)
+                                             for truckID, timeDeparted, timeReturned in truckRows})
+        self.truckIDs = tuple(self.truckEvents)
+        self.packageEvents = ArchivedRows(
+            connection, dayID, "SELECT truckID, timeLoaded, timeDelivered FROM packages WHERE dayID = ? AND pkgID = ?",
+            "SELECT pkgID FROM packages WHERE dayID = ? ORDER BY pkgID", ArchivedTimeline.getStoredPackageEvents)
+        self.truckStops = ArchivedRows(
+            connection, dayID, "SELECT arrivalTime, miles, locationID FROM stops WHERE dayID = ? AND truckID = ? "
+                               "ORDER BY stopIndex",
+            "SELECT truckID FROM trucks WHERE dayID = ? ORDER BY truckID", ArchivedTimeline.getStoredTruckStops)
+
+    # returns the (times, states) of a truck's events from its stored departure and return times
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def getStoredTruckEvents(timeDeparted, timeReturned):
+        times = [0]
+        states = [TruckStatus.NOT_STARTED]
+        if timeDeparted is not None:
+            times.append(timeDeparted)
+            states.append(TruckStatus.ON_ROUTE)
+        if timeReturned is not None:
+            times.append(timeReturned)
+            states.append(TruckStatus.RETURNED)
+        return tuple(times), tuple(states)
+
+    # returns the (times, states) of a package's events from its stored row, as for a simulated package. A KeyError is
+    # raised if the package is not stored
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def getStoredPackageEvents(pkgID, rows):
+        truckID, timeLoaded, timeDelivered = ArchivedRows.getSingleRow(pkgID, rows)
+        return DeliveryTimeline.getPackageEvents(SimpleNamespace(truckLoadedOnto=truckID, timeLoaded=timeLoaded,
+                                                                 timeDelivered=timeDelivered))
+
+    # returns the prefix arrays of arrival times, cumulative miles, and location IDs from a truck's stored stops
+    #
+    # time and space complexity = O(s)
+    @staticmethod
+    def getStoredTruckStops(truckID, rows):
+        return tuple(row[0] for row in rows), tuple(row[1] for row in rows), tuple(row[2] for row in rows)
+
+
+# a read-only mapping whose values are read from the archive as they are looked up. Each value is made by the convert
+# function from the key and the rows the row query returns for it, and the keys are those the key query returns
+class ArchivedRows(Mapping):
+
+    def __init__(self, connection, dayID, rowQuery, keyQuery, convert):
+        self.connection = connection
+        self.dayID = dayID
+        self.rowQuery = rowQuery
+        self.keyQuery = keyQuery
+        self.convert = convert
+
+    # time complexity = O(log n), space complexity = O(1), for a key whose rows are found through an index
+    def __getitem__(self, key):
+        if not isinstance(key, int) or isinstance(key, bool):
+            raise KeyError(key)
+        return self.convert(key, self.connection.execute(self.rowQuery, (self.dayID, key)).fetchall())
+
+    def __iter__(self):
+        return (row[0] for row in self.connection.execute(self.keyQuery, (self.dayID,)).fetchall())
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    # the convert function for a query that finds at most one row - returns the row, or raises a KeyError if there is
+    # none
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def getSingleRow(key, rows):
+        if not rows:
+            raise KeyError(key)
+        return rows[0]
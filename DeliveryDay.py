@@ -0,0 +1,548 @@
+import math
+import sys
+
+from ParallelRouteBuilder import ParallelRouteBuilder
+from PackageInit import PackageInit
+from PackageStore import PackageStore
+from PkgHashTable import PkgHashTable
+from WGUPSPackage import WGUPSPackage
+from LoadPlanner import LoadPlanner
+from StopClusterer import StopClusterer
+from DeliveryTimeline import DeliveryTimeline
+from DeliverySimulator import DeliverySimulator
+from WGUPSTruck import WGUPSTruck
+from RouteBuilder import RouteBuilder
+from Clock import Clock
+from Status import PackageStatus
+from Instrumentation import Instrumentation
+
+
+# a delivery day holds the packages and trucks of a single day at a Hub, and contains methods for initializing the
+# delivery environment and simulating the day. The package csv file is not read until the packages are first needed,
+# and each day keeps its own packages, trucks, and results - so several days, at the same Hub or at different Hubs,
+# can exist side by side
+class DeliveryDay:
+
+    # the address correction known ahead for the sample package data - package 9 is listed with a wrong address, and it
+    # is given that the shipping company is both aware of the mistake and when it will be corrected. It cannot be
+    # delivered to its correct address before 10:20 AM, so it is held at the Hub until then. Given to a day of the
+    # sample data by the main program, since it belongs to no other package data
+    sampleAddressCorrections = {9: (620, "410 S State St", "Salt Lake City", "UT", "84111")}
+
+    # the day is created for a Hub, with the path of its package csv file and the number of packages expected, which
+    # dictates the starting size of the hash table that will store the package objects. The address corrections known
+    # before the day starts may also be given, mapping package IDs to (minute, address, city, state, zip) - each package
+    # is held at the Hub until its correction, which is applied at that minute as the day is simulated
+    def __init__(self, hub, packagePath='PackageData.csv', numTotalPackages=40, addressCorrections=None):
+        self.hub = hub
+        self.packagePath = packagePath
+        self.numTotalPackages = numTotalPackages
+        self.addressCorrections = dict(addressCorrections or {})
+        self.loadedPkgTable = None
+        self.packageStore = None
+
+        # list of the truck objects - this will later be used by the dispatcher to determine the status of the trucks
+        # at a given time
+        self.trucks = []
+
+        # the package IDs to be loaded onto each truck, keyed by truck ID - built by the load planner from the special
+        # notes on each package, or by the stop clusterer if the Hub clusters stops
+        self.truckLoads = dict()
+
+        # the timeline of every package and truck status change over the day, built once every truck has completed
+        # its route. The dispatcher answers all status queries from it
+        self.timeline = None
+
+        # the delivery simulator of a day that has been opened but not yet closed, and the minute it has been simulated
+        # up to
+        self.simulator = None
+        self.simulatedUntil = 0
+
+        # the known address corrections not yet applied to the open day, as (minute, package ID) in time order, and the
+        # packages held at the Hub for a wrong address with no known correction, which are in no truck's load
+        self.pendingCorrections = []
+        self.heldPackageIDs = set()
+
+        # the IDs of the packages and trucks that have changed since the timeline was last refreshed, whose entries
+        # are rebuilt by the next refresh
+        self.changedPackageIDs = set()
+        self.changedTruckIDs = set()
+
+        # the routes built ahead of time in parallel, keyed by truck ID, as (route locations, route, solver name, solve
+        # time) - empty when routes are built one at a time as each truck departs
+        self.prebuiltRoutes = dict()
+
+    # the Package Hash table, which maps package ID numbers with a corresponding Object to store that package's data.
+    # It is read from the package csv file on first use
+    @property
+    def masterPkgTable(self):
+        if self.loadedPkgTable is None:
+            locationIDMap = self.hub.locationIDMap
+            self.packageStore = PackageStore()
+            with Instrumentation.stage("loadPackages"):
+                self.loadedPkgTable = PackageInit.getPkgTable(locationIDMap, self.numTotalPackages, self.packagePath,
+                                                              store=self.packageStore)
+        return self.loadedPkgTable
+
+    # fills the day's package hash table from a copy of a package store that has already been read, in place of reading
+    # the package csv file - so many days can be run from one reading of the file
+    #
+    # time and space complexity = Big O(n)
+    def loadPackageStore(self, store):
+        self.packageStore = store.copy()
+        self.loadedPkgTable = PkgHashTable(max(self.numTotalPackages, len(self.packageStore)))
+        for row, pkgID in enumerate(self.packageStore.pkgIDs):
+            self.loadedPkgTable.insert(pkgID, WGUPSPackage.fromRow(self.packageStore, row))
+
+    # the package loads are planned, then the trucks are initialized with their ID number and handed to the delivery
+    # simulator in order of their planned departure. The simulator lets each truck leave once it is past its planned
+    # time, every package loaded onto it has arrived at the Hub, and a driver is free to take it. As each truck leaves,
+    # it is loaded with its designated package objects and its route is determined.
+    #
+    # time complexity = Big O(n log n), space complexity = Big O(n)
+    def startDeliveryDay(self):
+        with Instrumentation.stage("startDeliveryDay"):
+            self.openDeliveryDay()
+            self.closeDeliveryDay()
+
+    # plans the loads and lines the trucks up in the delivery simulator, without simulating any of the day. The day can
+    # then be advanced minute by minute, with address corrections applied along the way, until it is closed
+    #
+    # time complexity = Big O(n log n), space complexity = Big O(n)
+    def openDeliveryDay(self):
+        packages = self.getAllPackages()
+        correctionTimes = {pkgID: correction[0] for pkgID, correction in self.addressCorrections.items()}
+        with Instrumentation.stage("planLoads"):
+            if self.hub.clusterStops:
+                self.truckLoads = StopClusterer.clusterLoads(packages, self.hub.truckDepartureTimes,
+                                                             self.hub.numPkgsAllowedPerTruck,
+                                                             self.hub.masterDistanceList, self.hub.maxMassPerTruck,
+                                                             correctionTimes)
+            else:
+                self.truckLoads = LoadPlanner.planLoads(packages, self.hub.truckDepartureTimes,
+                                                        self.hub.numPkgsAllowedPerTruck, correctionTimes,
+                                                        self.hub.masterDistanceList)
+        loadedPkgIDs = {pkgID for load in self.truckLoads.values() for pkgID in load}
+        self.heldPackageIDs = {pkg.pkgID for pkg in packages if pkg.pkgID not in loadedPkgIDs}
+        self.pendingCorrections = sorted((correction[0], pkgID) for pkgID, correction in self.addressCorrections.items()
+                                         if pkgID in self.masterPkgTable)
+
+        if self.hub.routeBuildWorkers != 1 and not self.hub.deadlineAwareRoutes:
+            with Instrumentation.stage("buildRoutesInParallel"):
+                self.prebuildRoutes(packages)
+
+        simulator = DeliverySimulator(self.hub.numDrivers, self.departTruck)
+        for pkg in packages:
+            availableTime = LoadPlanner.getAvailableTime(pkg, correctionTimes)
+            if 0 < availableTime < math.inf:
+                simulator.addPackageArrival(availableTime, pkg.pkgID)
+
+        # trucks with a planned time are lined up in order of that time, followed by the trucks with none
+        departureTimes = self.hub.truckDepartureTimes
+        self.trucks = []
+        lineUp = sorted(self.truckLoads, key=lambda truckID: (departureTimes[truckID] is None,
+                                                              departureTimes[truckID] or 0, truckID))
+        for truckID in lineUp:
+            earliestStartTime = departureTimes[truckID] or self.hub.dayStartTime
+            truck = WGUPSTruck(truckID, earliestStartTime)
+            self.trucks.append(truck)
+            simulator.addTruck(truck, earliestStartTime, self.truckLoads[truckID])
+        self.trucks.sort(key=lambda truck: truck.truckID)
+
+        self.simulator = simulator
+        self.simulatedUntil = 0
+        self.timeline = None
+        self.changedPackageIDs.clear()
+        self.changedTruckIDs.clear()
+
+    # simulates the open day up to, but not including, the given minute. The known address corrections due before the
+    # minute are applied at their own minutes along the way. The trucks that changed, and the packages loaded onto them,
+    # are queued for the next refresh of the timeline. A ValueError is raised if the day has already been simulated
+    # past the minute
+    #
+    # time complexity = O(e log e), where e is the number of events before the minute, space complexity = O(e)
+    def advanceTo(self, minute):
+        self.checkMinute(minute)
+        while self.pendingCorrections and self.pendingCorrections[0][0] < minute:
+            correctionMinute, pkgID = self.pendingCorrections.pop(0)
+            self.runUntil(correctionMinute)
+            self.applyKnownCorrection(pkgID, correctionMinute)
+        self.runUntil(minute)
+
+    # raises a ValueError if the day is not open, or has already been simulated past the given minute. Changes to the
+    # day check this before advancing it, so a change that cannot be applied leaves the day where it was
+    #
+    # time and space complexity = O(1)
+    def checkMinute(self, minute):
+        if self.simulator is None:
+            raise ValueError("The delivery day is not open")
+        if minute < self.simulatedUntil:
+            raise ValueError("The delivery day has already been simulated to " +
+                             Clock.convertIntToTime(self.simulatedUntil))
+
+    # simulates the open day up to, but not including, the given minute, and queues the trucks that changed
+    #
+    # time complexity = O(e log e), space complexity = O(e)
+    def runUntil(self, minute):
+        with Instrumentation.stage("runSimulation"):
+            self.simulator.run(minute)
+        self.simulatedUntil = max(self.simulatedUntil, minute)
+        self.queueChangedTrucks()
+
+    # applies the known address correction of the given package at the given minute, as the day reaches it. A
+    # correction that can no longer be applied, such as one for a package already delivered, is reported and skipped
+    #
+    # time complexity = O(s), space complexity = O(s)
+    def applyKnownCorrection(self, pkgID, minute):
+        address, city, state, zc = self.addressCorrections[pkgID][1:]
+        try:
+            self.changeAddress(self.masterPkgTable.lookup(pkgID), minute, address, city, state, zc)
+        except ValueError as error:
+            print("Skipped the address correction of package " + str(pkgID) + ": " + str(error), file=sys.stderr)
+
+    # queues the trucks the simulator has changed, and their packages, for the next refresh of the timeline
+    #
+    # time and space complexity = O(p), where p is the number of packages on the changed trucks
+    def queueChangedTrucks(self):
+        for truckID in self.simulator.changedTrucks:
+            self.changedTruckIDs.add(truckID)
+            self.changedPackageIDs.update(self.truckLoads[truckID])
+        self.simulator.changedTrucks.clear()
+
+    # brings the timeline of the open day up to the minute simulated so far, so status queries see every change made
+    # since it was last refreshed. Only the queued packages and trucks are rebuilt, and the new timeline replaces the
+    # old in a single assignment - a query already reading the old timeline finishes with it undisturbed
+    #
+    # time complexity = O(c log c + n), where c is the number of changed packages and trucks, space complexity = O(n)
+    def refreshTimeline(self):
+        with Instrumentation.stage("refreshTimeline"):
+            if self.timeline is None:
+                self.timeline = DeliveryTimeline(self.getAllPackages(), self.trucks)
+            elif self.changedPackageIDs or self.changedTruckIDs:
+                changedPackages = [self.masterPkgTable.lookup(pkgID) for pkgID in self.changedPackageIDs]
+                changedTrucks = [self.getTruck(truckID) for truckID in self.changedTruckIDs]
+                self.timeline = DeliveryTimeline(changedPackages, changedTrucks, self.timeline)
+            self.changedPackageIDs.clear()
+            self.changedTruckIDs.clear()
+
+    # simulates the rest of the open day, then builds the timeline that status queries are answered from
+    #
+    # time complexity = O(e log e), space complexity = O(n)
+    def closeDeliveryDay(self):
+        if self.simulator is None:
+            raise ValueError("The delivery day is not open")
+        if self.pendingCorrections:
+            self.advanceTo(self.pendingCorrections[-1][0] + 1)
+        with Instrumentation.stage("runSimulation"):
+            self.simulator.run()
+        self.simulator = None
+        self.changedPackageIDs.clear()
+        self.changedTruckIDs.clear()
+        with Instrumentation.stage("buildTimeline"):
+            self.timeline = DeliveryTimeline(self.getAllPackages(), self.trucks)
+        self.hub.saveRouteCache()
+
+    # changes a package's delivery address at the given minute of the open day. The change is checked against the day
+    # as it stands, and the day is then simulated up to that minute. A package still at the Hub is simply delivered to
+    # its new address once its truck is loaded. A package already on a truck is moved to its new stop on that truck's
+    # route - only the stops the truck has not yet set off for are changed, and no other truck is touched. A package
+    # held at the Hub for a wrong address is put in the load of a truck still waiting there, and one waiting on a known
+    # correction is ready to leave from this minute. A ValueError is raised if the package has already been delivered,
+    # the new address is not a known delivery location, or a held package has no waiting truck with room for it
+    #
+    # time complexity = O(s), where s is the number of stops on the truck, plus the time to advance the day. Space
+    # complexity = O(s)
+    def correctAddress(self, pkgID, minute, address, city=None, state=None, zc=None):
+        if address not in self.hub.locationIDMap:
+            raise ValueError("Address '" + address + "' is not a known delivery location")
+        pkg = self.masterPkgTable.lookup(pkgID)
+        if pkg is None:
+            raise ValueError("Unknown package ID " + str(pkgID))
+        self.checkMinute(minute)
+        if pkg.status == PackageStatus.DELIVERED:
+            raise ValueError("Package " + str(pkgID) + " was delivered before " + Clock.convertIntToTime(minute))
+        self.chooseHeldGroupTruck(pkg, self.hub.locationIDMap[address][0])
+        self.advanceTo(minute)
+        self.changeAddress(pkg, minute, address, city, state, zc)
+
+        # a correction made during the day replaces the one known ahead of it
+        self.pendingCorrections = [(correctionMinute, otherID) for correctionMinute, otherID in self.pendingCorrections
+                                   if otherID != pkgID]
+
+    # changes a package's delivery address at the given minute, which the open day has been simulated up to, as
+    # described for correctAddress
+    #
+    # time complexity = O(s), space complexity = O(s)
+    def changeAddress(self, pkg, minute, address, city=None, state=None, zc=None):
+        location = self.hub.locationIDMap.get(address)
+        if location is None:
+            raise ValueError("Address '" + address + "' is not a known delivery location")
+        if pkg.status == PackageStatus.DELIVERED:
+            raise ValueError("Package " + str(pkg.pkgID) + " was delivered before " + Clock.convertIntToTime(minute))
+        pkgID = pkg.pkgID
+        hadWrongAddress = LoadPlanner.hasWrongAddress(pkg)
+        heldGroup, truck = self.chooseHeldGroupTruck(pkg, location[0])
+
+        previousLocationID = pkg.deliveryLocationID
+        pkg.address = address
+        pkg.deliveryLocationID = location[0]
+        pkg.nameOnAddress = location[1]
+        pkg.city = pkg.city if city is None else city
+        pkg.state = pkg.state if state is None else state
+        pkg.zip = pkg.zip if zc is None else zc
+        if hadWrongAddress:
+            pkg.notes = "Previously incorrect address - corrected at " + Clock.convertIntToTime(minute)
+        self.masterPkgTable.reindex(pkgID)
+        self.changedPackageIDs.add(pkgID)
+
+        # a held package, with every package that must travel with it, joins a truck waiting at the Hub - it is already
+        # at the Hub, so the truck does not wait on it. A planned package waiting on its correction is ready now
+        if truck is not None:
+            self.truckLoads[truck.truckID].extend(heldGroup)
+            self.heldPackageIDs.difference_update(heldGroup)
+            self.changedPackageIDs.update(heldGroup)
+        elif hadWrongAddress and pkgID not in self.heldPackageIDs and "delayed" not in pkg.notes.lower() and \
+                self.simulator.isPackageDue(pkgID):
+            self.simulator.addPackageArrival(minute, pkgID)
+
+        if pkg.truckLoadedOnto is not None and previousLocationID != pkg.deliveryLocationID:
+            truck = self.getTruck(pkg.truckLoadedOnto)
+            with Instrumentation.stage("rerouteTruck", truck.truckID):
+                truck.movePackage(pkg, previousLocationID, pkg.deliveryLocationID)
+                RouteBuilder.reviseRouteSuffix(truck, self.hub.masterDistanceList,
+                                               previousLocationID if previousLocationID not in truck.pkgLocationMap
+                                               else None, pkg.deliveryLocationID)
+
+    # returns the held group of a package whose address is being corrected to the given location, and the truck
+    # waiting at the Hub it will join once every wrong address in it is corrected - (None, None) for a package that is
+    # not held, and (group, None) while others in its group still have a wrong address. A ValueError is raised if no
+    # waiting truck has room for the group
+    #
+    # time complexity = O(g * h + t * p), space complexity = O(h + p)
+    def chooseHeldGroupTruck(self, pkg, locationID):
+        if pkg.pkgID not in self.heldPackageIDs:
+            return None, None
+        heldGroup = self.getHeldGroup(pkg.pkgID)
+        if any(otherID != pkg.pkgID and LoadPlanner.hasWrongAddress(self.masterPkgTable.lookup(otherID))
+               for otherID in heldGroup):
+            return heldGroup, None
+        return heldGroup, self.chooseWaitingTruck(heldGroup, locationID)
+
+    # records the arrival at the Hub of a package that was not there yet, at the given minute of the open day. A truck
+    # waiting on the package may leave from that minute on. The package may arrive earlier or later than it was due -
+    # its arrival is moved to the given minute before the day is simulated up to it, so a package arriving late is not
+    # taken to have arrived when it was due. A ValueError is raised if the package is unknown, already at the Hub, or
+    # at the Hub waiting on an address correction - only the correction releases such a package
+    #
+    # time complexity = O(log e), plus the time to advance the day, space complexity = O(1)
+    def receivePackage(self, pkgID, minute):
+        if pkgID not in self.masterPkgTable:
+            raise ValueError("Unknown package ID " + str(pkgID))
+        self.checkMinute(minute)
+        if not self.simulator.isPackageDue(pkgID):
+            raise ValueError("Package " + str(pkgID) + " is already at the Hub")
+        if LoadPlanner.hasWrongAddress(self.masterPkgTable.lookup(pkgID)):
+            raise ValueError("Package " + str(pkgID) + " is at the Hub waiting on an address correction")
+        self.simulator.addPackageArrival(minute, pkgID)
+        self.advanceTo(minute)
+
+    # holds a truck up for the given number of minutes from the given minute of the open day, after it breaks down. A
+    # truck at the Hub cannot leave until it is repaired, and a truck on its route stands where it broke down until it
+    # is repaired, reaching each of its remaining stops that much later. A ValueError is raised if the truck is unknown
+    # or has already returned
+    #
+    # time complexity = O(e), plus the time to advance the day, space complexity = O(1)
+    def breakDownTruck(self, truckID, minute, repairMinutes):
+        truck = self.getTruck(truckID)
+        if truck is None:
+            raise ValueError("Unknown truck ID " + str(truckID))
+        if repairMinutes < 0:
+            raise ValueError("A truck cannot be repaired in " + str(repairMinutes) + " minutes")
+        self.checkMinute(minute)
+        if self.simulator.hasTruckReturned(truck):
+            raise ValueError("Truck " + str(truckID) + " has already returned to the Hub")
+        self.advanceTo(minute)
+        self.simulator.delayTruck(truck, minute, repairMinutes)
+        self.queueChangedTrucks()
+
+    # adds a package that arrives at the Hub at the given minute of the open day, and puts it in the load of a truck
+    # still waiting at the Hub with room for it - the given truck, or else the first in line that already stops at the
+    # package's address, or else the first in line. A ValueError is raised if the package ID is already in use, the
+    # address is not a known delivery location, or no waiting truck has room - either before the day is simulated up
+    # to the minute, or once it is
+    #
+    # time complexity = O(t * p), where p is the number of packages per truck, plus the time to advance the day. Space
+    # complexity = O(p)
+    def addPackage(self, minute, pkgID, address, city, state, zc, deadline, mass, notes="", truckID=None):
+        location = self.hub.locationIDMap.get(address)
+        if location is None:
+            raise ValueError("Address '" + address + "' is not a known delivery location")
+        if pkgID in self.masterPkgTable:
+            raise ValueError("Package ID " + str(pkgID) + " is already in use")
+        self.checkMinute(minute)
+        self.chooseWaitingTruck([pkgID], location[0], mass, truckID)
+        self.advanceTo(minute)
+        truck = self.chooseWaitingTruck([pkgID], location[0], mass, truckID)
+
+        pkg = WGUPSPackage(location[1], pkgID, address, location[0], city, state, zc, deadline, mass, notes,
+                           self.packageStore)
+        self.masterPkgTable.insert(pkgID, pkg)
+        self.truckLoads[truck.truckID].append(pkgID)
+        self.changedPackageIDs.add(pkgID)
+        return truck.truckID
+
+    # returns the truck still waiting at the Hub that a group of packages headed to the given location is added to -
+    # the given truck, or else the first in line with room that already stops at the location, or else the first in
+    # line with room. The mass of the group is looked up unless it is given, for packages not yet in the package table.
+    # A ValueError is raised if no waiting truck has room
+    #
+    # time complexity = O(t * p), where p is the number of packages per truck, space complexity = O(p)
+    def chooseWaitingTruck(self, pkgIDs, locationID, mass=None, truckID=None):
+        if mass is None:
+            mass = sum(self.masterPkgTable.lookup(pkgID).mass for pkgID in pkgIDs)
+        trucksWithRoom = [truck for truck in self.simulator.getWaitingTrucks()
+                          if len(self.truckLoads[truck.truckID]) + len(pkgIDs) <= self.hub.numPkgsAllowedPerTruck
+                          and self.hasRoomForMass(truck.truckID, mass)]
+        if truckID is not None:
+            trucksWithRoom = [truck for truck in trucksWithRoom if truck.truckID == truckID]
+        if not trucksWithRoom:
+            raise ValueError("No truck still at the Hub has room for package" + ("s " if len(pkgIDs) > 1 else " ") +
+                             ", ".join(str(pkgID) for pkgID in sorted(pkgIDs)))
+        pkgIDsAtLocation = {pkg.pkgID for pkg in self.masterPkgTable.lookupByLocation(locationID)}
+        return next((truck for truck in trucksWithRoom
+                     if not pkgIDsAtLocation.isdisjoint(self.truckLoads[truck.truckID])), trucksWithRoom[0])
+
+    # returns the IDs of the held packages that must travel with the given held package, including itself - those it
+    # must be delivered with, and those that must be delivered with it, and so on
+    #
+    # time complexity = O(g * h), where g is the size of the group and h the number of held packages, space
+    # complexity = O(h)
+    def getHeldGroup(self, pkgID):
+        group = {pkgID}
+        frontier = [pkgID]
+        while frontier:
+            currentID = frontier.pop()
+            linked = set(LoadPlanner.getDeliveredWith(self.masterPkgTable.lookup(currentID)))
+            linked.update(otherID for otherID in self.heldPackageIDs
+                          if currentID in LoadPlanner.getDeliveredWith(self.masterPkgTable.lookup(otherID)))
+            for otherID in linked & self.heldPackageIDs - group:
+                group.add(otherID)
+                frontier.append(otherID)
+        return sorted(group)
+
+    # returns True if the packages loaded onto the truck, together with the given mass in kilograms, are within the
+    # Hub's limit on the mass a truck may carry
+    #
+    # time and space complexity = O(p), where p is the number of packages per truck
+    def hasRoomForMass(self, truckID, mass):
+        if self.hub.maxMassPerTruck is None:
+            return True
+        loadedMass = sum(self.masterPkgTable.lookup(pkgID).mass for pkgID in self.truckLoads[truckID])
+        return loadedMass + mass <= self.hub.maxMassPerTruck
+
+    # returns the truck with the given ID, or None if the day has no such truck
+    #
+    # time and space complexity = O(t)
+    def getTruck(self, truckID):
+        return next((truck for truck in self.trucks if truck.truckID == truckID), None)
+
+    # builds the route of every truck before the day is simulated, spread over the Hub's route building workers. A
+    # truck's stops are known as soon as its load is planned - the Hub, and each of its packages' delivery locations
+    #
+    # time complexity = O(t * r / w), where r is the time to build one route and w is the number of workers. Space
+    # complexity = O(n)
+    def prebuildRoutes(self, packages):
+        locationOfPackage = {pkg.pkgID: pkg.deliveryLocationID for pkg in packages}
+        routeLocations = {truckID: sorted({0} | {locationOfPackage[pkgID] for pkgID in pkgIDs})
+                          for truckID, pkgIDs in self.truckLoads.items()}
+        routes = ParallelRouteBuilder.buildRoutes(routeLocations, self.hub.masterDistanceList,
+                                                  self.hub.exactRouteMaxStops, self.hub.routeImprovementTimeBudget,
+                                                  ParallelRouteBuilder.getNumWorkers(self.hub.routeBuildWorkers),
+                                                  self.hub.routeCache)
+        self.prebuiltRoutes = {truckID: (routeLocations[truckID],) + routes[truckID] for truckID in routes}
+
+    # loads a truck with its designated packages as it leaves the Hub. Called by the delivery simulator
+    #
+    # time complexity = Big O(n^2), space complexity = Big O(n)
+    def departTruck(self, truck):
+        with Instrumentation.stage("createTruckPkgList", truck.truckID):
+            pkgList = self.createTruckPkgList(self.truckLoads[truck.truckID])
+        with Instrumentation.stage("loadTruck", truck.truckID):
+            self.loadTruck(truck, pkgList)
+
+    # returns every package in the master package hash table, in order of package ID
+    #
+    # time complexity = Big O(n log n), space complexity = Big O(n)
+    def getAllPackages(self):
+        return self.masterPkgTable.getValues()
+
+    # the truck's package number list is iterated through as keys into the package hash table, and the values in the
+    # table - ie - the associated package objects, are put in a list and stored in the truck
+    #
+    # time and space complexity = Big O(n)
+    def createTruckPkgList(self, idList):
+
+        # ensures no more than the allowable number of packages are loaded on a truck
+        assert len(idList) <= self.hub.numPkgsAllowedPerTruck
+        packagesForTruck = []
+        for i in idList:
+            packagesForTruck.append(self.masterPkgTable.lookup(i))
+        return packagesForTruck
+
+    # once the correct package objects for a truck have been retrieved from the package hash table into a list, the list
+    # is iterated through, and for each package object, the package's status is updated from AT_HUB to EN_ROUTE,
+    # its associated truck is initialized to the ID of the current truck being loaded, and the time at which the
+    # package is loaded is initialized to the truck's route start time
+    #
+    # time and space complexity = Big O(n)
+    def loadTruck(self, truck, pkgList):
+        for i in pkgList:
+            i.truckLoadedOnto = truck.truckID
+            i.timeLoaded = truck.routeStartTime
+            i.status = PackageStatus.EN_ROUTE
+            self.masterPkgTable.reindex(i.pkgID)
+
+            # after the data for the current package is updated, the packages are grouped together if they have the
+            # same delivery address. That way, a truck associates all packages at one stop with the same location ID,
+            # and no stop is unnecessarily visited more than once
+            if i.deliveryLocationID in truck.pkgLocationMap.keys():
+                truck.pkgLocationMap.get(i.deliveryLocationID).append(i)
+            else:
+                currentLocationPkgList = [i]
+                locationIDKey = i.deliveryLocationID
+                truck.routeLocations.append(locationIDKey)
+                truck.pkgLocationMap.update({locationIDKey: currentLocationPkgList})
+
+        # the Hub has a location ID of 0, which is used to initialize the list of location IDs the truck will visit
+        # on its route
+        truck.routeLocations.append(0)
+        truck.routeLocations.sort()
+
+        # now that the truck is loaded with its packages and the location IDs it will visit have been determined, its
+        # route is taken from the routes built ahead of time in parallel, or otherwise determined now
+        prebuiltRoute = self.prebuiltRoutes.get(truck.truckID)
+        if self.hub.deadlineAwareRoutes:
+            locationDeadlines = {locationID: min(pkg.deliveryDeadline for pkg in pkgsAtLocation)
+                                 for locationID, pkgsAtLocation in truck.pkgLocationMap.items()}
+            ParallelRouteBuilder.buildRoute(truck, self.hub.masterDistanceList, self.hub.exactRouteMaxStops,
+                                            self.hub.routeImprovementTimeBudget, locationDeadlines=locationDeadlines)
+            for locationID, deadline, expectedArrival in truck.missedDeadlines:
+                for pkg in truck.pkgLocationMap[locationID]:
+                    if pkg.deliveryDeadline < expectedArrival:
+                        DeliveryDay.reportMissedDeadline(truck, pkg, expectedArrival)
+        elif prebuiltRoute is not None and prebuiltRoute[0] == truck.routeLocations:
+            truck.route = [list(stop) for stop in prebuiltRoute[1]]
+            truck.routeSolver, truck.routeSolveTime = prebuiltRoute[2], prebuiltRoute[3]
+        else:
+            ParallelRouteBuilder.buildRoute(truck, self.hub.masterDistanceList, self.hub.exactRouteMaxStops,
+                                            self.hub.routeImprovementTimeBudget, self.hub.routeCache)
+
+    # reports a package whose deadline a deadline-aware route cannot meet, by writing a line describing it to standard
+    # error
+    #
+    # time and space complexity = Big O(1)
+    @staticmethod
+    def reportMissedDeadline(truck, pkg, expectedArrival):
+        print("Truck " + str(truck.truckID) + " cannot deliver package " + str(pkg.pkgID) + " by its " +
+              Clock.convertIntToTime(pkg.deliveryDeadline) + " deadline - expected at " +
+              Clock.convertIntToTime(expectedArrival), file=sys.stderr)
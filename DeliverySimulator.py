@@ -0,0 +1,206 @@
+import heapq
+
+from Instrumentation import Instrumentation
+
+
+# the delivery simulator plays out the delivery day as a series of events, kept in a priority queue ordered by time.
+# Rather than running each truck's route from start to finish one truck after another, every truck advances one event
+# at a time - departing the Hub, arriving at a stop, delivering the packages there, and returning to the Hub - so any
+# number of trucks can be on the road at once. The events are:
+#
+#   package arrival   -   a package that was delayed arrives at the Hub, and can now be loaded
+#   truck ready       -   a truck reaches the earliest time it is allowed to leave the Hub
+#   depart            -   a driver takes a ready truck, it is loaded, and it leaves the Hub
+#   arrive            -   a truck arrives at the next stop on its route
+#   deliver           -   a truck delivers the packages for its current stop
+#   return            -   a truck arrives back at the Hub, and its driver is free again
+#   driver handoff    -   a free driver takes the next truck waiting at the Hub
+#
+# trucks leave in the order they were added to the simulator. Each driver takes the next truck in line once it is
+# ready, and a truck is ready once it is past its earliest start time and every package it will carry is at the Hub.
+#
+# the day may also be changed while it is being simulated - a package's arrival may be moved, and a truck may be held
+# up by a breakdown. Rather than searching the queue for the events these replace, the latest arrival time of each
+# package and ready time of each truck are kept, and an event that no longer matches them is skipped when it comes up
+class DeliverySimulator:
+
+    # event types, in the order they are handled when several happen at the same minute. Package arrivals and returns
+    # come first, so that a truck ready at the same minute can leave with the packages or driver they free up
+    packageArrivalEvent = 0
+    returnEvent = 1
+    driverHandoffEvent = 2
+    truckReadyEvent = 3
+    deliverEvent = 4
+    arriveEvent = 5
+    departEvent = 6
+
+    # the simulator is given the number of drivers, and a function that loads a truck and determines its route. The
+    # function is called with each truck as it departs, after its start time has been set
+    def __init__(self, numDrivers, loadTruck):
+        self.freeDrivers = numDrivers
+        self.loadTruck = loadTruck
+        self.eventQueue = []
+        self.eventCounter = 0
+
+        # trucks waiting at the Hub, in the order they will be taken by drivers, and the next position in that order
+        self.truckQueue = []
+        self.nextTruckPosition = 0
+
+        # the number of packages each truck is still waiting on, and the trucks waiting on each package
+        self.missingPackages = dict()
+        self.trucksWaitingOnPackage = dict()
+        self.pastStartTime = set()
+        self.started = False
+
+        # the time each package that is not yet at the Hub is due to arrive, and the time each truck is next ready
+        self.arrivalTimes = dict()
+        self.readyTimes = dict()
+
+        # the position of each truck in the line at the Hub, and the trucks that have returned from their routes
+        self.queuePositions = dict()
+        self.returnedTrucks = set()
+
+        # the IDs of the trucks that have changed since the set was last cleared - by departing, arriving, delivering,
+        # returning, or being held up
+        self.changedTrucks = set()
+
+    # adds an event to the queue. The counter breaks ties between events of the same type at the same minute, so they
+    # are handled in the order they were scheduled
+    #
+    # time complexity = O(log e), where e is the number of queued events, space complexity = O(1)
+    def schedule(self, eventTime, eventType, subject):
+        heapq.heappush(self.eventQueue, (eventTime, eventType, self.eventCounter, subject))
+        self.eventCounter += 1
+
+    # schedules the arrival at the Hub of a package that is not there at the start of the day. A package already due to
+    # arrive is due at the new time instead
+    def addPackageArrival(self, arrivalTime, pkgID):
+        self.arrivalTimes[pkgID] = arrivalTime
+        self.schedule(arrivalTime, DeliverySimulator.packageArrivalEvent, pkgID)
+
+    # returns whether the given package has yet to arrive at the Hub
+    def isPackageDue(self, pkgID):
+        return pkgID in self.arrivalTimes
+
+    # returns whether the given truck is still in line at the Hub, not yet taken by a driver
+    def isTruckWaiting(self, truck):
+        return self.queuePositions[truck.truckID] >= self.nextTruckPosition
+
+    # returns whether the given truck has returned to the Hub from its route
+    def hasTruckReturned(self, truck):
+        return truck.truckID in self.returnedTrucks
+
+    # returns the trucks still in line at the Hub, in the order drivers will take them
+    def getWaitingTrucks(self):
+        return self.truckQueue[self.nextTruckPosition:]
+
+    # holds a truck up for the given number of minutes from the current time, such as after a breakdown. A truck still
+    # at the Hub cannot be ready to leave until the time is up. A truck on its route is held where it is, and records
+    # standing there - its next arrival, and so every later stop and its return, are put back by the delay. A
+    # ValueError is raised for a truck that has already returned
+    #
+    # time complexity = O(e), where e is the number of queued events, space complexity = O(1)
+    def delayTruck(self, truck, currentTime, delayMinutes):
+        if self.hasTruckReturned(truck):
+            raise ValueError("Truck " + str(truck.truckID) + " has already returned to the Hub")
+        self.changedTrucks.add(truck.truckID)
+        if self.isTruckWaiting(truck):
+            readyTime = max(self.readyTimes[truck.truckID], currentTime + delayMinutes)
+            self.readyTimes[truck.truckID] = readyTime
+            self.pastStartTime.discard(truck.truckID)
+            self.schedule(readyTime, DeliverySimulator.truckReadyEvent, truck)
+            return
+
+        # only the truck's next arrival is queued while it is on its route, since every later event is scheduled from
+        # the one before it. The truck's clock is put back with it, so the arrival it records matches the event
+        truck.holdInPlace(currentTime, delayMinutes)
+        self.eventQueue = [(eventTime + delayMinutes, eventType, counter, subject) if subject is truck
+                           else (eventTime, eventType, counter, subject)
+                           for eventTime, eventType, counter, subject in self.eventQueue]
+        heapq.heapify(self.eventQueue)
+
+    # adds a truck to the end of the line of trucks waiting to leave the Hub. The truck will not leave before the given
+    # time, nor before every package ID in pkgIDs that has a scheduled arrival has arrived
+    #
+    # time complexity = O(p), where p is the number of packages on the truck, space complexity = O(p)
+    def addTruck(self, truck, earliestStartTime, pkgIDs):
+        self.queuePositions[truck.truckID] = len(self.truckQueue)
+        self.truckQueue.append(truck)
+        self.readyTimes[truck.truckID] = earliestStartTime
+        self.missingPackages[truck.truckID] = 0
+        for pkgID in pkgIDs:
+            self.trucksWaitingOnPackage.setdefault(pkgID, []).append(truck)
+            self.missingPackages[truck.truckID] += 1
+        self.schedule(earliestStartTime, DeliverySimulator.truckReadyEvent, truck)
+
+    # handles events in time order until none remain, which is when every truck has returned to the Hub. If a time is
+    # given, only the events before that minute are handled, and the run can be picked up again from there by a later
+    # call
+    #
+    # time complexity = O(e log e), where e is the total number of events, space complexity = O(e)
+    def run(self, untilTime=None):
+
+        # packages with no scheduled arrival are already at the Hub, so trucks are not left waiting on them
+        if not self.started:
+            self.started = True
+            for pkgID, waitingTrucks in self.trucksWaitingOnPackage.items():
+                if pkgID not in self.arrivalTimes:
+                    for truck in waitingTrucks:
+                        self.missingPackages[truck.truckID] -= 1
+
+        while self.eventQueue and (untilTime is None or self.eventQueue[0][0] < untilTime):
+            eventTime, eventType, _, subject = heapq.heappop(self.eventQueue)
+            if eventType == DeliverySimulator.packageArrivalEvent:
+                if self.arrivalTimes.get(subject) != eventTime:
+                    continue
+                del self.arrivalTimes[subject]
+                for truck in self.trucksWaitingOnPackage.get(subject, ()):
+                    self.missingPackages[truck.truckID] -= 1
+                self.dispatchReadyTrucks(eventTime)
+            elif eventType == DeliverySimulator.truckReadyEvent:
+                if self.readyTimes[subject.truckID] != eventTime:
+                    continue
+                self.pastStartTime.add(subject.truckID)
+                self.dispatchReadyTrucks(eventTime)
+            elif eventType == DeliverySimulator.departEvent:
+                self.changedTrucks.add(subject.truckID)
+                subject.departHub(eventTime)
+                self.loadTruck(subject)
+                self.scheduleNextArrival(subject)
+            elif eventType == DeliverySimulator.arriveEvent:
+                self.changedTrucks.add(subject.truckID)
+                with Instrumentation.stage("driveRoute", subject.truckID):
+                    subject.driveToNextLocation()
+                if subject.route:
+                    self.schedule(eventTime, DeliverySimulator.deliverEvent, subject)
+                else:
+                    self.schedule(eventTime, DeliverySimulator.returnEvent, subject)
+            elif eventType == DeliverySimulator.deliverEvent:
+                with Instrumentation.stage("driveRoute", subject.truckID):
+                    subject.deliverAtLocation()
+                self.scheduleNextArrival(subject)
+            elif eventType == DeliverySimulator.returnEvent:
+                subject.completeRoute()
+                self.returnedTrucks.add(subject.truckID)
+                self.schedule(eventTime, DeliverySimulator.driverHandoffEvent, subject)
+            elif eventType == DeliverySimulator.driverHandoffEvent:
+                self.freeDrivers += 1
+                self.dispatchReadyTrucks(eventTime)
+
+    # while a driver is free and the next truck in line is ready, the driver takes that truck and it departs
+    #
+    # time complexity = O(log e) per truck dispatched, space complexity = O(1)
+    def dispatchReadyTrucks(self, currentTime):
+        while self.freeDrivers > 0 and self.nextTruckPosition < len(self.truckQueue):
+            truck = self.truckQueue[self.nextTruckPosition]
+            if truck.truckID not in self.pastStartTime or self.missingPackages[truck.truckID] > 0:
+                break
+            self.freeDrivers -= 1
+            self.nextTruckPosition += 1
+            self.schedule(currentTime, DeliverySimulator.departEvent, truck)
+
+    # schedules the truck's arrival at the next stop on its route, after the drive time of the leg ahead of it
+    #
+    # time complexity = O(log e), space complexity = O(1)
+    def scheduleNextArrival(self, truck):
+        self.schedule(truck.currentTime + truck.getNextLegMinutes(), DeliverySimulator.arriveEvent, truck)
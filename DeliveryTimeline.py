@@ -0,0 +1,127 @@
+import bisect
+from types import MappingProxyType
+
+from Status import PackageStatus, TruckStatus
+
+
+# the delivery timeline is built once the delivery day has been simulated, and records every change of status of every
+# package and truck as a list of events sorted by time. A status at any minute of the day is then found by binary
+# search, without recalculating or changing anything. The timeline is never modified after it is built, so any number
+# of queries may read from it at the same time
+#
+# a timeline may also be taken of a day that is still being simulated, in which case it holds the changes up to the
+# minute simulated so far, and each truck on its route is shown driving toward its next stop. As the day goes on, a new
+# timeline is built from the last one with only the packages and trucks that have changed, and swapped in for it
+class DeliveryTimeline:
+
+    # the events of each package and truck are stored as a pair of tuples - the times of the events, in order, and the
+    # (status, truck ID) entered at each of those times. Both mappings are read-only views. If a previous timeline is
+    # given, the new one holds its entries, with those of the given packages and trucks added or replaced
+    #
+    # time complexity = O(n log n) for the changed packages and trucks, plus O(n) to copy the previous timeline's
+    # entries. Space complexity = O(n)
+    def __init__(self, packages, trucks, previous=None):
+        packageEvents = dict() if previous is None else dict(previous.packageEvents)
+        for pkg in packages:
+            packageEvents[pkg.pkgID] = DeliveryTimeline.getPackageEvents(pkg)
+
+        truckEvents = dict() if previous is None else dict(previous.truckEvents)
+        truckStops = dict() if previous is None else dict(previous.truckStops)
+        for truck in trucks:
+            truckEvents[truck.truckID] = DeliveryTimeline.getTruckEvents(truck)
+            truckStops[truck.truckID] = DeliveryTimeline.getTruckStops(truck)
+
+        self.packageEvents = MappingProxyType(packageEvents)
+        self.truckEvents = MappingProxyType(truckEvents)
+        self.truckStops = MappingProxyType(truckStops)
+        self.truckIDs = tuple(truckEvents)
+
+    # returns the (times, states) of a package's events - it is at the Hub from the start of the day, and once loaded,
+    # is en route on its truck until it is delivered
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def getPackageEvents(pkg):
+        events = [(0, PackageStatus.AT_HUB, None)]
+        if pkg.truckLoadedOnto is not None:
+            events.append((pkg.timeLoaded, PackageStatus.EN_ROUTE, pkg.truckLoadedOnto))
+            if pkg.timeDelivered is not None:
+                events.append((pkg.timeDelivered, PackageStatus.DELIVERED, pkg.truckLoadedOnto))
+        events.sort(key=lambda event: event[0])
+        return tuple(event[0] for event in events), tuple((event[1], event[2]) for event in events)
+
+    # returns the (times, states) of a truck's events - its departure and its return, once they have happened
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def getTruckEvents(truck):
+        times = [0]
+        states = [TruckStatus.NOT_STARTED]
+        if truck.hasDeparted:
+            times.append(truck.routeStartTime)
+            states.append(TruckStatus.ON_ROUTE)
+        if truck.timeOfReturn is not None:
+            times.append(truck.timeOfReturn)
+            states.append(TruckStatus.RETURNED)
+        return tuple(times), tuple(states)
+
+    # returns the prefix arrays of arrival times, cumulative miles, and location IDs the truck recorded while driving
+    # its route. A truck still on its route also has the stop it is driving toward added, at the time it is due there
+    #
+    # time and space complexity = O(s), where s is the number of stops on the truck's route
+    @staticmethod
+    def getTruckStops(truck):
+        stopTimes, stopMiles, stopLocations = list(truck.stopTimes), list(truck.stopMiles), list(truck.stopLocations)
+        if truck.hasDeparted and truck.timeOfReturn is None and truck.route:
+            stopTimes.append(truck.currentTime + truck.getNextLegMinutes())
+            stopMiles.append(truck.cumulativeMiles + truck.route[0][1])
+            stopLocations.append(truck.route[1][0] if len(truck.route) > 1 else 0)
+        return tuple(stopTimes), tuple(stopMiles), tuple(stopLocations)
+
+    # returns (status, truck ID, time the status began) for the given package at the given time in minutes since
+    # midnight. The truck ID is None while the package is at the Hub
+    #
+    # time complexity = O(log n), space complexity = O(1)
+    def getPackageStatus(self, pkgID, requestedTime):
+        times, states = self.packageEvents[pkgID]
+        eventIndex = bisect.bisect_right(times, requestedTime) - 1
+        status, truckID = states[eventIndex]
+        return status, truckID, times[eventIndex]
+
+    # returns (status, miles driven, time the status began) for the given truck at the given time in minutes since
+    # midnight
+    #
+    # time complexity = O(log n), space complexity = O(1)
+    def getTruckStatus(self, truckID, requestedTime):
+        times, states = self.truckEvents[truckID]
+        eventIndex = bisect.bisect_right(times, requestedTime) - 1
+        return states[eventIndex], self.getTruckMileage(truckID, requestedTime), times[eventIndex]
+
+    # returns the exact miles the given truck has driven at the given time in minutes since midnight. The stop the truck
+    # most recently reached is found by binary search on its arrival times, and the miles of the leg it is driving are
+    # interpolated by the fraction of that leg's drive time that has passed
+    #
+    # time complexity = O(log s), where s is the number of stops on the truck's route, space complexity = O(1)
+    def getTruckMileage(self, truckID, requestedTime):
+        stopTimes, stopMiles, stopLocations = self.truckStops[truckID]
+        stopIndex = bisect.bisect_right(stopTimes, requestedTime) - 1
+        if stopIndex < 0:
+            return 0.0
+        if stopIndex == len(stopTimes) - 1:
+            return stopMiles[stopIndex]
+
+        # bisect_right lands on the last stop reached at or before the requested time, so the next arrival is always
+        # strictly later and the leg's drive time is never zero
+        legFraction = (requestedTime - stopTimes[stopIndex]) / (stopTimes[stopIndex + 1] - stopTimes[stopIndex])
+        return stopMiles[stopIndex] + legFraction * (stopMiles[stopIndex + 1] - stopMiles[stopIndex])
+
+    # returns the location IDs (from, to) of the leg the given truck is driving at the given time in minutes since
+    # midnight, or None if the truck is not on its route at that time
+    #
+    # time complexity = O(log s), where s is the number of stops on the truck's route, space complexity = O(1)
+    def getTruckLeg(self, truckID, requestedTime):
+        stopTimes, stopMiles, stopLocations = self.truckStops[truckID]
+        stopIndex = bisect.bisect_right(stopTimes, requestedTime) - 1
+        if stopIndex < 0 or stopIndex == len(stopTimes) - 1:
+            return None
+        return stopLocations[stopIndex], stopLocations[stopIndex + 1]
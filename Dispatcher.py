@@ -1,16 +1,17 @@
 from Clock import Clock
-from Hub import Hub
+from Status import PackageStatus, TruckStatus
 
 
 # the dispatcher responds to user queries from the main program interface, and displays current delivery environment
 # statuses based on a given time
 class Dispatcher:
 
-    # displays package and truck status information at a given time
+    # displays package and truck status information at a given time. Statuses are read from the delivery timeline
+    # built by the Hub, so nothing about the packages or trucks is changed by a query
     #
-    # time complexity = Big O(n), space complexity O(1)
+    # time complexity = Big O(t log n), where t is the number of trucks, space complexity O(1)
     @staticmethod
-    def getStatus(pkgID, requestedTime, pkgTable, trucks):
+    def getStatus(pkgID, requestedTime, pkgTable, timeline):
         requestedTime = Clock.convertTimeToInt(requestedTime)
         reportBorder = ""
         print("\nWGUPS Report at " + Clock.convertIntToTime(requestedTime) + ":\n " + reportBorder.ljust(253, '-'))
@@ -19,45 +20,55 @@ class Dispatcher:
 
         p = pkgTable.lookup(int(pkgID))
 
-        # the user requested time is compared with significant times in the package data, such as time of delivery
-        # and time of being loaded onto its truck - to determine the status of that package to display to the user
-        if requestedTime < p.timeLoaded:
-            p.setStatus("At Hub")
-        elif p.timeLoaded <= requestedTime < p.timeDelivered:
-            p.setStatus("En route on Truck " + str(p.truckLoadedOnto))
-        elif requestedTime >= p.timeDelivered:
-            p.setStatus("Delivered at " + Clock.convertIntToTime(p.timeDelivered) + " by Truck " +
-                        str(p.truckLoadedOnto))
+        # the status of the package at the user requested time is looked up in the timeline of significant times in
+        # the package's day, such as the time it was loaded onto its truck and the time it was delivered
+        pkgStatus = Dispatcher.getPackageStatusText(timeline, p.pkgID, requestedTime)
         currentPkgDeliveryDeadline = Clock.convertIntToTime(p.deliveryDeadline)
 
-        # based on the data comparisons, the current status and info of the package are displayed to the user
+        # based on the timeline, the current status and info of the package are displayed to the user
         print("Package ID: " + str(p.pkgID).ljust(5) + "   " + "To: " + p.nameOnAddress.ljust(44) + "   " +
               "Address: " + p.address.ljust(38) + "   " + "City: " + p.city.ljust(18) + "   " + "State: " +
-              p.state + "   " + "Zip: " + str(p.zip) + "   " + "Weight: " + str(p.mass).ljust(5) + "   " +
+              p.state + "   " + "Zip: " + str(p.zip) + "   " + "Weight: " + format(p.mass, "g").ljust(5) + "   " +
               "Delivery Deadline: " + currentPkgDeliveryDeadline.ljust(12) + "   " + "Status: " +
-              p.status.ljust(40, " ") + p.notes)
+              pkgStatus.ljust(40, " ") + p.notes)
 
-        # after all package information has been printed, the 3 trucks are then examined. Similarly to how the
-        # package statuses were determined, the status of each truck is displayed based on the comparison of the user
-        # requested time and the significant times stored by the truck. The truck will display how many miles it has
-        # accumulated over the course of its route, as well as its current status
+        # after all package information has been printed, the trucks are then examined. Similarly to how the
+        # package status was determined, the status of each truck is looked up in the timeline at the user requested
+        # time. The truck will display how many miles it has accumulated over the course of its route, as well as its
+        # current status
         print("")
         totalMileage = 0.0
-        for j in trucks:
-            if requestedTime >= j.routeStartTime:
-                if requestedTime >= j.timeOfReturn:
-                    j.currentMileage = str(round(j.cumulativeMiles, 2))
-                    truckStatus = "Route complete - returned to Hub at " + Clock.convertIntToTime(j.timeOfReturn)
-                else:
-                    j.currentMileage = str(round(((requestedTime - j.routeStartTime) / 60) * 18, 2))
-                    truckStatus = "On delivery route - left Hub at " + Clock.convertIntToTime(j.routeStartTime)
-                totalMileage += float(j.currentMileage)
-            else:
-                truckStatus = "At Hub - Not started delivery route"
-                j.currentMileage = str(0.0)
-            print("Truck " + str(j.truckID) + ":     Current mileage: " + j.currentMileage.ljust(10, ' ') + "          "
+        for truckID in timeline.truckIDs:
+            truckStatus, currentMileage = Dispatcher.getTruckStatusText(timeline, truckID, requestedTime)
+            totalMileage += float(currentMileage)
+            print("Truck " + str(truckID) + ":     Current mileage: " + currentMileage.ljust(10, ' ') + "          "
                   + "Status: " + truckStatus)
 
-        # the mileage for all 3 trucks is added together to give the total mileage used by all trucks
+        # the mileage for all trucks is added together to give the total mileage used by all trucks
         print("\nTotal mileage for all trucks at " + Clock.convertIntToTime(requestedTime) +
               ": " + str(round(totalMileage, 2)) + "\nEND OF REPORT\n" + reportBorder.ljust(253, '-'))
+
+    # returns the text describing a package's status at the given time in minutes since midnight
+    #
+    # time complexity = Big O(log n), space complexity O(1)
+    @staticmethod
+    def getPackageStatusText(timeline, pkgID, requestedTime):
+        status, truckID, statusTime = timeline.getPackageStatus(pkgID, requestedTime)
+        if status == PackageStatus.EN_ROUTE:
+            return "En route on Truck " + str(truckID)
+        if status == PackageStatus.DELIVERED:
+            return "Delivered at " + Clock.convertIntToTime(statusTime) + " by Truck " + str(truckID)
+        return "At Hub"
+
+    # returns the text describing a truck's status, and its mileage rounded to 2 decimal places, at the given time in
+    # minutes since midnight
+    #
+    # time complexity = Big O(log n), space complexity O(1)
+    @staticmethod
+    def getTruckStatusText(timeline, truckID, requestedTime):
+        status, miles, statusTime = timeline.getTruckStatus(truckID, requestedTime)
+        if status == TruckStatus.RETURNED:
+            return "Route complete - returned to Hub at " + Clock.convertIntToTime(statusTime), str(round(miles, 2))
+        if status == TruckStatus.ON_ROUTE:
+            return "On delivery route - left Hub at " + Clock.convertIntToTime(statusTime), str(round(miles, 2))
+        return "At Hub - Not started delivery route", str(0.0)
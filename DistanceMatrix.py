@@ -0,0 +1,189 @@
+import hashlib
+import math
+import os
+
+import numpy as np
+
+
+# the distance matrix stores the distance in miles between every pair of locations. Since the distance from A to B is
+# the same as from B to A, only the lower triangle of the matrix (including the diagonal) is kept, packed row after row
+# into a single array of 64-bit floats - the distance between locations i and j, where i >= j, is at index
+# i * (i + 1) / 2 + j. This takes about half the memory of a full square matrix. The distances are kept as 64-bit
+# floats, the same as Python floats, so mileage sums match those of the distances read straight from the csv file
+#
+# the packed array is saved in a binary sidecar file next to the distance csv file, which later startups memory-map
+# instead of parsing the csv file again. The sidecar records the csv file's modification time, size, and SHA-256 hash,
+# and is rebuilt whenever the csv file's contents change
+class DistanceMatrix:
+
+    # the sidecar file begins with a fixed-size header - an 8-byte marker, then the number of locations, the csv
+    # file's modification time in nanoseconds and its size in bytes as 8-byte integers, then its 32-byte SHA-256 hash.
+    # The packed distances follow directly after the header
+    sidecarMarker = b"WGUPSDM2"
+    sidecarSuffix = ".packed"
+    headerSize = 64
+
+    # the type of the packed distances, in memory and in the sidecar file - little-endian 64-bit floats
+    distanceType = np.dtype("<f8")
+
+    # the matrix is created from the packed lower triangle array and the hash of the csv file it was read from, which
+    # identifies this version of the distances
+    def __init__(self, packedDistances, version):
+        self.packedDistances = packedDistances
+        self.version = version
+
+        # a packed triangle holding n rows has n * (n + 1) / 2 entries
+        self.numLocations = (math.isqrt(8 * len(packedDistances) + 1) - 1) // 2
+
+    def __len__(self):
+        return self.numLocations
+
+    # returns the full row of distances from the given location to every location, so the matrix can still be indexed
+    # as distMatrix[i][j]
+    #
+    # time and space complexity = O(n)
+    def __getitem__(self, locationID):
+        return self.subMatrix([locationID], range(self.numLocations))[0]
+
+    # returns the distance in miles between two locations
+    #
+    # time and space complexity = O(1)
+    def distance(self, fromID, toID):
+        if fromID < toID:
+            fromID, toID = toID, fromID
+        return float(self.packedDistances[fromID * (fromID + 1) // 2 + toID])
+
+    # returns the matrix of distances from each of the given row locations to each of the given column locations, as
+    # 64-bit floats. If no column locations are given, the row locations are used, giving the square matrix of
+    # distances between a set of locations - such as the stops on a truck's route
+    #
+    # time and space complexity = O(r * c)
+    def subMatrix(self, rowIDs, columnIDs=None):
+        rows = np.asarray(rowIDs, dtype=np.int64)[:, None]
+        columns = np.asarray(rowIDs if columnIDs is None else columnIDs, dtype=np.int64)[None, :]
+        larger = np.maximum(rows, columns)
+        smaller = np.minimum(rows, columns)
+        return self.packedDistances[larger * (larger + 1) // 2 + smaller].astype(np.float64)
+
+    # loads the distance matrix for the given csv file, from its sidecar file if the sidecar is up to date, and
+    # otherwise by parsing the csv file and writing a new sidecar
+    #
+    # time complexity = O(1) to map an up-to-date sidecar, O(n^2) otherwise. Space complexity = O(n^2)
+    @staticmethod
+    def load(csvPath):
+        sidecarPath = csvPath + DistanceMatrix.sidecarSuffix
+        csvStat = os.stat(csvPath)
+        header = DistanceMatrix.readHeader(sidecarPath)
+
+        if header is not None:
+            numLocations, modifiedTime, fileSize, fileHash = header
+
+            # an unchanged modification time and size means the csv file has not been touched since the sidecar was
+            # written. Otherwise, the csv file is hashed, since it may have been touched without being changed
+            if modifiedTime == csvStat.st_mtime_ns and fileSize == csvStat.st_size:
+                return DistanceMatrix.mapSidecar(sidecarPath, numLocations, fileHash)
+            if DistanceMatrix.hashFile(csvPath) == fileHash:
+                DistanceMatrix.writeHeader(sidecarPath, numLocations, csvStat, fileHash)
+                return DistanceMatrix.mapSidecar(sidecarPath, numLocations, fileHash)
+
+        fileHash = DistanceMatrix.hashFile(csvPath)
+        distanceMatrix = DistanceMatrix(DistanceMatrix.parseCsv(csvPath), fileHash.hex())
+        DistanceMatrix.writeSidecar(sidecarPath, distanceMatrix.packedDistances, len(distanceMatrix), csvStat, fileHash)
+        return distanceMatrix
+
+    # reads the lower triangle of the distance csv file into a packed array, one row at a time. Row i of the
+    # file holds the distances from location i to locations 0 through i - any values past the diagonal are ignored
+    #
+    # time and space complexity = O(n^2)
+    @staticmethod
+    def parseCsv(csvPath):
+        packedRows = []
+        with open(csvPath, 'r') as read_obj:
+            for line in read_obj:
+                if not line.strip():
+                    continue
+                rowIndex = len(packedRows)
+                values = line.strip().split(',')[:rowIndex + 1]
+                if len(values) < rowIndex + 1:
+                    raise ValueError(csvPath + " row " + str(rowIndex + 1) + " has " + str(len(values)) +
+                                     " distances, expected at least " + str(rowIndex + 1))
+                packedRows.append(np.array(values, dtype=DistanceMatrix.distanceType))
+        if not packedRows:
+            return np.empty(0, dtype=DistanceMatrix.distanceType)
+        return np.concatenate(packedRows)
+
+    # returns the SHA-256 hash of a file's contents, read in blocks so large files never have to fit in memory
+    #
+    # time complexity = O(n), space complexity = O(1)
+    @staticmethod
+    def hashFile(path):
+        fileHash = hashlib.sha256()
+        with open(path, 'rb') as read_obj:
+            for block in iter(lambda: read_obj.read(1 << 20), b""):
+                fileHash.update(block)
+        return fileHash.digest()
+
+    # returns (number of locations, csv modification time, csv size, csv hash) from a sidecar file's header, or None
+    # if the sidecar is missing or is not a valid sidecar file
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def readHeader(sidecarPath):
+        try:
+            with open(sidecarPath, 'rb') as read_obj:
+                header = read_obj.read(DistanceMatrix.headerSize)
+            sidecarSize = os.path.getsize(sidecarPath)
+        except OSError:
+            return None
+        if len(header) != DistanceMatrix.headerSize or header[:8] != DistanceMatrix.sidecarMarker:
+            return None
+        numLocations, modifiedTime, fileSize = np.frombuffer(header[8:32], dtype="<i8").tolist()
+        expectedSize = DistanceMatrix.headerSize + DistanceMatrix.distanceType.itemsize * (numLocations *
+                                                                                            (numLocations + 1) // 2)
+        if sidecarSize != expectedSize:
+            return None
+        return numLocations, modifiedTime, fileSize, header[32:64]
+
+    # builds the header for a sidecar file
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def buildHeader(numLocations, csvStat, fileHash):
+        counts = np.array([numLocations, csvStat.st_mtime_ns, csvStat.st_size], dtype="<i8")
+        return DistanceMatrix.sidecarMarker + counts.tobytes() + fileHash
+
+    # rewrites only the header of an existing sidecar file, after the csv file was touched without being changed
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def writeHeader(sidecarPath, numLocations, csvStat, fileHash):
+        try:
+            with open(sidecarPath, 'r+b') as write_obj:
+                write_obj.write(DistanceMatrix.buildHeader(numLocations, csvStat, fileHash))
+        except OSError:
+            pass
+
+    # writes a new sidecar file. It is written under a temporary name and then renamed, so a process reading the
+    # sidecar never sees a partly written file. If the directory cannot be written to, the sidecar is simply skipped
+    #
+    # time and space complexity = O(n^2)
+    @staticmethod
+    def writeSidecar(sidecarPath, packedDistances, numLocations, csvStat, fileHash):
+        temporaryPath = sidecarPath + "." + str(os.getpid()) + ".tmp"
+        try:
+            with open(temporaryPath, 'wb') as write_obj:
+                write_obj.write(DistanceMatrix.buildHeader(numLocations, csvStat, fileHash))
+                write_obj.write(packedDistances.astype(DistanceMatrix.distanceType).tobytes())
+            os.replace(temporaryPath, sidecarPath)
+        except OSError:
+            if os.path.exists(temporaryPath):
+                os.remove(temporaryPath)
+
+    # memory-maps the packed distances of an up-to-date sidecar file as a read-only array
+    #
+    # time complexity = O(1), space complexity = O(1) until the distances are read
+    @staticmethod
+    def mapSidecar(sidecarPath, numLocations, fileHash):
+        packedDistances = np.memmap(sidecarPath, dtype=DistanceMatrix.distanceType, mode='r',
+                                    offset=DistanceMatrix.headerSize, shape=(numLocations * (numLocations + 1) // 2,))
+        return DistanceMatrix(packedDistances, fileHash.hex())
@@ -0,0 +1,172 @@
+import json
+import sys
+
+from Clock import Clock
+from PackageInit import PackageInit
+
+
+# the event stream applies live updates to a delivery day while it is being simulated, so the day no longer has to be
+# known in full before it starts. Events are read one per line as JSON objects (the JSON Lines format) from a file or a
+# pipe, or taken one at a time from an asyncio queue. Every event has a "type" and a "time" - minutes since midnight, or
+# a string in format 'H:MM <AM/PM>' - and events must come in time order. The types of event are:
+#
+#   package-arrives     -   {"package_id"}, a package that was not yet at the Hub arrives there
+#   address-corrected   -   {"package_id", "address", and optionally "city", "state", "zip"}, a package's delivery
+#                           address is corrected
+#   truck-breakdown     -   {"truck_id", and optionally "repair_minutes"}, a truck breaks down, and is held up until it
+#                           is repaired
+#   new-package         -   {"package_id", "address", "city", "state", "zip", "deadline", "mass", and optionally
+#                           "notes", "truck_id"}, a package not in the package csv file arrives at the Hub to be
+#                           delivered the same day
+#
+# each event is applied to the open day as it is read - the day is simulated up to the event's time, the event changes
+# the packages, trucks and simulator from there on, and the packages and trucks it touched are queued. The day's
+# timeline is then refreshed from the queue, so a status query sees the event as soon as it has been applied, without
+# the day being simulated again from the start. An event that cannot be applied is reported and skipped, and the rest
+# of the stream is still read
+class EventStream:
+
+    # minutes a broken down truck is held up for when an event does not say
+    defaultRepairMinutes = 60
+
+    # the fields each type of event must have, besides its type and time
+    requiredFields = {"package-arrives": ("package_id",),
+                      "address-corrected": ("package_id", "address"),
+                      "truck-breakdown": ("truck_id",),
+                      "new-package": ("package_id", "address", "city", "state", "zip", "deadline", "mass")}
+
+    # applies every event in the given lines to the open day, in order. Lines that are blank are skipped, and events
+    # that cannot be applied are passed to the onRejectedEvent function along with their line number and the reason,
+    # which by default writes them to standard error. Returns the number of events applied
+    #
+    # time complexity = O(v * c log c + e log e), where v is the number of events, c is the number of packages and
+    # trucks each one changes, and e is the number of simulator events. Space complexity = O(n)
+    @staticmethod
+    def ingest(day, lines, onRejectedEvent=None):
+        if onRejectedEvent is None:
+            onRejectedEvent = EventStream.reportRejectedEvent
+        timeCache = dict()
+        deadlineCache = dict()
+        numApplied = 0
+        for lineNumber, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            if EventStream.ingestEvent(day, line, timeCache, deadlineCache,
+                                       lambda reason: onRejectedEvent(lineNumber, line, reason)):
+                numApplied += 1
+        return numApplied
+
+    # applies every event taken from the given asyncio queue to the open day, until None is taken from it. Events may be
+    # put on the queue as JSON strings or as dictionaries, and are numbered in the order they are taken when reported.
+    # Other tasks run while the queue is empty, so events can be applied as they come in. Returns the number of events
+    # applied
+    #
+    # time and space complexity = that of ingest
+    @staticmethod
+    async def ingestQueue(day, queue, onRejectedEvent=None):
+        if onRejectedEvent is None:
+            onRejectedEvent = EventStream.reportRejectedEvent
+        timeCache = dict()
+        deadlineCache = dict()
+        numApplied = 0
+        eventNumber = 0
+        while True:
+            event = await queue.get()
+            try:
+                if event is None:
+                    return numApplied
+                eventNumber += 1
+                if EventStream.ingestEvent(day, event, timeCache, deadlineCache,
+                                           lambda reason: onRejectedEvent(eventNumber, event, reason)):
+                    numApplied += 1
+            finally:
+                queue.task_done()
+
+    # applies a single event, given as a JSON string or a dictionary, and refreshes the day's timeline. Returns True if
+    # the event was applied, and otherwise passes the reason to the reject function and returns False. An event is
+    # checked against the day as it stands before the day is simulated up to its time, so one that is malformed or
+    # plainly cannot apply leaves the day where it was. The timeline is refreshed either way, since an event may only
+    # be found not to apply at its own time, such as the breakdown of a truck that has returned by then
+    #
+    # time complexity = O(c log c), plus the time to advance the day, space complexity = O(n)
+    @staticmethod
+    def ingestEvent(day, event, timeCache, deadlineCache, reject):
+        try:
+            if isinstance(event, str):
+                event = json.loads(event)
+            EventStream.applyEvent(day, event, timeCache, deadlineCache)
+        except (ValueError, TypeError) as error:
+            reject(str(error))
+            return False
+        finally:
+            day.refreshTimeline()
+        return True
+
+    # applies an event dictionary to the open day. A ValueError is raised for an event that is malformed, out of time
+    # order, or cannot be applied to the day as it stands. Parsed times and deadlines are kept in the given caches
+    #
+    # time complexity = O(t * p), plus the time to advance the day, space complexity = O(p)
+    @staticmethod
+    def applyEvent(day, event, timeCache, deadlineCache):
+        if not isinstance(event, dict):
+            raise ValueError("Event must be a JSON object")
+        eventType = event.get("type")
+        if eventType not in EventStream.requiredFields:
+            raise ValueError("Unknown event type '" + str(eventType) + "' - expected one of " +
+                             ", ".join(EventStream.requiredFields))
+        missingFields = [field for field in ("time",) + EventStream.requiredFields[eventType] if field not in event]
+        if missingFields:
+            raise ValueError("A " + eventType + " event needs the fields " + ", ".join(missingFields))
+        minute = EventStream.parseTime(event["time"], timeCache)
+
+        if eventType == "package-arrives":
+            day.receivePackage(EventStream.getID(event, "package_id"), minute)
+        elif eventType == "address-corrected":
+            day.correctAddress(EventStream.getID(event, "package_id"), minute, event["address"], event.get("city"),
+                               event.get("state"), event.get("zip"))
+        elif eventType == "truck-breakdown":
+            repairMinutes = event.get("repair_minutes", EventStream.defaultRepairMinutes)
+            if not isinstance(repairMinutes, int) or isinstance(repairMinutes, bool):
+                raise ValueError("repair_minutes must be a whole number of minutes")
+            day.breakDownTruck(EventStream.getID(event, "truck_id"), minute, repairMinutes)
+        else:
+            deadline = PackageInit.parseDeadline(str(event["deadline"]), deadlineCache)
+            if deadline is None:
+                raise ValueError("deadline '" + str(event["deadline"]) + "' is not 'EOD' or a time like '10:30 AM'")
+            truckID = EventStream.getID(event, "truck_id") if event.get("truck_id") is not None else None
+            day.addPackage(minute, EventStream.getID(event, "package_id"), event["address"], str(event["city"]),
+                           str(event["state"]), str(event["zip"]), deadline, float(event["mass"]),
+                           str(event.get("notes", "")), truckID)
+
+    # returns the non-negative integer ID in the given field of an event
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def getID(event, field):
+        value = event[field]
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise ValueError(field + " must be a non-negative integer")
+        return value
+
+    # converts an event's time into minutes since midnight. Times may be given as an integer number of minutes, or as a
+    # string in format 'H:MM <AM/PM>', and parsed strings are kept in the time cache
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def parseTime(eventTime, timeCache):
+        if isinstance(eventTime, int) and not isinstance(eventTime, bool) and 0 <= eventTime < 1440:
+            return eventTime
+        if isinstance(eventTime, str):
+            if eventTime not in timeCache:
+                timeStr = eventTime.strip()
+                timeCache[eventTime] = Clock.convertTimeToInt(timeStr) if Clock.getValidInput(timeStr) else None
+            if timeCache[eventTime] is not None:
+                return timeCache[eventTime]
+        raise ValueError("time must be minutes since midnight or a string in format 'H:MM <AM/PM>'")
+
+    # the default handling of a rejected event - a line describing it is written to standard error
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def reportRejectedEvent(eventNumber, event, reason):
+        print("Skipped event " + str(eventNumber) + ": " + reason, file=sys.stderr)
@@ -0,0 +1,220 @@
+import os
+import sys
+
+import numpy as np
+
+from Clock import Clock
+from Status import PackageStatus
+
+
+# the fleet status matrix reports the status of every package and the miles of every truck at every step of the day at
+# once, for dashboards that chart the whole day rather than ask about one package at one time. The times each package
+# was loaded and delivered, and every truck's stop arrival times and miles, are gathered from the timeline into flat
+# NumPy arrays, and a block of time steps is then compared against all of them together by broadcasting. Each block is
+# written out as soon as it is calculated, so the whole matrix is never held in memory at once.
+#
+# statuses are written as their PackageStatus codes - 0 at the Hub, 1 en route, 2 delivered - and miles are rounded to
+# 2 decimal places, as in status queries. Two output formats are supported:
+#
+#   csv       -   one row per time step, with the columns 'minute', 'time', one 'package ID' column per package, one
+#                 'truck ID miles' column per truck, and 'total miles'
+#   columns   -   a directory holding one NumPy .npy file per column - minute, package_id, package_truck,
+#                 package_status (steps x packages), truck_id, truck_miles (steps x trucks) and total_miles - which can
+#                 be opened with numpy.load(path, mmap_mode='r') without reading the rest of the file
+class FleetStatusMatrix:
+
+    # most cells (time steps x packages, or time steps x trucks) calculated in a single block
+    blockSize = 1 << 22
+
+    # the output formats that can be written
+    formats = ("csv", "columns")
+
+    # gathers the package and truck arrays from the given timeline, which may be a simulated day's timeline or one
+    # opened from the day archive
+    #
+    # time complexity = O(n + s), where s is the number of stops of every truck, space complexity = O(n + s)
+    def __init__(self, timeline):
+        self.packageIDs = np.array(sorted(timeline.packageEvents), dtype=np.int64)
+        self.loadTimes, self.deliveryTimes, self.packageTrucks = \
+            FleetStatusMatrix.getPackageTimes(timeline, self.packageIDs.tolist())
+
+        self.truckIDs = np.array(timeline.truckIDs, dtype=np.int64)
+        self.stopTimes, self.stopMiles, self.firstStops, self.lastStops = \
+            FleetStatusMatrix.getTruckStops(timeline, timeline.truckIDs)
+
+        # by default the matrix covers the day from the first truck leaving the Hub until the last one returns
+        departures = [times[1] for times, states in (timeline.truckEvents[truckID] for truckID in timeline.truckIDs)
+                      if len(times) > 1]
+        self.firstMinute = min(departures, default=0)
+        self.lastMinute = max(int(self.stopTimes.max(initial=self.firstMinute)), self.firstMinute)
+
+    # returns arrays of the minute each package was loaded, the minute it was delivered, and the truck it was loaded
+    # onto, in the order of the given package IDs. A package never loaded or never delivered has a time past the end
+    # of any day, and a package never loaded has truck 0
+    #
+    # time and space complexity = O(n)
+    @staticmethod
+    def getPackageTimes(timeline, packageIDs):
+        noTime = np.iinfo(np.int64).max
+        loadTimes = np.full(len(packageIDs), noTime, dtype=np.int64)
+        deliveryTimes = np.full(len(packageIDs), noTime, dtype=np.int64)
+        packageTrucks = np.zeros(len(packageIDs), dtype=np.int64)
+        for index, pkgID in enumerate(packageIDs):
+            times, states = timeline.packageEvents[pkgID]
+            for eventTime, (status, truckID) in zip(times, states):
+                if status == PackageStatus.EN_ROUTE:
+                    loadTimes[index] = eventTime
+                    packageTrucks[index] = truckID
+                elif status == PackageStatus.DELIVERED:
+                    deliveryTimes[index] = eventTime
+        return loadTimes, deliveryTimes, packageTrucks
+
+    # returns every truck's stop arrival times and miles joined into two flat arrays, one truck after another in the
+    # order of the given truck IDs, and the index of each truck's first stop and one past its last stop in them
+    #
+    # time and space complexity = O(t + s)
+    @staticmethod
+    def getTruckStops(timeline, truckIDs):
+        stopTimes, stopMiles, firstStops, lastStops = [], [], [], []
+        for truckID in truckIDs:
+            times, miles, locations = timeline.truckStops[truckID]
+            firstStops.append(len(stopTimes))
+            stopTimes.extend(times)
+            stopMiles.extend(miles)
+            lastStops.append(len(stopTimes))
+        return (np.array(stopTimes, dtype=np.int64), np.array(stopMiles, dtype=float),
+                np.array(firstStops, dtype=np.int64), np.array(lastStops, dtype=np.int64))
+
+    # returns the minutes since midnight of each time step, from the first minute to the last, inclusive - the last
+    # minute is included even when the steps from the first do not land on it. Either end left as None is the start or
+    # end of the fleet's day
+    #
+    # time and space complexity = O(m), where m is the number of time steps
+    def getMinutes(self, step=1, firstMinute=None, lastMinute=None):
+        if step < 1:
+            raise ValueError("The time step must be at least 1 minute, got " + str(step))
+        firstMinute = self.firstMinute if firstMinute is None else firstMinute
+        lastMinute = self.lastMinute if lastMinute is None else lastMinute
+        minutes = np.arange(firstMinute, lastMinute + 1, step, dtype=np.int64)
+        if len(minutes) and minutes[-1] != lastMinute:
+            minutes = np.append(minutes, np.int64(lastMinute))
+        return minutes
+
+    # returns the status code of every package at each of the given minutes, as an array of (minutes x packages). A
+    # package is en route once the minute reaches its load time, and delivered once it reaches its delivery time
+    #
+    # time and space complexity = O(m * n)
+    def getPackageStatuses(self, minutes):
+        minutes = minutes[:, np.newaxis]
+        statuses = (minutes >= self.loadTimes).astype(np.int8)
+        statuses += minutes >= self.deliveryTimes
+        return statuses
+
+    # returns the miles every truck has driven at each of the given minutes, as an array of (minutes x trucks), with
+    # the same interpolation as DeliveryTimeline.getTruckMileage. Each truck's stops are offset by the truck's position
+    # times a span longer than any time searched, so a single binary search over the flat stop arrays finds the last
+    # stop every truck reached at every minute, without searching past the truck's own stops
+    #
+    # time complexity = O(m * t * log s), space complexity = O(m * t)
+    def getTruckMiles(self, minutes):
+        numTrucks = len(self.truckIDs)
+        if numTrucks == 0 or len(self.stopTimes) == 0:
+            return np.zeros((len(minutes), numTrucks))
+
+        base = min(int(self.stopTimes.min()), int(minutes.min()))
+        span = max(int(self.stopTimes.max()), int(minutes.max())) - base + 1
+        truckOffsets = np.repeat(np.arange(numTrucks, dtype=np.int64) * span, self.lastStops - self.firstStops)
+        stopKeys = truckOffsets + (self.stopTimes - base)
+        minuteKeys = np.arange(numTrucks, dtype=np.int64) * span + (minutes[:, np.newaxis] - base)
+        stopIndex = np.searchsorted(stopKeys, minuteKeys, side="right") - 1
+
+        # a truck that has not reached its first stop has driven no miles, and one past its last stop has driven all
+        # of them. Everywhere else, the miles of the leg being driven are interpolated by the fraction of its drive
+        # time that has passed
+        started = stopIndex >= self.firstStops
+        driving = started & (stopIndex < self.lastStops - 1)
+        stopIndex = np.clip(stopIndex, 0, len(self.stopTimes) - 1)
+        nextIndex = np.where(driving, stopIndex + 1, stopIndex)
+        legMinutes = np.where(driving, self.stopTimes[nextIndex] - self.stopTimes[stopIndex], 1)
+        legFraction = (minutes[:, np.newaxis] - self.stopTimes[stopIndex]) / legMinutes
+        miles = self.stopMiles[stopIndex] + np.where(driving, legFraction, 0.0) * \
+            (self.stopMiles[nextIndex] - self.stopMiles[stopIndex])
+        return np.where(started, miles, 0.0)
+
+    # yields (minutes, package statuses, truck miles) for the given minutes, a block of time steps at a time
+    #
+    # time complexity = O(m * (n + t log s)), space complexity = O((n + t) * b), where b is the number of time steps
+    # in a block
+    def getBlocks(self, minutes):
+        stepsPerBlock = max(1, FleetStatusMatrix.blockSize // max(len(self.packageIDs), len(self.truckIDs), 1))
+        for start in range(0, len(minutes), stepsPerBlock):
+            blockMinutes = minutes[start:start + stepsPerBlock]
+            yield blockMinutes, self.getPackageStatuses(blockMinutes), self.getTruckMiles(blockMinutes)
+
+    # writes the matrix for the given minutes to the output stream as csv, one row per time step. The status columns
+    # of each row are written straight from the status codes' bytes, since every code is a single digit
+    #
+    # time complexity = O(m * (n + t log s)), space complexity = O((n + t) * b)
+    def writeCsv(self, outputStream, minutes):
+        header = ["minute", "time"] + ["package " + str(pkgID) for pkgID in self.packageIDs.tolist()] + \
+                 ["truck " + str(truckID) + " miles" for truckID in self.truckIDs.tolist()] + ["total miles"]
+        outputStream.write(",".join(header) + "\n")
+        numPackages = len(self.packageIDs)
+        for blockMinutes, statuses, miles in self.getBlocks(minutes):
+            statusText = np.full((len(blockMinutes), 2 * numPackages), ord(","), dtype=np.uint8)
+            statusText[:, 0::2] = statuses + ord("0")
+            rows = []
+            for row, minute in enumerate(blockMinutes.tolist()):
+                truckMiles = miles[row].tolist()
+                rows.append(str(minute) + "," + Clock.convertIntToTime(minute) + "," +
+                            statusText[row].tobytes().decode("ascii") +
+                            "".join(str(round(truckMile, 2)) + "," for truckMile in truckMiles) +
+                            str(round(sum(truckMiles), 2)) + "\n")
+            outputStream.writelines(rows)
+
+    # writes the matrix for the given minutes to the given directory as one .npy file per column. The matrix columns
+    # are opened as memory mapped files first, and each block is written into them as it is calculated
+    #
+    # time complexity = O(m * (n + t log s)), space complexity = O((n + t) * b)
+    def writeColumns(self, directory, minutes):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "minute.npy"), minutes)
+        np.save(os.path.join(directory, "package_id.npy"), self.packageIDs)
+        np.save(os.path.join(directory, "package_truck.npy"), self.packageTrucks)
+        np.save(os.path.join(directory, "truck_id.npy"), self.truckIDs)
+        packageStatus = np.lib.format.open_memmap(os.path.join(directory, "package_status.npy"), mode="w+",
+                                                  dtype=np.int8, shape=(len(minutes), len(self.packageIDs)))
+        truckMiles = np.lib.format.open_memmap(os.path.join(directory, "truck_miles.npy"), mode="w+",
+                                               dtype=float, shape=(len(minutes), len(self.truckIDs)))
+        totalMiles = np.lib.format.open_memmap(os.path.join(directory, "total_miles.npy"), mode="w+",
+                                               dtype=float, shape=(len(minutes),))
+        start = 0
+        for blockMinutes, statuses, miles in self.getBlocks(minutes):
+            end = start + len(blockMinutes)
+            packageStatus[start:end] = statuses
+            truckMiles[start:end] = miles.round(2)
+            totalMiles[start:end] = miles.sum(axis=1).round(2)
+            start = end
+        for column in (packageStatus, truckMiles, totalMiles):
+            column.flush()
+
+    # writes the matrix of the given timeline at every step of the given number of minutes to the given path - a file
+    # (or '-', for standard output) for csv, or a directory for columns
+    #
+    # time complexity = O(m * (n + t log s)), space complexity = O(n + s + (n + t) * b)
+    @staticmethod
+    def export(timeline, path, outputFormat="csv", step=1, firstMinute=None, lastMinute=None):
+        if outputFormat not in FleetStatusMatrix.formats:
+            raise ValueError("The output format must be one of " + ", ".join(FleetStatusMatrix.formats) + ", got '" +
+                             str(outputFormat) + "'")
+        matrix = FleetStatusMatrix(timeline)
+        minutes = matrix.getMinutes(step, firstMinute, lastMinute)
+        if outputFormat == "columns":
+            matrix.writeColumns(path, minutes)
+            return
+        outputStream = sys.stdout if path == "-" else open(path, 'w', newline="")
+        try:
+            matrix.writeCsv(outputStream, minutes)
+        finally:
+            if outputStream is not sys.stdout:
+                outputStream.close()
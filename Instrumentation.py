@@ -0,0 +1,177 @@
+import contextlib
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+
+
+# instrumentation records where the time goes in the delivery day. Each stage of the day - reading the csv files,
+# planning the loads, and for each truck gathering its packages, building its distance matrix, determining its route
+# and driving it - is wrapped in Instrumentation.stage, which records the wall time spent in the stage and the number
+# of times it ran, both for the stage overall and for each truck. Optionally, the peak memory allocated in each stage
+# is recorded too, and the whole run can be profiled with cProfile.
+#
+# instrumentation is off unless turned on with the WGUPS_INSTRUMENT environment variable or the --instrument option,
+# given a comma separated list of modes:
+#
+#   summary   -   wall time and call counts for each stage, written as a JSON summary
+#   memory    -   adds the peak bytes allocated in each stage, found with tracemalloc, and dumps a tracemalloc snapshot
+#   cprofile  -   adds a cProfile dump of every function called
+#
+# while it is off, a stage costs a single check and no time is measured, so the hooks can stay in place for good
+class Instrumentation:
+
+    modes = ("summary", "memory", "cprofile")
+    environmentVariable = "WGUPS_INSTRUMENT"
+    outputEnvironmentVariable = "WGUPS_INSTRUMENT_OUTPUT"
+
+    # the summary is written to this path, and the dumps next to it with their own extensions
+    defaultOutputPath = "instrumentation.json"
+    profileSuffix = ".prof"
+    snapshotSuffix = ".tracemalloc"
+
+    # the recorder in use, or None while instrumentation is off
+    recorder = None
+
+    # the stage handed out while instrumentation is off, which does nothing
+    disabledStage = contextlib.nullcontext()
+
+    # turns instrumentation on with the given comma separated modes, or with those in the environment variable if none
+    # are given. Does nothing if neither names a mode. Raises a ValueError for an unknown mode
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def configure(modes=None, outputPath=None):
+        if modes is None:
+            modes = os.environ.get(Instrumentation.environmentVariable, "")
+        modeSet = {mode.strip().lower() for mode in modes.split(",") if mode.strip()}
+        if not modeSet or modeSet & {"0", "off", "false"}:
+            Instrumentation.recorder = None
+            return
+        if modeSet & {"1", "on", "true"}:
+            modeSet = (modeSet - {"1", "on", "true"}) | {"summary"}
+        unknownModes = modeSet - set(Instrumentation.modes)
+        if unknownModes:
+            raise ValueError("Unknown instrumentation mode " + ", ".join(sorted(unknownModes)) + " - expected one of " +
+                             ", ".join(Instrumentation.modes))
+        if outputPath is None:
+            outputPath = os.environ.get(Instrumentation.outputEnvironmentVariable, Instrumentation.defaultOutputPath)
+        Instrumentation.recorder = StageRecorder(modeSet, outputPath)
+
+    # returns whether instrumentation is on
+    @staticmethod
+    def isEnabled():
+        return Instrumentation.recorder is not None
+
+    # returns a context manager that records the time spent in the stage with the given name - and in the given truck's
+    # share of that stage, if a truck ID is given
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def stage(name, truckID=None):
+        if Instrumentation.recorder is None:
+            return Instrumentation.disabledStage
+        return Instrumentation.recorder.stage(name, truckID)
+
+    # stops recording, writes the summary and any dumps, and turns instrumentation off. Returns the summary, or None if
+    # instrumentation was off
+    #
+    # time and space complexity = O(s), where s is the number of stages recorded
+    @staticmethod
+    def finish():
+        recorder = Instrumentation.recorder
+        if recorder is None:
+            return None
+        Instrumentation.recorder = None
+        return recorder.finish()
+
+
+# records the stages of a single instrumented run. Created by Instrumentation.configure
+class StageRecorder:
+
+    def __init__(self, modes, outputPath):
+        self.modes = modes
+        self.outputPath = outputPath
+        self.startTime = time.perf_counter()
+
+        # totals for each stage, and for each truck's share of each stage, as [calls, seconds, peak bytes]
+        self.stageTotals = dict()
+        self.truckTotals = dict()
+
+        # the highest traced memory seen so far in each open stage. Each stage resets the tracemalloc peak as it
+        # begins, so the peak reached by the enclosing stage before then is kept here
+        self.openPeaks = []
+
+        self.tracingMemory = "memory" in modes and not tracemalloc.is_tracing()
+        if self.tracingMemory:
+            tracemalloc.start()
+        self.profiler = None
+        if "cprofile" in modes:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    # records one run of a stage
+    @contextlib.contextmanager
+    def stage(self, name, truckID=None):
+        startMemory = 0
+        if self.tracingMemory:
+            startMemory, peakBefore = tracemalloc.get_traced_memory()
+            if self.openPeaks:
+                self.openPeaks[-1] = max(self.openPeaks[-1], peakBefore)
+            self.openPeaks.append(startMemory)
+            tracemalloc.reset_peak()
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - startTime
+            peakBytes = 0
+            if self.tracingMemory:
+                peak = max(tracemalloc.get_traced_memory()[1], self.openPeaks.pop())
+                if self.openPeaks:
+                    self.openPeaks[-1] = max(self.openPeaks[-1], peak)
+                peakBytes = peak - startMemory
+            self.addTotal(self.stageTotals, name, seconds, peakBytes)
+            if truckID is not None:
+                self.addTotal(self.truckTotals.setdefault(truckID, dict()), name, seconds, peakBytes)
+
+    # adds one run of a stage to a dictionary of totals
+    @staticmethod
+    def addTotal(totals, name, seconds, peakBytes):
+        total = totals.setdefault(name, [0, 0.0, 0])
+        total[0] += 1
+        total[1] += seconds
+        total[2] = max(total[2], peakBytes)
+
+    # stops the profilers and writes the summary and dumps
+    def finish(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.getDumpPath(Instrumentation.profileSuffix))
+        if self.tracingMemory:
+            tracemalloc.take_snapshot().dump(self.getDumpPath(Instrumentation.snapshotSuffix))
+            tracemalloc.stop()
+
+        summary = {"modes": sorted(self.modes),
+                   "totalSeconds": round(time.perf_counter() - self.startTime, 6),
+                   "stages": self.describeTotals(self.stageTotals),
+                   "trucks": {str(truckID): self.describeTotals(totals)
+                              for truckID, totals in sorted(self.truckTotals.items())}}
+        with open(self.outputPath, 'w') as write_obj:
+            json.dump(summary, write_obj, indent=2)
+        return summary
+
+    # converts a dictionary of totals into the form written to the summary. Peak bytes are only given when memory was
+    # traced
+    def describeTotals(self, totals):
+        described = dict()
+        for name, (calls, seconds, peakBytes) in totals.items():
+            described[name] = {"calls": calls, "seconds": round(seconds, 6)}
+            if self.tracingMemory:
+                described[name]["peakBytes"] = peakBytes
+        return described
+
+    # returns the path a dump is written to - the summary's path, with its extension replaced by the given suffix
+    def getDumpPath(self, suffix):
+        return os.path.splitext(self.outputPath)[0] + suffix
@@ -0,0 +1,417 @@
+import bisect
+import collections
+import heapq
+import math
+import re
+
+import numpy as np
+
+from Clock import Clock
+
+
+# the load planner decides which packages are loaded onto which truck, based on the special notes attached to each
+# package in the package data csv file. The notes it honors are:
+#
+#   "Can only be on truck N"                    -   the package is pinned to truck N
+#   "Must be delivered with X, Y"               -   the package and packages X and Y must all be on the same truck
+#   "Delayed ... until 9:05 am"                 -   the package is not at the Hub until the given time
+#   "Wrong address listed"                      -   the package cannot be delivered until its address is corrected, and
+#                                                   is held at the Hub if no time is known for the correction
+#   "Previously incorrect address - corrected at 10:20 AM"  -   as above, with the time of the correction given
+#
+# packages that must travel together are joined into groups with a union-find structure, so grouping takes close to
+# O(n) time no matter how many packages or how many notes there are. Packages headed to the same address are also
+# grouped where possible, so that each address is visited by as few trucks as possible
+class LoadPlanner:
+
+    pinnedTruckPattern = re.compile(r"only be on truck (\d+)", re.IGNORECASE)
+    deliveredWithPattern = re.compile(r"delivered with ([\d,\s]+)", re.IGNORECASE)
+    timeInNotePattern = re.compile(r"(\d{1,2}:\d{2} [ap]m)", re.IGNORECASE)
+
+    maxImprovementPasses = 10
+
+    # returns the truck ID a package is pinned to by its notes, or None if it may be loaded onto any truck
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def getPinnedTruck(pkg):
+        match = LoadPlanner.pinnedTruckPattern.search(pkg.notes)
+        return int(match.group(1)) if match else None
+
+    # returns the time in minutes since midnight at which a package is ready to leave the Hub. Delayed packages are
+    # ready once they arrive at the depot, and packages with a wrong address once the address has been corrected. A
+    # wrong address is corrected at the time given for the package in addressCorrectionTimes, which maps package IDs
+    # to minutes since midnight - a wrong address with no known correction time is never ready, and math.inf is
+    # returned, so the package is held at the Hub rather than delivered to an address known to be wrong
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def getAvailableTime(pkg, addressCorrectionTimes=None):
+        notes = pkg.notes.lower()
+        if "delayed" in notes or "corrected at" in notes:
+            match = LoadPlanner.timeInNotePattern.search(pkg.notes)
+            if match:
+                return Clock.convertTimeToInt(match.group(1))
+        if "wrong address" in notes:
+            return (addressCorrectionTimes or {}).get(pkg.pkgID, math.inf)
+        return 0
+
+    # returns True if a group of packages must be held at the Hub, since one of them has a wrong address with no known
+    # correction time. Held groups are left out of every truck's load
+    #
+    # time and space complexity = O(g), where g is the number of packages in the group
+    @staticmethod
+    def isHeld(group, packagesByID, addressCorrectionTimes=None):
+        return any(LoadPlanner.getAvailableTime(packagesByID[pkgID], addressCorrectionTimes) == math.inf
+                   for pkgID in group)
+
+    # returns True if a package's address is known to be wrong and has not yet been corrected
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def hasWrongAddress(pkg):
+        return "wrong address" in pkg.notes.lower()
+
+    # returns the IDs of the other packages a package must be delivered with
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def getDeliveredWith(pkg):
+        match = LoadPlanner.deliveredWithPattern.search(pkg.notes)
+        if not match:
+            return []
+        return [int(pkgID) for pkgID in re.findall(r"\d+", match.group(1))]
+
+    # builds the load for every truck. truckDepartures maps each truck ID to the time in minutes since midnight at which
+    # it is planned to leave the Hub - or None for trucks that wait for a driver to return, which are treated as
+    # leaving after every truck with a planned time. Returns a dictionary mapping each truck ID to the list of package
+    # IDs to load onto it - packages held at the Hub for a wrong address with no known correction time are not in any
+    # load. If the distance matrix is given, the loads are then shortened by improveLoads. A ValueError is raised if
+    # the packages cannot all be loaded without breaking a constraint
+    #
+    # time complexity = O(n log n) when trucks have room to spare, plus the time of improveLoads. Space complexity = O(n)
+    @staticmethod
+    def planLoads(packages, truckDepartures, maxPkgsPerTruck, addressCorrectionTimes=None, distMatrix=None):
+        packagesByID = {pkg.pkgID: pkg for pkg in packages}
+        groups = [group for group in LoadPlanner.groupPackages(packagesByID, maxPkgsPerTruck, addressCorrectionTimes)
+                  if not LoadPlanner.isHeld(group, packagesByID, addressCorrectionTimes)]
+
+        # trucks are ordered by departure, with the trucks that wait for a driver last, in truck ID order. From here on,
+        # a truck is referred to by its position in this order
+        truckOrder = sorted(truckDepartures, key=lambda truckID: (truckDepartures[truckID] is None,
+                                                                  truckDepartures[truckID] or 0, truckID))
+        positionOfTruck = {truckID: position for position, truckID in enumerate(truckOrder)}
+        departures = [truckDepartures[truckID] if truckDepartures[truckID] is not None else math.inf
+                      for truckID in truckOrder]
+        loads = [[] for _ in truckOrder]
+
+        # nextNotFull[i] points at or toward the first truck at or after position i that is not yet full - full trucks
+        # are skipped over, with path compression, so the search for a truck with room never rescans them
+        nextNotFull = list(range(len(truckOrder) + 1))
+
+        # index of the trucks already stopping at each location, and a heap of trucks ordered by how full they are
+        trucksAtLocation = {}
+        emptiestTrucks = [(0, position) for position in range(len(truckOrder))]
+
+        groupInfo = [(group,) + LoadPlanner.describeGroup(group, packagesByID, truckDepartures, addressCorrectionTimes)
+                     for group in groups]
+
+        # the most constrained groups are placed first - pinned groups, then groups by earliest deadline, with larger
+        # groups ahead of smaller ones, so that the hardest groups to fit claim truck space before it runs out
+        groupInfo.sort(key=lambda info: (info[1] is None, info[3], -len(info[0]), min(info[0])))
+
+        endOfDay = Clock.convertTimeToInt("EOD")
+        for group, pinnedTruck, availableTime, deadline in groupInfo:
+            groupLocations = {packagesByID[pkgID].deliveryLocationID for pkgID in group}
+            roomNeeded = maxPkgsPerTruck - len(group)
+
+            # a group waiting on a delay or an address correction should go on a truck that leaves after it is ready,
+            # so the search begins at the first such truck
+            firstReady = bisect.bisect_left(departures, availableTime)
+
+            if pinnedTruck is not None:
+                chosen = positionOfTruck[pinnedTruck]
+                if len(loads[chosen]) > roomNeeded:
+                    chosen = None
+
+            # groups with a deadline go on the earliest leaving truck with room
+            elif deadline < endOfDay:
+                chosen = LoadPlanner.findFirstWithRoom(loads, nextNotFull, firstReady, roomNeeded)
+
+            # for the rest, a truck already stopping at one of the group's addresses is preferred, since adding those
+            # packages adds no new stop, and otherwise the truck with the most room left is used
+            else:
+                sharingTrucks = [position for location in groupLocations
+                                 for position in trucksAtLocation.get(location, ())
+                                 if position >= firstReady and len(loads[position]) <= roomNeeded]
+                chosen = min(sharingTrucks) if sharingTrucks else LoadPlanner.findEmptiest(emptiestTrucks, loads,
+                                                                                          firstReady, roomNeeded)
+
+            # if no truck with room leaves after the group is ready, the group is left to the latest leaving truck
+            # with room, which will wait for it
+            if chosen is None and pinnedTruck is None:
+                chosen = next((position for position in range(len(loads) - 1, -1, -1)
+                               if len(loads[position]) <= roomNeeded), None)
+            if chosen is None:
+                raise ValueError("No truck has room for packages " + str(sorted(group)))
+
+            loads[chosen].extend(group)
+            if len(loads[chosen]) >= maxPkgsPerTruck:
+                nextNotFull[chosen] = chosen + 1
+            heapq.heappush(emptiestTrucks, (len(loads[chosen]), chosen))
+            for location in groupLocations:
+                trucksAtLocation.setdefault(location, set()).add(chosen)
+
+        if distMatrix is not None:
+            LoadPlanner.improveLoads(loads, groupInfo, packagesByID, departures, maxPkgsPerTruck, distMatrix)
+        return {truckID: sorted(loads[position]) for position, truckID in enumerate(truckOrder)}
+
+    # improves the planned loads by moving groups between trucks to shorten the routes. Each truck's route is estimated
+    # by visiting its stops nearest first from the Hub, and a group without a deadline or pinned truck, whose packages
+    # all go to one address, moves to the truck that can add that address for fewer miles than its own truck saves by
+    # dropping it - a truck already stopping at the address adds no miles. Only a truck that leaves after the group is
+    # ready and has room for it is considered. A truck changed by a move is left alone for the rest of the pass, so the
+    # route estimates used for the others stay accurate, and passes repeat until no group moves or the limit is reached
+    #
+    # time complexity = O(p * (g * (e + t) + s^2)) for p passes, g movable groups, e route legs, t trucks and s stops
+    # on the largest route. Space complexity = O(n)
+    @staticmethod
+    def improveLoads(loads, groupInfo, packagesByID, departures, maxPkgsPerTruck, distMatrix):
+        endOfDay = Clock.convertTimeToInt("EOD")
+        movableGroups = []
+        for group, pinnedTruck, availableTime, deadline in groupInfo:
+            groupLocations = {packagesByID[pkgID].deliveryLocationID for pkgID in group}
+            if pinnedTruck is None and deadline >= endOfDay and len(groupLocations) == 1 and 0 not in groupLocations:
+                movableGroups.append((group, groupLocations.pop(), availableTime))
+        if not movableGroups:
+            return
+
+        positionOfPackage = {pkgID: position for position, load in enumerate(loads) for pkgID in load}
+        stopCounts = [collections.Counter(packagesByID[pkgID].deliveryLocationID for pkgID in load) for load in loads]
+        routes = [LoadPlanner.estimateRoute(stopCount, distMatrix) for stopCount in stopCounts]
+        trucksAtLocation = {}
+        for position, stopCount in enumerate(stopCounts):
+            for location in stopCount:
+                trucksAtLocation.setdefault(location, set()).add(position)
+        departures = np.array(departures, dtype=np.float64)
+        sizes = np.array([len(load) for load in loads])
+
+        for _ in range(LoadPlanner.maxImprovementPasses):
+            # every leg of every route, one after another, with the index of each route's first leg
+            legStarts = np.array([location for route in routes for location in route[:-1]], dtype=np.int64)
+            legEnds = np.array([location for route in routes for location in route[1:]], dtype=np.int64)
+            legMiles = np.array([distMatrix.distance(start, end) for start, end in zip(legStarts.tolist(),
+                                                                                       legEnds.tolist())])
+            firstLegs = np.cumsum([0] + [len(route) - 1 for route in routes[:-1]])
+
+            changed = np.zeros(len(loads), dtype=bool)
+            for group, location, availableTime in movableGroups:
+                source = positionOfPackage[group[0]]
+                if changed[source] or stopCounts[source][location] != len(group):
+                    continue
+                route = routes[source]
+                index = route.index(location)
+                before, after = route[index - 1], route[index + 1]
+                saving = (distMatrix.distance(before, location) + distMatrix.distance(location, after)
+                          - distMatrix.distance(before, after))
+
+                # the cheapest leg of each route to add the address to
+                distances = distMatrix[location]
+                addedMiles = np.minimum.reduceat(distances[legStarts] + distances[legEnds] - legMiles, firstLegs)
+                addedMiles[list(trucksAtLocation[location])] = 0
+                allowed = (departures >= availableTime) & (sizes + len(group) <= maxPkgsPerTruck) & ~changed
+                allowed[source] = False
+                target = int(np.argmin(np.where(allowed, addedMiles, np.inf)))
+                if not allowed[target] or addedMiles[target] >= saving - 1e-9:
+                    continue
+
+                for pkgID in group:
+                    loads[source].remove(pkgID)
+                    positionOfPackage[pkgID] = target
+                loads[target].extend(group)
+                sizes[source] -= len(group)
+                sizes[target] += len(group)
+                del stopCounts[source][location]
+                route.pop(index)
+                trucksAtLocation[location].discard(source)
+                if location not in stopCounts[target]:
+                    LoadPlanner.insertCheapest(routes[target], location, distMatrix)
+                    trucksAtLocation[location].add(target)
+                stopCounts[target][location] += len(group)
+                changed[source] = changed[target] = True
+            if not changed.any():
+                break
+
+    # returns an estimated route from the Hub through the given locations and back, visiting the nearest location next
+    #
+    # time complexity = O(s^2) for s locations, space complexity = O(s)
+    @staticmethod
+    def estimateRoute(locations, distMatrix):
+        route = [0]
+        remaining = sorted(set(locations) - {0})
+        while remaining:
+            distances = distMatrix.subMatrix([route[-1]], remaining)[0]
+            route.append(remaining.pop(int(np.argmin(distances))))
+        route.append(0)
+        return route
+
+    # adds a location to a route between the two stops where it adds the fewest miles
+    #
+    # time complexity = O(s) for s stops on the route, space complexity = O(s)
+    @staticmethod
+    def insertCheapest(route, location, distMatrix):
+        addedMiles = [distMatrix.distance(route[i], location) + distMatrix.distance(location, route[i + 1])
+                      - distMatrix.distance(route[i], route[i + 1]) for i in range(len(route) - 1)]
+        route.insert(addedMiles.index(min(addedMiles)) + 1, location)
+
+    # returns (pinned truck ID, available time, deadline) for a group of packages - the truck any of them is pinned to,
+    # or None, the time the last of them is ready to leave the Hub, and the earliest of their deadlines. A ValueError
+    # is raised if the group is pinned to more than one truck, or to a truck that is not in service
+    #
+    # time and space complexity = O(g), where g is the number of packages in the group
+    @staticmethod
+    def describeGroup(group, packagesByID, truckDepartures, addressCorrectionTimes=None):
+        pins = {LoadPlanner.getPinnedTruck(packagesByID[pkgID]) for pkgID in group} - {None}
+        if len(pins) > 1:
+            raise ValueError("Packages " + str(sorted(group)) + " must travel together but are pinned to trucks "
+                             + str(sorted(pins)))
+        pinnedTruck = pins.pop() if pins else None
+        if pinnedTruck is not None and pinnedTruck not in truckDepartures:
+            raise ValueError("Packages " + str(sorted(group)) + " are pinned to truck " + str(pinnedTruck) +
+                             ", which is not in service")
+        availableTime = max(LoadPlanner.getAvailableTime(packagesByID[pkgID], addressCorrectionTimes)
+                            for pkgID in group)
+        deadline = min(packagesByID[pkgID].deliveryDeadline for pkgID in group)
+        return pinnedTruck, availableTime, deadline
+
+    # returns the position of the first truck at or after the given position that holds no more than maxLoad packages,
+    # or None if there is no such truck
+    #
+    # time complexity = O(log t) amortized when trucks fill up in order, O(t) at worst. Space complexity = O(1)
+    @staticmethod
+    def findFirstWithRoom(loads, nextNotFull, start, maxLoad):
+        position = LoadPlanner.skipFullTrucks(nextNotFull, start)
+        while position < len(loads):
+            if len(loads[position]) <= maxLoad:
+                return position
+            position = LoadPlanner.skipFullTrucks(nextNotFull, position + 1)
+        return None
+
+    # follows the skip pointers from the given position to the first truck that is not full, compressing the path
+    # behind it
+    #
+    # time complexity = O(log t) amortized, space complexity = O(1)
+    @staticmethod
+    def skipFullTrucks(nextNotFull, position):
+        root = position
+        while nextNotFull[root] != root:
+            root = nextNotFull[root]
+        while nextNotFull[position] != root:
+            nextNotFull[position], position = root, nextNotFull[position]
+        return root
+
+    # returns the position of the least loaded truck at or after the given position that holds no more than maxLoad
+    # packages, or None if there is no such truck. The heap holds (load, position) entries - entries left behind by
+    # trucks that have since been loaded further are discarded as they surface
+    #
+    # time complexity = O(log t) amortized, space complexity = O(t)
+    @staticmethod
+    def findEmptiest(emptiestTrucks, loads, start, maxLoad):
+        skipped = []
+        chosen = None
+        while emptiestTrucks:
+            load, position = emptiestTrucks[0]
+            if load != len(loads[position]):
+                heapq.heappop(emptiestTrucks)
+                continue
+            if load > maxLoad:
+                break
+            if position >= start:
+                chosen = position
+                break
+            skipped.append(heapq.heappop(emptiestTrucks))
+        for entry in skipped:
+            heapq.heappush(emptiestTrucks, entry)
+        return chosen
+
+    # joins packages that must be delivered together into groups using union-find, then joins packages with the same
+    # delivery address whenever the joined group would still fit on one truck. Returns a list of groups, where each
+    # group is a list of package IDs
+    #
+    # time complexity = O(n * a(n)), which is effectively O(n). space complexity = O(n)
+    @staticmethod
+    def groupPackages(packagesByID, maxPkgsPerTruck, addressCorrectionTimes=None):
+        parent = {pkgID: pkgID for pkgID in packagesByID}
+        groupSize = {pkgID: 1 for pkgID in packagesByID}
+
+        def findRoot(pkgID):
+            root = pkgID
+            while parent[root] != root:
+                root = parent[root]
+
+            # path compression - every package on the path is pointed straight at the root for future lookups
+            while parent[pkgID] != root:
+                parent[pkgID], pkgID = root, parent[pkgID]
+            return root
+
+        def union(first, second):
+            firstRoot = findRoot(first)
+            secondRoot = findRoot(second)
+            if firstRoot == secondRoot:
+                return
+            if groupSize[firstRoot] < groupSize[secondRoot]:
+                firstRoot, secondRoot = secondRoot, firstRoot
+            parent[secondRoot] = firstRoot
+            groupSize[firstRoot] += groupSize[secondRoot]
+
+        for pkgID, pkg in packagesByID.items():
+            for otherID in LoadPlanner.getDeliveredWith(pkg):
+                if otherID not in packagesByID:
+                    raise ValueError("Package " + str(pkgID) + " must be delivered with package " + str(otherID) +
+                                     ", which is not in the manifest")
+                union(pkgID, otherID)
+
+        for pkgID in packagesByID:
+            if groupSize[findRoot(pkgID)] > maxPkgsPerTruck:
+                raise ValueError("Package " + str(pkgID) + " must be delivered with more packages than fit on a truck")
+
+        # packages sharing an address are joined only if they have no conflicting truck pins, are ready to leave the
+        # Hub at the same time, and share the same deadline. That way a package is never held back by a delayed package
+        # that happens to share its address, and packages without a deadline never take up room on the early trucks
+        # that the deadline packages need. A package with a wrong address is left out, since its listed address is not
+        # where it will be delivered
+        firstAtLocation = {}
+        pinOfGroup = {}
+        timesOfGroup = {}
+        for pkgID, pkg in packagesByID.items():
+            root = findRoot(pkgID)
+            pin = LoadPlanner.getPinnedTruck(pkg)
+            if pin is not None:
+                pinOfGroup[root] = pin
+            availableTime = LoadPlanner.getAvailableTime(pkg, addressCorrectionTimes)
+            groupAvailableTime, groupDeadline = timesOfGroup.get(root, (0, pkg.deliveryDeadline))
+            timesOfGroup[root] = (max(groupAvailableTime, availableTime), min(groupDeadline, pkg.deliveryDeadline))
+        for pkgID, pkg in packagesByID.items():
+            if LoadPlanner.hasWrongAddress(pkg):
+                continue
+            otherID = firstAtLocation.setdefault(pkg.deliveryLocationID, pkgID)
+            if otherID == pkgID:
+                continue
+            firstRoot = findRoot(pkgID)
+            secondRoot = findRoot(otherID)
+            firstPin = pinOfGroup.get(firstRoot)
+            secondPin = pinOfGroup.get(secondRoot)
+            if firstRoot == secondRoot or groupSize[firstRoot] + groupSize[secondRoot] > maxPkgsPerTruck:
+                continue
+            if firstPin is not None and secondPin is not None and firstPin != secondPin:
+                continue
+            if timesOfGroup[firstRoot] != timesOfGroup[secondRoot]:
+                continue
+            union(firstRoot, secondRoot)
+            pinOfGroup[findRoot(pkgID)] = firstPin if firstPin is not None else secondPin
+            timesOfGroup[findRoot(pkgID)] = timesOfGroup[firstRoot]
+
+        groups = {}
+        for pkgID in packagesByID:
+            groups.setdefault(findRoot(pkgID), []).append(pkgID)
+        return list(groups.values())
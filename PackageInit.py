@@ -1,46 +1,139 @@
 import csv
+import sys
+from itertools import islice
+
 from WGUPSPackage import WGUPSPackage
+from PackageStore import PackageStore
 from PkgHashTable import PkgHashTable
 from Clock import Clock
 
 
 # the package initializer class reads package data from the package data csv file and stores it in WGUPSPackage objects.
 # the objects are then inserted into a hash table where they can be retrieved using the package ID as a key
+#
+# the file is streamed in chunks of rows rather than read into memory all at once, so the memory used while reading
+# stays the same however many rows the file holds. A row that cannot be read - one with missing fields, a package ID,
+# deadline or mass that is not valid, or an address that is not in the location ID map - is reported and skipped, and
+# the rest of the file is still read
 class PackageInit:
 
+    # number of csv rows read and converted to packages together
+    chunkSize = 10000
+
+    # most distinct deadline strings remembered while reading a file. Real manifests hold only a handful, so this only
+    # keeps a file full of malformed deadlines from growing the cache without limit
+    maxCachedDeadlines = 4096
+
+    # each row holds the package ID, address, city, state, zip code, deadline, mass and special notes - the notes may
+    # be left off entirely
+    minFieldsPerRow = 7
+
+    # the packages are read from the given package csv file into a new package store, or into the given store. Rows that
+    # cannot be read are passed to the onRejectedRow function along with their line number and the reason, which by
+    # default writes them to standard error
+    #
     # time and space complexity = Big O(n)
     @staticmethod
-    def getPkgTable(locationIDMap, numPkgs):
+    def getPkgTable(locationIDMap, numPkgs, packagePath='PackageData.csv', onRejectedRow=None, store=None):
+        pkgObjs = PkgHashTable(numPkgs)
+        if store is None:
+            store = PackageStore()
+
+        # each package object is paired with a key representing that package's ID number, and placed in a hash table
+        for pkg in PackageInit.streamPackages(locationIDMap, packagePath, onRejectedRow, store):
+            pkgObjs.insert(pkg.pkgID, pkg)
+        return pkgObjs
 
-        # csv file is opened and read in as a list of elements, where each element is a list containing each value
-        # separated by commas per row in the file
-        with open('PackageData.csv', 'r') as read_obj:
+    # yields a package object for every valid row of the given package csv file, in file order. Each package is added
+    # as a row of the given package store, or of a store of its own if none is given
+    #
+    # time complexity = Big O(n), space complexity = Big O(c), where c is the chunk size
+    @staticmethod
+    def streamPackages(locationIDMap, packagePath='PackageData.csv', onRejectedRow=None, store=None):
+        if onRejectedRow is None:
+            onRejectedRow = PackageInit.reportRejectedRow
+        deadlineCache = dict()
+        for chunk in PackageInit.readChunks(packagePath):
+            yield from PackageInit.parseChunk(chunk, locationIDMap, deadlineCache, onRejectedRow, store)
+
+    # yields the rows of the csv file in lists of at most chunkSize (line number, row) pairs. Blank lines are skipped
+    #
+    # time complexity = Big O(n), space complexity = Big O(c)
+    @staticmethod
+    def readChunks(packagePath):
+
+        # the 'with' keyword ensures that the file stream will be automatically closed once reading is complete, or
+        # once the caller stops reading early
+        with open(packagePath, 'r', newline='') as read_obj:
             pkgReader = csv.reader(read_obj)
-            pkgInfoList = list(pkgReader)
-            pkgObjs = PkgHashTable(numPkgs)
-
-            # key counter designates the key that will be used to insert the package object into the hash table, and
-            # increases by 1 with every loop through the csv file data
-            keyCounter = 1
-            for i in pkgInfoList:
-                pkgID = int(i[0])
-                adr = i[1]
-                city = i[2]
-                state = i[3]
-                zc = i[4]
-                deadline = Clock.convertTimeToInt(i[5])
-                massKG = i[6]
-                note = i[7]
-
-                # locationIDMap is initialized in LocationsInit. It maps addresses to a corresponding name and ID number
-                # which are then stored in the package object
-                locID = locationIDMap.get(adr)[0]
-                adrName = locationIDMap.get(adr)[1]
-
-                # all stored data is used to construct a new package object, which is then paired with a key
-                # representing that package's ID number, and placed in a hash table
-                pkgObjs.insert(keyCounter, WGUPSPackage(adrName, pkgID, adr, locID, city, state, zc, deadline, massKG,
-                                                        note))
-                keyCounter += 1
+            numberedRows = ((pkgReader.line_num, row) for row in pkgReader if row)
+            while True:
+                chunk = list(islice(numberedRows, PackageInit.chunkSize))
+                if not chunk:
+                    return
+                yield chunk
 
-        return pkgObjs
+    # converts a chunk of rows into package objects. The addresses are resolved to location IDs for the whole chunk at
+    # once, so each distinct address is looked up in the location ID map only once per chunk
+    #
+    # time and space complexity = Big O(c)
+    @staticmethod
+    def parseChunk(chunk, locationIDMap, deadlineCache, onRejectedRow, store=None):
+        resolvedAddresses = {adr: locationIDMap.get(adr)
+                             for adr in {row[1] for _, row in chunk if len(row) > 1}}
+
+        for lineNumber, row in chunk:
+            if len(row) < PackageInit.minFieldsPerRow:
+                onRejectedRow(lineNumber, row, "expected at least " + str(PackageInit.minFieldsPerRow) +
+                              " fields, found " + str(len(row)))
+                continue
+            pkgID, adr, city, state, zc, deadlineStr, massKG = row[:PackageInit.minFieldsPerRow]
+            note = row[PackageInit.minFieldsPerRow] if len(row) > PackageInit.minFieldsPerRow else ""
+
+            if not pkgID.strip().isdigit():
+                onRejectedRow(lineNumber, row, "package ID '" + pkgID + "' is not a non-negative integer")
+                continue
+            deadline = PackageInit.parseDeadline(deadlineStr, deadlineCache)
+            if deadline is None:
+                onRejectedRow(lineNumber, row, "deadline '" + deadlineStr + "' is not 'EOD' or a time like '10:30 AM'")
+                continue
+
+            # locationIDMap is initialized in LocationsInit. It maps addresses to a corresponding ID number and name
+            # which are then stored in the package object
+            location = resolvedAddresses[adr]
+            if location is None:
+                onRejectedRow(lineNumber, row, "address '" + adr + "' is not a known delivery location")
+                continue
+            locID, adrName = location[0], location[1]
+
+            try:
+                mass = float(massKG)
+            except ValueError:
+                onRejectedRow(lineNumber, row, "mass '" + massKG + "' is not a number")
+                continue
+
+            yield WGUPSPackage(adrName, int(pkgID), adr, locID, city, state, zc, deadline, mass, note, store)
+
+    # converts a deadline string into minutes since midnight, or returns None if it is not a valid deadline. Parsed
+    # deadlines are kept in the deadline cache, since a manifest uses the same few deadlines over and over
+    #
+    # time and space complexity = Big O(1)
+    @staticmethod
+    def parseDeadline(deadlineStr, deadlineCache):
+        if deadlineStr in deadlineCache:
+            return deadlineCache[deadlineStr]
+        timeStr = deadlineStr.strip()
+        if timeStr == "EOD" or Clock.getValidInput(timeStr):
+            deadline = Clock.convertTimeToInt(timeStr)
+        else:
+            deadline = None
+        if len(deadlineCache) < PackageInit.maxCachedDeadlines:
+            deadlineCache[deadlineStr] = deadline
+        return deadline
+
+    # the default handling of a rejected row - a line describing it is written to standard error
+    #
+    # time and space complexity = Big O(1)
+    @staticmethod
+    def reportRejectedRow(lineNumber, row, reason):
+        print("Skipped package data row " + str(lineNumber) + ": " + reason, file=sys.stderr)
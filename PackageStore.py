@@ -0,0 +1,75 @@
+import sys
+from array import array
+
+from Status import PackageStatus
+
+
+# the package store holds the data of every package in columns rather than in one object per package. Each numeric
+# field is a typed array with one entry per package - a package's data is found at the same row of every column - and
+# each text field is a list of strings, interned so that the many packages sharing a city, state, zip code or note
+# share a single string. This takes a small fraction of the memory of a full Python object per package, so many more
+# delivery days can be kept in memory at once
+#
+# package objects are lightweight views onto a row of the store (see WGUPSPackage), so code that reads and updates
+# packages one at a time works unchanged
+class PackageStore:
+
+    # stored in the time and truck columns in place of a time or truck that is not yet known
+    noValue = -1
+
+    # the numeric columns - package IDs, location IDs, deadlines and the times the package was loaded and delivered in
+    # minutes since midnight, the truck the package is loaded onto, its mass in kilograms, and its status code
+    numericColumns = (("pkgIDs", 'q'), ("locationIDs", 'i'), ("deadlines", 'i'), ("timesLoaded", 'i'),
+                      ("timesDelivered", 'i'), ("truckIDs", 'i'), ("masses", 'd'), ("statuses", 'b'))
+
+    # the text columns
+    textColumns = ("names", "addresses", "cities", "states", "zips", "notes")
+
+    def __init__(self):
+        for column, typeCode in PackageStore.numericColumns:
+            setattr(self, column, array(typeCode))
+        for column in PackageStore.textColumns:
+            setattr(self, column, [])
+
+    def __len__(self):
+        return len(self.pkgIDs)
+
+    # adds a package to the end of the store, waiting at the Hub and not yet loaded onto a truck, and returns its row
+    #
+    # time and space complexity = O(1) amortized
+    def addPackage(self, name, pkgID, adr, locID, city, state, zc, deadline, massKG, note):
+        row = len(self.pkgIDs)
+        self.pkgIDs.append(pkgID)
+        self.locationIDs.append(locID)
+        self.deadlines.append(deadline)
+        self.timesLoaded.append(PackageStore.noValue)
+        self.timesDelivered.append(PackageStore.noValue)
+        self.truckIDs.append(PackageStore.noValue)
+        self.masses.append(float(massKG))
+        self.statuses.append(PackageStatus.AT_HUB)
+        self.names.append(sys.intern(name))
+        self.addresses.append(sys.intern(adr))
+        self.cities.append(sys.intern(city))
+        self.states.append(sys.intern(state))
+        self.zips.append(sys.intern(zc))
+        self.notes.append(sys.intern(note))
+        return row
+
+    # returns a new store holding a copy of every row of this one, so the packages can be delivered again without the
+    # package csv file being read again. The strings are shared, since they are never changed in place
+    #
+    # time and space complexity = O(n)
+    def copy(self):
+        store = PackageStore.__new__(PackageStore)
+        for column, typeCode in PackageStore.numericColumns:
+            setattr(store, column, array(typeCode, getattr(self, column)))
+        for column in PackageStore.textColumns:
+            setattr(store, column, list(getattr(self, column)))
+        return store
+
+    # returns the approximate number of bytes used by the store's columns, not counting the strings they share
+    #
+    # time complexity = O(1), space complexity = O(1)
+    def getMemoryUsage(self):
+        numericBytes = sum(sys.getsizeof(getattr(self, column)) for column, _ in PackageStore.numericColumns)
+        return numericBytes + sum(sys.getsizeof(getattr(self, column)) for column in PackageStore.textColumns)
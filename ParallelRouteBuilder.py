@@ -0,0 +1,204 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from DistanceMatrix import DistanceMatrix
+from RouteBuilder import RouteBuilder
+from RouteImprover import RouteImprover
+from RouteCache import RouteCache
+from Instrumentation import Instrumentation
+from WGUPSTruck import WGUPSTruck
+
+
+# the parallel route builder determines the routes of many trucks at once, spread over a pool of worker processes. A
+# truck's route depends only on the set of locations it stops at and the master distance matrix, so once the loads are
+# planned every route can be built ahead of time, in any order.
+#
+# the master distance matrix is copied once into a block of shared memory, which every worker maps directly - so the
+# matrix is never pickled and sent with each truck, and each worker only receives a truck's list of stops and sends
+# back its route. The routes are returned keyed by truck ID, so they are the same whatever order the workers finish in
+class ParallelRouteBuilder:
+
+    # the distance matrix mapped from shared memory in a worker process, and the shared memory block behind it
+    workerMatrix = None
+    workerMemory = None
+
+    # determines the route of a single truck whose route locations are set - the truck's distance matrix is pulled from
+    # the master matrix, the route is solved, and a heuristic route is then optionally shortened by the route improver
+    # within the given time budget in seconds. The route and the solver used are recorded on the truck. If a route
+    # cache is given, a route already stored for the same stops is used instead, and a newly built route is stored.
+    #
+    # if the earliest deadline at each stop is given, as a dictionary mapping location IDs to minutes since midnight,
+    # the route is built to meet those deadlines from the truck's departure time instead. Such a route depends on more
+    # than the stops, so it is never taken from or stored in the cache, and the route improver's changes are only kept
+    # if they miss no more deadlines than before
+    #
+    # time complexity = O(2^n * n^2) for exact routes, O(n^2) otherwise (O(n^2 log n) with deadlines), and O(n) for
+    # cached routes. Space complexity = O(2^n * n) for exact routes, O(n^2) otherwise
+    @staticmethod
+    def buildRoute(truck, distMatrix, maxExactStops, improvementBudget, routeCache=None, locationDeadlines=None):
+        if locationDeadlines is not None:
+            routeCache = None
+        if routeCache is not None:
+            cachedRoute = ParallelRouteBuilder.getCachedRoute(truck.routeLocations, distMatrix, maxExactStops,
+                                                              routeCache)
+            if cachedRoute is not None:
+                truck.route, truck.routeSolver, truck.routeSolveTime = cachedRoute
+                return
+
+        # the truck's locations are used as indexes into the master adjacency matrix to create a smaller adjacency
+        # matrix specific to the current truck's route
+        with Instrumentation.stage("buildRouteAdjacencyMatrix", truck.truckID):
+            truckDistMatrix = RouteBuilder.buildRouteAdjacencyMatrix(truck, distMatrix)
+
+        # following creation of the adjacency matrix, the matrix is then used by the route builder to determine the
+        # efficient route the truck will take between all of its stops
+        with Instrumentation.stage("solveRoute", truck.truckID):
+            if locationDeadlines is None:
+                RouteBuilder.solveRoute(truck, truckDistMatrix, maxExactStops)
+            else:
+                RouteBuilder.solveDeadlineRoute(truck, truckDistMatrix, maxExactStops, locationDeadlines)
+
+        # optionally, a heuristic route is then shortened with local search before the truck sets off
+        if truck.routeSolver != RouteBuilder.exactSolver and improvementBudget > 0:
+            improvementStart = time.perf_counter()
+            with Instrumentation.stage("improveRoute", truck.truckID):
+                if locationDeadlines is None:
+                    RouteImprover.improveRoute(truck, truckDistMatrix, improvementBudget)
+                else:
+                    ParallelRouteBuilder.improveDeadlineRoute(truck, truckDistMatrix, improvementBudget,
+                                                              locationDeadlines)
+            truck.routeSolver += " + local search"
+            truck.routeSolveTime += time.perf_counter() - improvementStart
+
+        if routeCache is not None:
+            routeCache.put(RouteCache.makeKey(truck.routeLocations, distMatrix.version), distMatrix.version,
+                           truck.route, truck.routeSolver)
+
+    # shortens a deadline-aware route with the route improver, which only counts miles - the shorter route is kept only
+    # if it misses no more deadlines than the route it replaces
+    #
+    # time and space complexity = that of RouteImprover.improveRoute
+    @staticmethod
+    def improveDeadlineRoute(truck, truckDistMatrix, improvementBudget, locationDeadlines):
+        originalRoute = [list(stop) for stop in truck.route]
+        legMinutes = RouteBuilder.getLegMinutes(np.asarray(truckDistMatrix, dtype=float))
+        deadlines = RouteBuilder.getStopDeadlines(truck, locationDeadlines)
+        RouteImprover.improveRoute(truck, truckDistMatrix, improvementBudget)
+        missedDeadlines = RouteBuilder.findMissedDeadlines(truck, legMinutes, deadlines)
+        if len(missedDeadlines) > len(truck.missedDeadlines):
+            truck.route = originalRoute
+        else:
+            truck.missedDeadlines = missedDeadlines
+
+    # returns (route, solver name, lookup time in seconds) for a route stored in the cache for the given stops, or None
+    # if there is none. A heuristic route stored for stops that are now few enough to be solved exactly is not used, so
+    # it can be replaced by the exact route
+    #
+    # time complexity = O(s log s), space complexity = O(s), where s is the number of stops
+    @staticmethod
+    def getCachedRoute(routeLocations, distMatrix, maxExactStops, routeCache):
+        lookupStart = time.perf_counter()
+        with Instrumentation.stage("routeCacheLookup"):
+            cachedRoute = routeCache.get(RouteCache.makeKey(routeLocations, distMatrix.version))
+        if cachedRoute is None:
+            return None
+        route, solver = cachedRoute
+        if solver != RouteBuilder.exactSolver and len(routeLocations) - 1 <= maxExactStops:
+            return None
+        return route, solver + RouteCache.cachedSuffix, time.perf_counter() - lookupStart
+
+    # builds the route for every truck in routeLocations, which maps each truck ID to the sorted list of location IDs
+    # the truck stops at, including the Hub. Returns a dictionary mapping each truck ID to (route, solver name, solve
+    # time in seconds). The routes are built in the given number of worker processes - or in this process, if only one
+    # worker is asked for or there is only one truck. If a route cache is given, only the routes not already stored are
+    # built, and those are then stored
+    #
+    # time complexity = O(t * r / w), where r is the time to build one route and w is the number of workers. Space
+    # complexity = O(n^2) for the shared matrix, plus O(t * s) for the routes
+    @staticmethod
+    def buildRoutes(routeLocations, distMatrix, maxExactStops, improvementBudget, numWorkers, routeCache=None):
+        truckIDs = sorted(routeLocations)
+        if numWorkers <= 1 or len(truckIDs) <= 1:
+            return {truckID: ParallelRouteBuilder.buildTruckRoute(truckID, routeLocations[truckID], distMatrix,
+                                                                  maxExactStops, improvementBudget, routeCache)
+                    for truckID in truckIDs}
+
+        routes = dict()
+        if routeCache is not None:
+            for truckID in truckIDs:
+                cachedRoute = ParallelRouteBuilder.getCachedRoute(routeLocations[truckID], distMatrix, maxExactStops,
+                                                                  routeCache)
+                if cachedRoute is not None:
+                    routes[truckID] = cachedRoute
+            truckIDs = [truckID for truckID in truckIDs if truckID not in routes]
+            if not truckIDs:
+                return routes
+
+        packedDistances = np.ascontiguousarray(distMatrix.packedDistances, dtype=DistanceMatrix.distanceType)
+        sharedMemory = shared_memory.SharedMemory(create=True, size=max(1, packedDistances.nbytes))
+        try:
+            np.ndarray(packedDistances.shape, dtype=DistanceMatrix.distanceType,
+                       buffer=sharedMemory.buf)[:] = packedDistances
+            with ProcessPoolExecutor(max_workers=min(numWorkers, len(truckIDs)),
+                                     initializer=ParallelRouteBuilder.attachWorker,
+                                     initargs=(sharedMemory.name, len(packedDistances), distMatrix.version)) as pool:
+                futures = {truckID: pool.submit(ParallelRouteBuilder.buildWorkerRoute, truckID,
+                                                routeLocations[truckID], maxExactStops, improvementBudget)
+                           for truckID in truckIDs}
+
+                # results are gathered in truck ID order, not the order they finish in
+                for truckID in truckIDs:
+                    routes[truckID] = futures[truckID].result()
+        finally:
+            sharedMemory.close()
+            sharedMemory.unlink()
+
+        if routeCache is not None:
+            for truckID in truckIDs:
+                route, solver, _ = routes[truckID]
+                routeCache.put(RouteCache.makeKey(routeLocations[truckID], distMatrix.version), distMatrix.version,
+                               route, solver)
+        return routes
+
+    # builds one truck's route on a stand-in truck, and returns (route, solver name, solve time in seconds)
+    #
+    # time and space complexity = that of buildRoute
+    @staticmethod
+    def buildTruckRoute(truckID, locations, distMatrix, maxExactStops, improvementBudget, routeCache=None):
+        truck = WGUPSTruck(truckID, 0)
+        truck.routeLocations = list(locations)
+        ParallelRouteBuilder.buildRoute(truck, distMatrix, maxExactStops, improvementBudget, routeCache)
+        return truck.route, truck.routeSolver, truck.routeSolveTime
+
+    # runs once in each worker process as it starts, and maps the shared distance matrix
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def attachWorker(memoryName, numDistances, version):
+        try:
+            # the worker only borrows the block - the process that created it removes it
+            sharedMemory = shared_memory.SharedMemory(name=memoryName, track=False)
+        except TypeError:
+            sharedMemory = shared_memory.SharedMemory(name=memoryName)
+        packedDistances = np.ndarray((numDistances,), dtype=DistanceMatrix.distanceType, buffer=sharedMemory.buf)
+        ParallelRouteBuilder.workerMemory = sharedMemory
+        ParallelRouteBuilder.workerMatrix = DistanceMatrix(packedDistances, version)
+
+    # builds one truck's route in a worker process, from the shared distance matrix
+    #
+    # time and space complexity = that of buildRoute
+    @staticmethod
+    def buildWorkerRoute(truckID, locations, maxExactStops, improvementBudget):
+        return ParallelRouteBuilder.buildTruckRoute(truckID, locations, ParallelRouteBuilder.workerMatrix,
+                                                    maxExactStops, improvementBudget)
+
+    # returns the number of worker processes to use for the given setting - 0 means one per CPU
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def getNumWorkers(setting):
+        return setting if setting > 0 else (os.cpu_count() or 1)
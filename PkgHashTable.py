@@ -1,3 +1,6 @@
+from array import array
+
+
 # the package hash table maps package objects storing data to a key representing that package's ID number. This way,
 # particular packages, such as the one with an incorrect address, or a list of packages to be loaded on a specific
 # truck, can be quickly and easily accessed
@@ -7,38 +10,209 @@
 # Joe James. (2016, January 23). Python: Creating a HASHMAP using Lists [Video]. YouTube.
 # https://www.youtube.com/watch?v=9HFbhPscPU0&ab_channel=JoeJames
 #
-# benefit of hash table is all method actions (inserting, lookup, deletion, etc) are O(1) time and space complexity
+# the table uses open addressing with linear probing - when two keys hash to the same slot, the second is placed in the
+# next free slot after it. Keys are stored in a compact array of integers alongside a list of values, and the table
+# doubles in size whenever it becomes too full, so any number of packages with any (non-negative) ID numbers can be
+# stored. Removed keys leave a tombstone behind, so that probing for keys placed after them still finds them
+#
+# the table also keeps secondary indexes of its packages by delivery location, delivery deadline, and the truck they
+# are loaded onto, so those groups of packages can be found without a pass over every package
+#
+# benefit of hash table is all method actions (inserting, lookup, deletion, etc) are O(1) average time complexity
 class PkgHashTable:
 
+    # markers stored in the key array for slots that have never been used, and for slots whose key has been removed
+    emptySlot = -1
+    removedSlot = -2
+
+    # the table grows once more than this fraction of its slots are in use or hold tombstones
+    maxLoadFactor = 0.7
+
+    # the package attributes the table keeps secondary indexes on
+    indexedAttributes = ("deliveryLocationID", "deliveryDeadline", "truckLoadedOnto")
+
     length = int
+    keys = array
     map = []
 
-    # the table is initialized with a number of empty slots equal to the number of packages being delivered, which
-    # is specified by the Hub
+    # the table is initialized with at least as many slots as the number of packages being delivered, which is
+    # specified by the Hub. The slot count is kept a power of 2, with room to spare below the maximum load factor
     def __init__(self, size):
-        self.length = size
+        self.length = 8
+        while self.length * PkgHashTable.maxLoadFactor < size:
+            self.length *= 2
+        self.keys = array('q', [PkgHashTable.emptySlot]) * self.length
         self.map = [None] * self.length
+        self.count = 0
+        self.usedSlots = 0
+
+        # each index maps an attribute value to the keys of the packages with that value. The inner dictionaries are
+        # used as ordered sets, so packages are returned in the order they were inserted
+        self.indexes = {attribute: dict() for attribute in PkgHashTable.indexedAttributes}
+        self.indexedValues = dict()
 
     # to ensure the hash for the associative array is within the bounds, the modulo of the size is taken in relation to
     # the given key
     def getHash(self, key):
         return key % self.length
 
-    # inserts a given key value pair at an index corresponding to the key, where it can then be reached using the key
+    # returns the slot holding the given key, or -1 if the key is not in the table. The slot markers are negative, so a
+    # negative key is never in the table, and is turned away before it can be mistaken for a marker
+    #
+    # time complexity = O(1) average, space complexity = O(1)
+    def findSlot(self, key):
+        if key < 0:
+            return -1
+        slot = self.getHash(key)
+        while True:
+            slotKey = self.keys[slot]
+            if slotKey == key:
+                return slot
+            if slotKey == PkgHashTable.emptySlot:
+                return -1
+            slot = (slot + 1) % self.length
+
+    # inserts a given key value pair at an index corresponding to the key, where it can then be reached using the key.
+    # If the key is already in the table, its value is replaced
+    #
+    # time complexity = O(1) average, space complexity = O(1)
     def insert(self, key, value):
+        if key < 0:
+            raise ValueError("Package hash table keys must be non-negative, got " + str(key))
 
-        # the key input is hashed to get an index position to place the requested data
-        keyHash = self.getHash(key)
+        slot = self.findSlot(key)
+        if slot >= 0:
+            self.map[slot] = value
+            self.reindex(key)
+            return
 
-        # the 2 input data are stored together in a list that will be placed in the keyHash index position
-        keyValuePair = [key, value]
-        self.map[keyHash] = keyValuePair
+        if (self.usedSlots + 1) > self.length * PkgHashTable.maxLoadFactor:
+            self.resize()
 
-    # retrieves a value (in the case of this program, a package object) at a given key by indexing the list at the
-    # hash of the key, and returning the value in the [key, value] pair at that index. returns None if nothing has
-    # been inserted at that index
+        # the key input is hashed to get an index position, and the first free slot from there holds the new pair -
+        # a tombstone may be reused, since the key is already known not to be in the table
+        slot = self.getHash(key)
+        while self.keys[slot] >= 0:
+            slot = (slot + 1) % self.length
+        if self.keys[slot] == PkgHashTable.emptySlot:
+            self.usedSlots += 1
+        self.keys[slot] = key
+        self.map[slot] = value
+        self.count += 1
+        self.reindex(key)
+
+    # retrieves a value (in the case of this program, a package object) at a given key by probing from the hash of the
+    # key until the key, or an empty slot, is found. returns None if nothing has been inserted with that key
+    #
+    # time complexity = O(1) average, space complexity = O(1)
     def lookup(self, key):
-        keyHash = self.getHash(key)
-        if self.map[keyHash]:
-            return self.map[keyHash][1]
+        slot = self.findSlot(key)
+        if slot >= 0:
+            return self.map[slot]
         return None
+
+    # removes the given key and its value from the table, leaving a tombstone in its slot. Returns the removed value, or
+    # None if the key was not in the table
+    #
+    # time complexity = O(1) average, space complexity = O(1)
+    def remove(self, key):
+        slot = self.findSlot(key)
+        if slot < 0:
+            return None
+        value = self.map[slot]
+        self.removeFromIndexes(key)
+        self.keys[slot] = PkgHashTable.removedSlot
+        self.map[slot] = None
+        self.count -= 1
+        return value
+
+    # rebuilds the table once it is too full. The table doubles in size if most of the used slots hold live keys, and
+    # otherwise keeps its size - either way, every tombstone is cleared
+    #
+    # time and space complexity = O(n)
+    def resize(self):
+        oldKeys = self.keys
+        oldMap = self.map
+        if self.count + 1 > (self.length * PkgHashTable.maxLoadFactor) / 2:
+            self.length *= 2
+        self.keys = array('q', [PkgHashTable.emptySlot]) * self.length
+        self.map = [None] * self.length
+        self.usedSlots = self.count
+        for oldSlot in range(len(oldKeys)):
+            key = oldKeys[oldSlot]
+            if key >= 0:
+                slot = self.getHash(key)
+                while self.keys[slot] != PkgHashTable.emptySlot:
+                    slot = (slot + 1) % self.length
+                self.keys[slot] = key
+                self.map[slot] = oldMap[oldSlot]
+
+    # updates the secondary indexes for the given key from the current attributes of its package. Must be called after
+    # an indexed attribute of a package in the table is changed, such as when it is loaded onto a truck
+    #
+    # time and space complexity = O(1)
+    def reindex(self, key):
+        self.removeFromIndexes(key)
+        value = self.lookup(key)
+        values = tuple(getattr(value, attribute, None) for attribute in PkgHashTable.indexedAttributes)
+        self.indexedValues[key] = values
+        for attribute, attributeValue in zip(PkgHashTable.indexedAttributes, values):
+            if attributeValue is not None:
+                self.indexes[attribute].setdefault(attributeValue, dict())[key] = None
+
+    # removes the given key from the secondary indexes
+    #
+    # time and space complexity = O(1)
+    def removeFromIndexes(self, key):
+        values = self.indexedValues.pop(key, None)
+        if values is None:
+            return
+        for attribute, attributeValue in zip(PkgHashTable.indexedAttributes, values):
+            keysWithValue = self.indexes[attribute].get(attributeValue)
+            if keysWithValue is not None:
+                keysWithValue.pop(key, None)
+                if not keysWithValue:
+                    del self.indexes[attribute][attributeValue]
+
+    # returns the packages whose indexed attribute has the given value
+    #
+    # time and space complexity = O(k), where k is the number of packages returned
+    def lookupBy(self, attribute, attributeValue):
+        return [self.lookup(key) for key in self.indexes[attribute].get(attributeValue, ())]
+
+    # returns the packages to be delivered to the given location ID
+    def lookupByLocation(self, locationID):
+        return self.lookupBy("deliveryLocationID", locationID)
+
+    # returns the packages with the given delivery deadline, in minutes since midnight
+    def lookupByDeadline(self, deadline):
+        return self.lookupBy("deliveryDeadline", deadline)
+
+    # returns the packages loaded onto the given truck
+    def lookupByTruck(self, truckID):
+        return self.lookupBy("truckLoadedOnto", truckID)
+
+    # returns the distinct values of an indexed attribute held by packages in the table, such as every delivery
+    # deadline, in ascending order
+    #
+    # time complexity = O(k log k), space complexity = O(k), where k is the number of distinct values
+    def getIndexedValues(self, attribute):
+        return sorted(self.indexes[attribute])
+
+    # returns every key in the table
+    #
+    # time and space complexity = O(n)
+    def getKeys(self):
+        return [key for key in self.keys if key >= 0]
+
+    # returns every value in the table, in order of key
+    #
+    # time complexity = O(n log n), space complexity = O(n)
+    def getValues(self):
+        return [self.lookup(key) for key in sorted(self.getKeys())]
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return self.findSlot(key) >= 0
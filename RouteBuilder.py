@@ -1,103 +1,373 @@
-import copy
+import heapq
+import math
+import time
+
+import numpy as np
+
+from WGUPSTruck import WGUPSTruck
 
 
 # The RouteBuilder manipulates the master distance adjacency matrix initialized by the Hub to create a specialized
 # matrix that is used to determine the route a truck will take between its stops
 class RouteBuilder:
 
-    # nearest neighbor greedy algorithm that first marks any previously visited stops, then finds the stop with the
-    # shortest distance in miles from the current stop
+    # names reported on a truck for the algorithm that determined its route
+    exactSolver = "held-karp"
+    heuristicSolver = "nearest neighbor"
+    deadlineSolver = "deadline insertion"
+
+    # picks the algorithm used to determine the truck's route by the number of stops it will make. Routes with up to
+    # maxExactStops stops (not counting the Hub) are solved exactly, and longer routes use the nearest neighbor
+    # heuristic. The name of the algorithm used and the seconds it took are recorded on the truck
+    #
+    # time complexity = O(2^n * n^2) for exact routes, O(n^2) otherwise. Space complexity = O(2^n * n) for exact routes,
+    # O(n) otherwise
+    @staticmethod
+    def solveRoute(truck, distMatrix, maxExactStops):
+        startTime = time.perf_counter()
+        if len(truck.routeLocations) - 1 <= maxExactStops:
+            RouteBuilder.determineOptimalRoute(truck, distMatrix)
+            truck.routeSolver = RouteBuilder.exactSolver
+        else:
+            RouteBuilder.determineRoute(truck, distMatrix)
+            truck.routeSolver = RouteBuilder.heuristicSolver
+        truck.routeSolveTime = time.perf_counter() - startTime
+
+    # Held-Karp dynamic programming algorithm that finds the shortest possible route through every stop, starting and
+    # ending at the Hub. bestMiles[subset][k] holds the length of the shortest path that leaves the Hub, visits exactly
+    # the stops in the subset (a bitmask over every stop except the Hub), and ends at stop k. Subsets are solved in
+    # order of size, with all subsets of the same size that end at the same stop handled by one vectorized operation
+    #
+    # time complexity = O(2^n * n^2), space complexity = O(2^n * n)
+    @staticmethod
+    def determineOptimalRoute(truck, distMatrix):
+        distances = np.asarray(distMatrix, dtype=float)
+        numStops = len(distances) - 1
+        if numStops < 1:
+            RouteBuilder.setTruckRoute(truck, [0], distances)
+            return
+
+        # distances between stops, without the Hub, so that stop k is bit k of a subset
+        stopDistances = distances[1:, 1:]
+        numSubsets = 1 << numStops
+        subsets = np.arange(numSubsets)
+
+        # the number of stops in each subset, used to group subsets into layers of equal size
+        subsetSizes = np.zeros(numSubsets, dtype=np.int8)
+        for k in range(numStops):
+            subsetSizes += (subsets >> k) & 1
+
+        # each table is a single array, so memory use is fixed by the number of stops. previousStop records which stop
+        # came before k on the best path, so the route can be traced back once the table is filled in
+        bestMiles = np.full((numSubsets, numStops), np.inf)
+        previousStop = np.full((numSubsets, numStops), -1, dtype=np.int8)
+        singleStops = 1 << np.arange(numStops)
+        bestMiles[singleStops, np.arange(numStops)] = distances[0, 1:]
+
+        for size in range(2, numStops + 1):
+            layer = subsets[subsetSizes == size]
+            for k in range(numStops):
+                endingAtK = layer[(layer >> k) & 1 == 1]
+
+                # for each subset ending at k, the path to k is extended from the best path over the same subset
+                # without k, ending at any other stop j. Stops outside that smaller subset already hold infinity
+                candidates = bestMiles[endingAtK ^ (1 << k)] + stopDistances[:, k]
+                bestPrevious = np.argmin(candidates, axis=1)
+                bestMiles[endingAtK, k] = candidates[np.arange(len(endingAtK)), bestPrevious]
+                previousStop[endingAtK, k] = bestPrevious
+
+        # the route is closed by driving back to the Hub from whichever final stop gives the shortest total
+        allStops = numSubsets - 1
+        lastStop = int(np.argmin(bestMiles[allStops] + distances[1:, 0]))
+
+        reversedTour = []
+        subset = allStops
+        while lastStop >= 0:
+            reversedTour.append(lastStop + 1)
+            priorStop = int(previousStop[subset, lastStop])
+            subset ^= 1 << lastStop
+            lastStop = priorStop
+
+        RouteBuilder.setTruckRoute(truck, [0] + reversedTour[::-1], distances)
+
+    # nearest neighbor greedy algorithm that keeps a single mask of previously visited stops, and at each step finds
+    # the unvisited stop with the shortest distance in miles from the current stop
     #
     # time complexity = O(n^2), space complexity = O(n)
     @staticmethod
     def determineRoute(truck, distMatrix):
 
-        # current location ID, used to update the truck's route as the route is built
-        currentLocationID = 0
-
-        # the corresponding float value in the distance matrix associated with the stop that was found to be closest
-        # to the current stop
-        nearestDist = 0
-
-        # not the location ID, but the index position OF that location ID in the truck's list of route stops, used to
-        # index the current adjacency matrix row with each new cycle of the loop
-        nearestIndex = 0
-
-        # list of index positions of locations that have already been visited
-        visitedLocationIndexes = []
-
-        while True:
-
-            # a deep copy is needed because the original will need to be referenced after changes have been made to the
-            # current row, and a shallow copy would result in a change in the copied row affecting the original as well
-            currentLocationRow = copy.deepcopy(distMatrix[nearestIndex])
-
-            # any previously visited locations are marked, so they will not be selected again
-            for i in visitedLocationIndexes:
-                currentLocationRow[i] = 0.0
-
-            # the current location is added to the list of locations to be marked on next iteration
-            visitedLocationIndexes.append(nearestIndex)
-
-            # break out once all stops have been visited, taking the index position [0], since it corresponds with the
-            # distance from the current location back to the Hub
-            if len(visitedLocationIndexes) == len(currentLocationRow):
-                nearestDist = distMatrix[nearestIndex][0]
-                truck.route.append([currentLocationID, nearestDist])
-                break
-
-            # indexCounter will keep track of what the current index position is so that it can be stored in
-            # nearestIndex when the nearest location is found in the current row
-            indexCounter = 0
-
-            # switch that skips the first iteration of the loop, since the first iteration will correspond with index
-            # position 0, which is the Hub, which is where the truck already begins. The algorithm should not select
-            # index 0 again as long as there are remaining unvisited stops
-            nearestInitSwitch = 0
-
-            for i in currentLocationRow:
-                # all previously visited locations are marked at the start of each loop as '0.0', and the current row
-                # will also have a value of 0.0 at the index mapping the distance to itself. To ensure these are never
-                # selected, any 0.0 values are skipped over
-                if i == 0.0:
-                    indexCounter += 1
-                    continue
-
-                # nearest location is initialized to the first nonzero (valid, unvisited) value in the row, after which
-                # it can be compared with subsequent values
-                if nearestInitSwitch == 0:
-                    nearestInitSwitch += 1
-                    nearestDist = i
-                    nearestIndex = indexCounter
-
-                # the current distance to be compared is set to the value in the row at the current index
-                currentDistance = i
-                # if it is unvisited, and less than the previously assumed shortest distance, it is marked as the new
-                # shortest
-                if 0.0 < currentDistance < nearestDist:
-                    nearestDist = currentDistance
-                    nearestIndex = indexCounter
-                indexCounter += 1
-
-            # once the nearest neighboring location is determined, its location ID and corresponding distance are added
-            # to the truck's route, which the truck will reference as it makes deliveries
-            truck.route.append([currentLocationID, nearestDist])
-            currentLocationID = truck.routeLocations[nearestIndex]
+        # the truck's matrix is converted once into a float array, so each row can be scanned with a single vectorized
+        # operation rather than a python loop
+        distances = np.asarray(distMatrix, dtype=float)
+        numStops = len(distances)
+
+        # boolean mask of index positions that have already been visited - the Hub at index 0 is where the truck
+        # begins, so it is marked from the start and will not be selected again while there are remaining stops
+        visited = np.zeros(numStops, dtype=bool)
+        visited[0] = True
+
+        # not the location ID, but the index position OF that location ID in the truck's list of route stops, in the
+        # order the stops will be visited
+        tour = [0]
+        currentIndex = 0
+
+        for _ in range(numStops - 1):
+
+            # visited stops are masked out with infinity so the argmin can only land on an unvisited stop. argmin
+            # returns the first of any equal distances, so ties are broken toward the lower index as they always were
+            candidateRow = np.where(visited, np.inf, distances[currentIndex])
+            currentIndex = int(np.argmin(candidateRow))
+            visited[currentIndex] = True
+            tour.append(currentIndex)
+
+        RouteBuilder.setTruckRoute(truck, tour, distances)
+
+    # picks the algorithm used to determine a route that meets the deadline of each of the truck's stops, given as a
+    # dictionary mapping location IDs to the earliest deadline of the packages delivered there, in minutes since
+    # midnight. The route starts at the truck's departure time - which is never before every package on the truck has
+    # arrived at the Hub, so no package is waited on once the truck is on the road. The route is first solved for
+    # distance alone, as by solveRoute, and kept if it meets every deadline. Otherwise a route is built by
+    # deadline-aware cheapest insertion, and whichever of the two misses fewer deadlines is kept. Deadlines the route
+    # still misses are recorded on the truck
+    #
+    # time complexity = O(2^n * n^2) for exact routes, O(n^2 log n) otherwise. Space complexity = O(2^n * n) for exact
+    # routes, O(n^2) otherwise
+    @staticmethod
+    def solveDeadlineRoute(truck, distMatrix, maxExactStops, locationDeadlines):
+        startTime = time.perf_counter()
+        distances = np.asarray(distMatrix, dtype=float)
+        legMinutes = RouteBuilder.getLegMinutes(distances)
+        deadlines = RouteBuilder.getStopDeadlines(truck, locationDeadlines)
+
+        RouteBuilder.solveRoute(truck, distMatrix, maxExactStops)
+        shortestRoute, shortestSolver = truck.route, truck.routeSolver
+        truck.missedDeadlines = RouteBuilder.findMissedDeadlines(truck, legMinutes, deadlines)
+        if truck.missedDeadlines:
+            shortestMisses = truck.missedDeadlines
+            RouteBuilder.determineDeadlineRoute(truck, distances, legMinutes, deadlines)
+            truck.routeSolver = RouteBuilder.deadlineSolver
+            truck.missedDeadlines = RouteBuilder.findMissedDeadlines(truck, legMinutes, deadlines)
+            if len(truck.missedDeadlines) >= len(shortestMisses):
+                truck.route, truck.routeSolver, truck.missedDeadlines = shortestRoute, shortestSolver, shortestMisses
+        truck.routeSolveTime = time.perf_counter() - startTime
+
+    # cheapest insertion with slack tracking. The route starts as the Hub and the return to the Hub, and stops are added
+    # to it one at a time, each placed where it adds the fewest miles - but only where the truck would reach it by its
+    # deadline, and no stop already on the route would be pushed past its own. The time each stop is reached is known
+    # from the truck's departure time and its speed, and each stop keeps a slack - how many minutes it, and every stop
+    # after it, could be put back and still be on time - so whether an insertion keeps the route on time is checked in
+    # O(1) from the slack of the stop after it.
+    #
+    # the cheapest insertion found for each stop waiting to be added is kept in a heap ordered by the stop's deadline
+    # and then by the insertion's cost - so stops with early deadlines claim their places first, and among stops with
+    # the same deadline the cheapest is added first. An insertion is checked again only when it comes to the top, since
+    # one that was on time may not be once other stops have been added. Each insertion opens up two new places, where
+    # every waiting stop's cost is found at once with vectorized operations. Stops that cannot be reached on time
+    # anywhere are added last, where they add the fewest miles without making another stop late, and are reported
+    #
+    # time complexity = O(n^2 log n), space complexity = O(n^2)
+    @staticmethod
+    def determineDeadlineRoute(truck, distances, legMinutes, deadlines):
+        numStops = len(distances)
+        departure = truck.routeStartTime
+
+        # the return to the Hub is kept as its own index, numStops, so it can follow the last stop like any other. Its
+        # distances are those of the Hub
+        end = numStops
+        locationOf = np.append(np.arange(numStops), 0)
+        miles = distances[locationOf][:, locationOf]
+        minutes = legMinutes[locationOf][:, locationOf]
+        deadline = np.append(np.asarray(deadlines, dtype=float), math.inf)
+
+        # the route as a linked list of index positions, with the time each stop on it is reached and its slack
+        successor = np.full(numStops + 1, -1)
+        successor[0] = end
+        arrival = np.zeros(numStops + 1)
+        slack = np.full(numStops + 1, math.inf)
+        arrival[0] = arrival[end] = departure
+
+        waiting = np.ones(numStops + 1, dtype=bool)
+        waiting[0] = waiting[end] = False
+        bestCost = np.full(numStops + 1, math.inf)
+        insertionHeap = []
+        lateStops = []
+        for v in range(1, numStops):
+            RouteBuilder.pushBestInsertion(insertionHeap, bestCost, v, [0, end], miles, minutes, deadline, arrival,
+                                           slack)
+            if bestCost[v] == math.inf:
+                lateStops.append(v)
+                waiting[v] = False
+
+        while insertionHeap:
+            _, cost, v, a = heapq.heappop(insertionHeap)
+            if not waiting[v] or cost > bestCost[v]:
+                continue
+            b = successor[a]
+
+            # an insertion is used only if its place is still on the route and would still be on time - otherwise the
+            # stop's best insertion is found again over the whole route
+            arriveAtV = arrival[a] + minutes[a, v]
+            if (b < 0 or miles[a, v] + miles[v, b] - miles[a, b] != cost or arriveAtV > deadline[v]
+                    or arriveAtV + minutes[v, b] - arrival[b] > slack[b]):
+                bestCost[v] = math.inf
+                RouteBuilder.pushBestInsertion(insertionHeap, bestCost, v, RouteBuilder.getTour(successor), miles,
+                                               minutes, deadline, arrival, slack)
+                if bestCost[v] == math.inf:
+                    lateStops.append(v)
+                    waiting[v] = False
+                continue
+
+            successor[v] = b
+            successor[a] = v
+            waiting[v] = False
+            RouteBuilder.updateTimes(RouteBuilder.getTour(successor), minutes, deadline, arrival, slack)
+
+            # the two new places on the route, either side of the stop just added, are priced for every waiting stop
+            waitingStops = np.flatnonzero(waiting)
+            for p, q in ((a, v), (v, b)):
+                arriveAt = arrival[p] + minutes[p, waitingStops]
+                onTime = (arriveAt <= deadline[waitingStops]) & \
+                         (arriveAt + minutes[waitingStops, q] - arrival[q] <= slack[q])
+                costs = miles[p, waitingStops] + miles[waitingStops, q] - miles[p, q]
+                better = onTime & (costs < bestCost[waitingStops])
+                for w, c in zip(waitingStops[better].tolist(), costs[better].tolist()):
+                    bestCost[w] = c
+                    heapq.heappush(insertionHeap, (float(deadline[w]), c, w, p))
+
+        # stops that could not be reached on time are added where they add the fewest miles without making any other
+        # stop late - which the place before the return to the Hub never does
+        for v in lateStops:
+            tour = np.asarray(RouteBuilder.getTour(successor))
+            before, after = tour[:-1], tour[1:]
+            pushedBack = arrival[before] + minutes[before, v] + minutes[v, after] - arrival[after]
+            keepsOthersOnTime = pushedBack <= slack[after]
+            added = np.where(keepsOthersOnTime, miles[before, v] + miles[v, after] - miles[before, after], math.inf)
+            a = int(before[int(np.argmin(added))])
+            successor[v] = successor[a]
+            successor[a] = v
+            RouteBuilder.updateTimes(RouteBuilder.getTour(successor), minutes, deadline, arrival, slack)
+
+        RouteBuilder.setTruckRoute(truck, RouteBuilder.getTour(successor)[:-1], distances)
+
+    # finds the cheapest on-time insertion of stop v between consecutive stops of the tour, and pushes it onto the heap
+    # as (deadline of v, cost, v, stop before it). The stop's best cost is left as infinity if it cannot be inserted on
+    # time anywhere
+    #
+    # time complexity = O(n), space complexity = O(n)
+    @staticmethod
+    def pushBestInsertion(insertionHeap, bestCost, v, tour, miles, minutes, deadline, arrival, slack):
+        tour = np.asarray(tour)
+        before, after = tour[:-1], tour[1:]
+        arriveAtV = arrival[before] + minutes[before, v]
+        onTime = (arriveAtV <= deadline[v]) & (arriveAtV + minutes[v, after] - arrival[after] <= slack[after])
+        if not onTime.any():
+            return
+        costs = np.where(onTime, miles[before, v] + miles[v, after] - miles[before, after], math.inf)
+        position = int(np.argmin(costs))
+        bestCost[v] = costs[position]
+        heapq.heappush(insertionHeap, (float(deadline[v]), float(costs[position]), v, int(before[position])))
+
+    # recalculates the time each stop on the tour is reached, and each stop's slack - the least time to spare before a
+    # deadline at that stop or any stop after it. A stop already reached after its deadline has been given up on, so it
+    # does not hold back the stops before it
+    #
+    # time and space complexity = O(n)
+    @staticmethod
+    def updateTimes(tour, minutes, deadline, arrival, slack):
+        tour = np.asarray(tour)
+        arrival[tour[1:]] = arrival[tour[0]] + np.cumsum(minutes[tour[:-1], tour[1:]])
+        spare = deadline[tour] - arrival[tour]
+        spare[spare < 0] = math.inf
+        slack[tour] = np.minimum.accumulate(spare[::-1])[::-1]
+
+    # returns the index positions of the route held as a linked list, from the Hub to the return to the Hub
+    #
+    # time and space complexity = O(n)
+    @staticmethod
+    def getTour(successor):
+        tour = [0]
+        while successor[tour[-1]] >= 0:
+            tour.append(int(successor[tour[-1]]))
+        return tour
+
+    # returns the deadline of each of the truck's route locations, by index position - the Hub, and any stop with no
+    # deadline given, has none
+    #
+    # time and space complexity = O(n)
+    @staticmethod
+    def getStopDeadlines(truck, locationDeadlines):
+        return [math.inf] + [locationDeadlines.get(locationID, math.inf) for locationID in truck.routeLocations[1:]]
+
+    # returns the whole minutes taken to drive between every pair of stops in the truck's distance matrix, rounded the
+    # same way as the truck rounds each leg it drives
+    #
+    # time and space complexity = O(n^2)
+    @staticmethod
+    def getLegMinutes(distances):
+        return np.round(distances / WGUPSTruck.averageSpeed * 60)
+
+    # returns (location ID, deadline, expected arrival) for every stop on the truck's route that it is expected to reach
+    # after the stop's deadline, driving from its departure time. deadlines are given by index position in the truck's
+    # route locations
+    #
+    # time and space complexity = O(n)
+    @staticmethod
+    def findMissedDeadlines(truck, legMinutes, deadlines):
+        indexOfLocation = {locationID: index for index, locationID in enumerate(truck.routeLocations)}
+        tour = [indexOfLocation[stop[0]] for stop in truck.route]
+        missed = []
+        currentTime = truck.routeStartTime
+        for previous, index in zip(tour, tour[1:]):
+            currentTime += int(legMinutes[previous, index])
+            if currentTime > deadlines[index]:
+                missed.append((truck.routeLocations[index], deadlines[index], currentTime))
+        return missed
+
+    # converts an ordered list of index positions into the truck's route - each entry pairs a location ID with the
+    # distance in miles to the next stop, and the final entry holds the distance from the last stop back to the Hub
+    #
+    # time and space complexity = O(n)
+    @staticmethod
+    def setTruckRoute(truck, tour, distMatrix):
+        truck.route = []
+        for i in range(len(tour)):
+            nextIndex = tour[i + 1] if i + 1 < len(tour) else 0
+            truck.route.append([truck.routeLocations[tour[i]], float(distMatrix[tour[i]][nextIndex])])
+
+    # changes the stops a truck on its route has not yet set off for - removedLocation is taken out of them, and
+    # addedLocation is inserted where it adds the fewest miles, between the stop the truck is driving toward and the
+    # final return to the Hub. The stop the truck is already driving toward is never changed, and the order of the other
+    # remaining stops is kept. Either location may be None
+    #
+    # time and space complexity = O(s), where s is the number of stops left on the route
+    @staticmethod
+    def reviseRouteSuffix(truck, distMatrix, removedLocation, addedLocation):
+        stops = [stop[0] for stop in truck.route]
+        if len(stops) < 2:
+            raise ValueError("Truck " + str(truck.truckID) + " has no stops left to change")
+
+        # the truck has left stops[0] and is driving toward stops[1] - the stops after that are free to change
+        remainingStops = [locationID for locationID in stops[2:] if locationID != removedLocation]
+        if addedLocation is not None and addedLocation not in stops[1:]:
+            path = [stops[1]] + remainingStops + [0]
+            addedMiles = [distMatrix.distance(path[i], addedLocation) + distMatrix.distance(addedLocation, path[i + 1])
+                          - distMatrix.distance(path[i], path[i + 1]) for i in range(len(path) - 1)]
+            insertAt = min(range(len(addedMiles)), key=lambda i: addedMiles[i])
+            remainingStops.insert(insertAt, addedLocation)
+
+        newStops = [stops[1]] + remainingStops
+        truck.route = truck.route[:1] + [[locationID, distMatrix.distance(locationID, nextLocationID)]
+                                         for locationID, nextLocationID in zip(newStops, newStops[1:] + [0])]
+        truck.routeLocations = sorted(set(truck.routeLocations) - {removedLocation} | set(newStops))
 
     # indexes the master adjacency matrix to create a specific distance matrix between all the stops a truck will
     # visit in its route
     #
-    # time complexity = O(n^2), space complexity = O(n)
+    # time complexity = O(n^2), space complexity = O(n^2)
     @staticmethod
     def buildRouteAdjacencyMatrix(truck, distMatrix):
-        routeAdjacencyMatrix = []
         # the numbers stored in each index position of the truck's route locations correspond to specific indexes
-        # in the master adjacency matrix - these specific rows are pulled out to form the new matrix
-        for i in truck.routeLocations:
-            currentRow = distMatrix[i]
-            adjustedRow = []
-            for j in truck.routeLocations:
-                adjustedRow.append(float(currentRow[j]))
-            routeAdjacencyMatrix.append(adjustedRow)
-
-        return routeAdjacencyMatrix
+        # in the master adjacency matrix - the distances between every pair of them are pulled out to form the new
+        # matrix in a single vectorized lookup
+        return distMatrix.subMatrix(truck.routeLocations)
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+
+# the route cache remembers the routes built for each set of stops, so a truck that stops at exactly the same locations
+# as an earlier truck - on the same day or on an earlier one - is given the stored route instead of having its distance
+# matrix built and its route solved again. Each route is stored as its list of [location ID, miles to the next stop]
+# entries, which is the tour together with the distance of each leg.
+#
+# routes are keyed by a hash of the sorted location IDs and the version of the distance matrix they were built from - so
+# once the distance csv file changes, the old routes are never returned again, and they are dropped when the cache is
+# next loaded or saved with the new version. The cache holds a limited number of routes, and once full, the least
+# recently used route is evicted to make room. It may optionally be saved to a JSON file and loaded again by later runs
+class RouteCache:
+
+    # added to the solver name recorded on a truck whose route came from the cache
+    cachedSuffix = " (cached)"
+
+    # the cache is created holding at most maxEntries routes, and loaded from the file at persistPath if one is given
+    # and exists. A file that cannot be read is ignored, and the cache starts empty
+    def __init__(self, maxEntries=1024, persistPath=None):
+        if maxEntries < 1:
+            raise ValueError("A route cache must hold at least 1 route, got " + str(maxEntries))
+        self.maxEntries = maxEntries
+        self.persistPath = persistPath
+
+        # maps each key to (distance matrix version, route, solver name), with the least recently used key first
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if persistPath is not None:
+            self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    # returns the canonical key for a set of location IDs and a distance matrix version - the same stops in any order,
+    # with or without repeats, give the same key
+    #
+    # time complexity = O(s log s), space complexity = O(s), where s is the number of stops
+    @staticmethod
+    def makeKey(routeLocations, version):
+        canonicalStops = ",".join(str(locationID) for locationID in sorted(set(routeLocations)))
+        return hashlib.sha256((str(version) + "|" + canonicalStops).encode()).hexdigest()
+
+    # returns the stored (route, solver name) for the key, or None if there is none. A route that is found becomes the
+    # most recently used. The route returned is a new list, which the caller is free to change
+    #
+    # time complexity = O(s), space complexity = O(s)
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return [list(stop) for stop in entry[1]], entry[2]
+
+    # stores a route under the key, evicting the least recently used route if the cache is full
+    #
+    # time complexity = O(s), space complexity = O(s)
+    def put(self, key, version, route, solver):
+        self.entries[key] = (version, tuple((stop[0], stop[1]) for stop in route), solver)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxEntries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    # drops every route built from a distance matrix version other than the given one
+    #
+    # time and space complexity = O(r), where r is the number of routes stored
+    def retainVersion(self, version):
+        staleKeys = [key for key, entry in self.entries.items() if entry[0] != version]
+        for key in staleKeys:
+            del self.entries[key]
+        return len(staleKeys)
+
+    # returns the hit, miss and eviction counts, and the number of routes stored
+    def getStats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self.entries),
+                "maxEntries": self.maxEntries}
+
+    # loads the routes saved at the cache's persist path, keeping the most recently used if there are too many
+    #
+    # time and space complexity = O(r)
+    def load(self):
+        try:
+            with open(self.persistPath, 'r') as read_obj:
+                saved = json.load(read_obj)
+            entries = [(entry["key"], (entry["version"], tuple((stop[0], stop[1]) for stop in entry["route"]),
+                                       entry["solver"])) for entry in saved["entries"]]
+        except (OSError, ValueError, KeyError, TypeError, IndexError):
+            return
+        for key, entry in entries[-self.maxEntries:]:
+            self.entries[key] = entry
+
+    # saves the routes to the cache's persist path, least recently used first. The file is written under a temporary
+    # name and then renamed, so a reader never sees a partly written file
+    #
+    # time and space complexity = O(r)
+    def save(self):
+        if self.persistPath is None:
+            return
+        saved = {"entries": [{"key": key, "version": version, "route": [list(stop) for stop in route], "solver": solver}
+                             for key, (version, route, solver) in self.entries.items()]}
+        temporaryPath = self.persistPath + "." + str(os.getpid()) + ".tmp"
+        with open(temporaryPath, 'w') as write_obj:
+            json.dump(saved, write_obj)
+        os.replace(temporaryPath, self.persistPath)
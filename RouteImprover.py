@@ -0,0 +1,218 @@
+import time
+
+import numpy as np
+
+from RouteBuilder import RouteBuilder
+
+
+# the route improver takes a route that has already been built (for example, by the nearest neighbor algorithm in the
+# RouteBuilder) and shortens it with local search. Two kinds of moves are tried:
+#
+#   2-opt   -   two edges of the tour are removed, and the segment between them is reversed and reconnected
+#   Or-opt  -   a run of 1 to 3 consecutive stops is cut out and reinserted elsewhere, in either direction
+#
+# each candidate move only changes a few edges of the tour, so its effect on total mileage is calculated in O(1) from
+# the edges added and removed. Candidate moves are only generated toward each stop's nearest neighbors, since moves that
+# connect distant stops almost never shorten a route
+class RouteImprover:
+
+    # number of nearest stops examined for every stop in the route when generating candidate moves
+    numNeighbors = 8
+
+    # longest run of consecutive stops moved by a single Or-opt move
+    maxSegmentLength = 3
+
+    # improvements smaller than this are ignored, so floating point noise can never cause the search to cycle
+    epsilon = 1e-9
+
+    # improves the truck's current route in place, stopping when no improving move remains or once the time budget
+    # (in seconds) has been spent. Returns the number of miles saved
+    #
+    # time complexity = O(n * k) per pass over the route, space complexity = O(n * k), where k is numNeighbors
+    @staticmethod
+    def improveRoute(truck, distMatrix, timeBudget=0.05):
+        distances = np.asarray(distMatrix, dtype=float)
+        indexOfLocation = {locationID: index for index, locationID in enumerate(truck.routeLocations)}
+        tour = [indexOfLocation[stop[0]] for stop in truck.route]
+
+        # fewer than 4 stops means every possible ordering has the same length
+        if len(tour) < 4:
+            return 0.0
+
+        startingMiles = RouteImprover.tourLength(tour, distances)
+        tour = RouteImprover.improveTour(tour, distances, time.perf_counter() + timeBudget)
+
+        # the Hub is rotated back to the front of the tour before the truck's route is rebuilt from it
+        hubPosition = tour.index(0)
+        tour = tour[hubPosition:] + tour[:hubPosition]
+        RouteBuilder.setTruckRoute(truck, tour, distances)
+        return startingMiles - RouteImprover.tourLength(tour, distances)
+
+    # alternates 2-opt and Or-opt passes over the tour until neither finds an improvement, or the deadline given in
+    # perf_counter seconds passes
+    #
+    # time complexity = O(n * k) per pass, space complexity = O(n * k)
+    @staticmethod
+    def improveTour(tour, distances, deadline):
+        numStops = len(tour)
+        numNeighbors = min(RouteImprover.numNeighbors, numStops - 1)
+
+        # each row of the neighbor list holds the index positions of the closest stops to that stop, nearest first.
+        # Position 0 of every sorted row is the stop itself, so it is skipped
+        neighbors = np.argsort(distances, axis=1, kind="stable")[:, 1:numNeighbors + 1].tolist()
+
+        # plain nested lists are used for the many individual distance lookups, since indexing them is much faster
+        # than indexing a NumPy array one element at a time
+        dist = distances.tolist()
+
+        tour = list(tour)
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = RouteImprover.twoOptPass(tour, dist, neighbors, deadline)
+            improved = RouteImprover.orOptPass(tour, dist, neighbors, deadline) or improved
+        return tour
+
+    # a single pass of 2-opt moves over every stop in the tour. Returns True if the tour was shortened
+    #
+    # time complexity = O(n * k) move evaluations, plus O(n) for each move that is applied
+    @staticmethod
+    def twoOptPass(tour, dist, neighbors, deadline):
+        numStops = len(tour)
+        position = RouteImprover.getPositions(tour)
+        improved = False
+
+        for a in range(numStops):
+            if time.perf_counter() >= deadline:
+                break
+            for direction in (1, -1):
+                i = position[a]
+                aNext = tour[(i + direction) % numStops]
+                removedFirst = dist[a][aNext]
+                for c in neighbors[a]:
+                    addedFirst = dist[a][c]
+
+                    # neighbors are sorted nearest first, so once a neighbor is no closer than the edge being removed,
+                    # no later neighbor can produce an improving move either
+                    if addedFirst >= removedFirst:
+                        break
+                    j = position[c]
+                    cNext = tour[(j + direction) % numStops]
+                    if cNext == a or c == aNext:
+                        continue
+                    delta = addedFirst + dist[aNext][cNext] - removedFirst - dist[c][cNext]
+                    if delta < -RouteImprover.epsilon:
+
+                        # the edges (a, aNext) and (c, cNext) are replaced with (a, c) and (aNext, cNext) by reversing
+                        # the stretch of tour that lies between them
+                        if direction == 1:
+                            RouteImprover.reverseSegment(tour, position, i + 1, j)
+                        else:
+                            RouteImprover.reverseSegment(tour, position, i, j - 1)
+                        improved = True
+                        break
+        return improved
+
+    # a single pass of Or-opt moves over every stop in the tour. Returns True if the tour was shortened
+    #
+    # time complexity = O(n * k) move evaluations, plus O(n) for each move that is applied
+    @staticmethod
+    def orOptPass(tour, dist, neighbors, deadline):
+        numStops = len(tour)
+        position = RouteImprover.getPositions(tour)
+        improved = False
+
+        for segmentLength in range(1, min(RouteImprover.maxSegmentLength, numStops - 3) + 1):
+            start = 0
+            while start < numStops:
+                if time.perf_counter() >= deadline:
+                    return improved
+                if RouteImprover.tryOrOptMove(tour, position, dist, neighbors, start, segmentLength):
+                    position = RouteImprover.getPositions(tour)
+                    improved = True
+                start += 1
+        return improved
+
+    # attempts to move the segment of the given length beginning at the given tour position next to one of the
+    # segment's endpoints' nearest neighbors. The first improving move found is applied, and True is returned
+    #
+    # time complexity = O(k) move evaluations, plus O(n) if the move is applied
+    @staticmethod
+    def tryOrOptMove(tour, position, dist, neighbors, start, segmentLength):
+        numStops = len(tour)
+        segment = [tour[(start + offset) % numStops] for offset in range(segmentLength)]
+        first = segment[0]
+        last = segment[-1]
+        before = tour[(start - 1) % numStops]
+        after = tour[(start + segmentLength) % numStops]
+
+        # mileage saved by cutting the segment out and joining the stops on either side of it
+        removalGain = dist[before][first] + dist[last][after] - dist[before][after]
+        if removalGain <= RouteImprover.epsilon:
+            return False
+
+        inSegment = set(segment)
+        for endpoint in (first, last):
+            for c in neighbors[endpoint]:
+                if c in inSegment:
+                    continue
+
+                # the segment may be inserted on either side of the neighbor - only insertion points that are not
+                # touching the segment's current position are considered
+                cPosition = position[c]
+                for p, q in ((c, tour[(cPosition + 1) % numStops]), (tour[(cPosition - 1) % numStops], c)):
+                    if p in inSegment or q in inSegment or (p == before and q == after):
+                        continue
+                    removedEdge = dist[p][q]
+                    forwardCost = dist[p][first] + dist[last][q] - removedEdge
+                    reverseCost = dist[p][last] + dist[first][q] - removedEdge
+                    insertionCost = min(forwardCost, reverseCost)
+                    if insertionCost - removalGain < -RouteImprover.epsilon:
+                        if reverseCost < forwardCost:
+                            segment.reverse()
+                        RouteImprover.moveSegment(tour, segment, p)
+                        return True
+        return False
+
+    # removes the given segment from the tour and reinserts it directly after stop p
+    #
+    # time and space complexity = O(n)
+    @staticmethod
+    def moveSegment(tour, segment, p):
+        inSegment = set(segment)
+        remaining = [stop for stop in tour if stop not in inSegment]
+        insertAt = remaining.index(p) + 1
+        tour[:] = remaining[:insertAt] + segment + remaining[insertAt:]
+
+    # reverses the tour between positions i and j (inclusive), wrapping around the end of the tour if i is after j,
+    # and keeps the position lookup in sync
+    #
+    # time complexity = O(n), space complexity = O(1)
+    @staticmethod
+    def reverseSegment(tour, position, i, j):
+        numStops = len(tour)
+        i %= numStops
+        j %= numStops
+        length = ((j - i) % numStops) + 1
+        for _ in range(length // 2):
+            tour[i], tour[j] = tour[j], tour[i]
+            position[tour[i]] = i
+            position[tour[j]] = j
+            i = (i + 1) % numStops
+            j = (j - 1) % numStops
+
+    # maps each stop to its index position in the tour
+    #
+    # time and space complexity = O(n)
+    @staticmethod
+    def getPositions(tour):
+        position = [0] * len(tour)
+        for index, stop in enumerate(tour):
+            position[stop] = index
+        return position
+
+    # total miles of the closed tour, including the drive from the last stop back to the first
+    #
+    # time complexity = O(n), space complexity = O(1)
+    @staticmethod
+    def tourLength(tour, distances):
+        return float(sum(distances[tour[i - 1]][tour[i]] for i in range(len(tour))))
@@ -0,0 +1,232 @@
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+
+import numpy as np
+
+
+# the scenario generator writes a synthetic delivery day of any size, in the same three csv formats as the real data
+# files - the distance table, the delivery names and addresses, and the package data - along with a settings file
+# describing the trucks and drivers needed to deliver it and the address corrections known ahead. Every scenario is
+# built from a seed, so the same seed and size always give the same files, and scaling runs can be repeated exactly
+#
+# locations are scattered at random over a square city area around the Hub, and the distance between two locations is
+# the straight line distance between them stretched by a road factor, so distances obey the triangle inequality as real
+# road distances roughly do. Packages are given deadlines, masses and special notes in about the proportions of the
+# real package data
+class ScenarioGenerator:
+
+    # file names written into the scenario directory
+    distanceFileName = 'DistanceTable.csv'
+    addressFileName = 'DeliveryNamesAndAddresses.csv'
+    packageFileName = 'PackageData.csv'
+    settingsFileName = 'HubSettings.json'
+
+    # width of the city area in miles, and how much longer the drive between two locations is than the straight line
+    cityWidthMiles = 12.0
+    roadFactor = 1.3
+
+    # the real data has 27 locations for 40 packages - larger scenarios share each location between more packages, up
+    # to a cap that keeps the distance table a manageable size
+    minLocations = 27
+    pkgsPerLocation = 5
+    maxLocations = 2000
+
+    # fraction of trucks given a departure time beyond the number needed to carry every package, so the load planner
+    # always has room to spare
+    spareTruckFraction = 0.25
+
+    # the share of packages given each deadline, and each kind of special note
+    deadlineShares = (("9:00 AM", 0.02), ("10:30 AM", 0.30))
+    delayedShare = 0.10
+    pinnedShare = 0.04
+    deliveredWithShare = 0.03
+    wrongAddressShare = 0.025
+
+    # the time the delayed packages arrive at the depot, and the time trucks waiting for them leave
+    delayedArrival = "9:05 am"
+    earlyDeparture = 480
+    lateDeparture = 545
+
+    # the minute a package listed with a wrong address is corrected - before the later trucks leave, so one of them is
+    # still at the Hub to take it
+    correctionTime = 540
+
+    streetNames = ("Main St", "State St", "Oak Ave", "Canyon Rd", "Dalton Ave", "Pioneer Rd", "Lake Dr", "Park Blvd",
+                   "Sunset Way", "River Rd", "Hill St", "Ridge Ave", "Valley Dr", "Cedar Ln", "Elm St", "Maple Ave")
+    placeKinds = ("Park", "Library", "Clinic", "Market", "School", "Office Park", "Apartments", "Hall", "Center",
+                  "Depot")
+
+    # writes a scenario with the given number of packages into the output directory, and returns the Hub settings
+    # needed to deliver it - which are also saved to the settings file, along with the address corrections. The number
+    # of locations and the number of packages a truck can carry may be given, and otherwise follow the real data
+    #
+    # time complexity = O(n + l^2), space complexity = O(n + l^2), where l is the number of locations
+    @staticmethod
+    def generate(outputDir, numPkgs, seed=0, numLocations=None, pkgsPerTruck=16):
+        if numPkgs < 1:
+            raise ValueError("A scenario needs at least 1 package, got " + str(numPkgs))
+        if numLocations is None:
+            numLocations = min(max(ScenarioGenerator.minLocations, numPkgs // ScenarioGenerator.pkgsPerLocation),
+                               ScenarioGenerator.maxLocations)
+        # a wrong address is corrected to another location, so there must be two besides the Hub
+        if numLocations < 3:
+            raise ValueError("A scenario needs at least 3 locations, got " + str(numLocations))
+
+        rng = random.Random(seed)
+        os.makedirs(outputDir, exist_ok=True)
+        addresses = ScenarioGenerator.writeLocations(outputDir, numLocations, rng)
+
+        # enough trucks to carry every package, with spares, and two thirds as many drivers as trucks - as in the real
+        # data. The later trucks wait for the delayed packages
+        numTrucks = math.ceil(numPkgs / pkgsPerTruck * (1 + ScenarioGenerator.spareTruckFraction)) + 1
+        numEarlyTrucks = max(1, numTrucks // 2)
+        truckDepartureTimes = {truckID: (ScenarioGenerator.earlyDeparture if truckID <= numEarlyTrucks
+                                         else ScenarioGenerator.lateDeparture) for truckID in range(1, numTrucks + 1)}
+        lateTrucks = list(range(numEarlyTrucks + 1, numTrucks + 1)) or [1]
+
+        addressCorrections = ScenarioGenerator.writePackages(outputDir, numPkgs, addresses, lateTrucks, rng)
+
+        settings = {"numTotalPackages": numPkgs,
+                    "numPkgsAllowedPerTruck": pkgsPerTruck,
+                    "numDrivers": max(1, math.ceil(numTrucks * 2 / 3)),
+                    "truckDepartureTimes": truckDepartureTimes}
+        with open(os.path.join(outputDir, ScenarioGenerator.settingsFileName), 'w') as write_obj:
+            json.dump({"seed": seed, "numLocations": numLocations, **settings,
+                       "addressCorrections": addressCorrections}, write_obj, indent=2)
+        return settings
+
+    # reads the Hub settings saved with a scenario. Truck IDs are turned back into integers, since JSON keys are text
+    #
+    # time and space complexity = O(t), where t is the number of trucks
+    @staticmethod
+    def loadSettings(scenarioDir):
+        with open(os.path.join(scenarioDir, ScenarioGenerator.settingsFileName), 'r') as read_obj:
+            saved = json.load(read_obj)
+        return {"numTotalPackages": saved["numTotalPackages"],
+                "numPkgsAllowedPerTruck": saved["numPkgsAllowedPerTruck"],
+                "numDrivers": saved["numDrivers"],
+                "truckDepartureTimes": {int(truckID): departure
+                                        for truckID, departure in saved["truckDepartureTimes"].items()}}
+
+    # reads the address corrections saved with a scenario, in the form DeliveryDay is given them - a map of package ID
+    # to (minute, address, city, state, zip). Settings saved without any have none
+    #
+    # time and space complexity = O(c), where c is the number of corrections
+    @staticmethod
+    def loadAddressCorrections(scenarioDir):
+        with open(os.path.join(scenarioDir, ScenarioGenerator.settingsFileName), 'r') as read_obj:
+            saved = json.load(read_obj)
+        return {int(pkgID): tuple(correction) for pkgID, correction in saved.get("addressCorrections", {}).items()}
+
+    # writes the address file and the lower triangle distance table for the given number of locations, the first of
+    # which is the Hub at the center of the city. Returns the address of each location, in location ID order
+    #
+    # time and space complexity = O(l^2)
+    @staticmethod
+    def writeLocations(outputDir, numLocations, rng):
+        half = ScenarioGenerator.cityWidthMiles / 2
+        points = np.array([(0.0, 0.0)] + [(rng.uniform(-half, half), rng.uniform(-half, half))
+                                          for _ in range(numLocations - 1)])
+
+        names = ["Western Governors University"]
+        addresses = ["4001 South 700 East"]
+        usedAddresses = set(addresses)
+        while len(addresses) < numLocations:
+            address = str(rng.randrange(100, 9999)) + " " + rng.choice(ScenarioGenerator.streetNames)
+            if address not in usedAddresses:
+                usedAddresses.add(address)
+                addresses.append(address)
+                names.append(address.split(" ", 1)[1].split(" ")[0] + " " + rng.choice(ScenarioGenerator.placeKinds))
+
+        with open(os.path.join(outputDir, ScenarioGenerator.addressFileName), 'w', newline='') as write_obj:
+            csv.writer(write_obj, quoting=csv.QUOTE_ALL).writerows(zip(names, addresses))
+
+        # row i of the distance table holds the distances from location i to locations 0 through i
+        with open(os.path.join(outputDir, ScenarioGenerator.distanceFileName), 'w') as write_obj:
+            for i in range(numLocations):
+                rowMiles = np.hypot(*(points[:i + 1] - points[i]).T) * ScenarioGenerator.roadFactor
+                write_obj.write(",".join(format(miles, ".1f") for miles in rowMiles) + "\n")
+        return addresses
+
+    # writes the package data file, and returns the address correction of each package listed with a wrong address,
+    # as a map of package ID to [minute, address, city, state, zip]
+    #
+    # time and space complexity = O(n)
+    @staticmethod
+    def writePackages(outputDir, numPkgs, addresses, lateTrucks, rng):
+        notes = [""] * (numPkgs + 1)
+        addressCorrections = dict()
+
+        # packages that must be delivered together are given in small groups of neighboring package IDs, each package
+        # naming the others in its group
+        pkgID = 1
+        while pkgID + 2 <= numPkgs:
+            group = [pkgID, pkgID + 1, pkgID + 2]
+            if rng.random() < ScenarioGenerator.deliveredWithShare:
+                for member in group:
+                    notes[member] = "Must be delivered with " + ", ".join(str(other) for other in group
+                                                                          if other != member)
+            pkgID += 3
+
+        # each truck has at most one package pinned to it. Packages sharing an address may join a pinned package on
+        # its truck, so a truck with several pinned packages could be asked to carry more than it has room for
+        unpinnedTrucks = list(lateTrucks)
+        rng.shuffle(unpinnedTrucks)
+
+        with open(os.path.join(outputDir, ScenarioGenerator.packageFileName), 'w', newline='') as write_obj:
+            pkgWriter = csv.writer(write_obj)
+            for pkgID in range(1, numPkgs + 1):
+                address = rng.choice(addresses[1:])
+                deadline = "EOD"
+                roll = rng.random()
+                for deadlineText, share in ScenarioGenerator.deadlineShares:
+                    if roll < share:
+                        deadline = deadlineText
+                        break
+                    roll -= share
+
+                # delayed, pinned and wrong address packages never have an early deadline, so no deadline is set
+                # before the package can leave the Hub. A wrong address is corrected to another location. Deadlines
+                # are not otherwise checked against the trucks - packages with a deadline fill the early trucks first,
+                # and some of them are delivered late, which the benchmark reports
+                note = notes[pkgID]
+                if not note and deadline == "EOD":
+                    roll = rng.random()
+                    if roll < ScenarioGenerator.delayedShare:
+                        note = ("Delayed on flight - will not arrive to depot until " +
+                                ScenarioGenerator.delayedArrival)
+                    elif roll < ScenarioGenerator.delayedShare + ScenarioGenerator.pinnedShare and unpinnedTrucks:
+                        note = "Can only be on truck " + str(unpinnedTrucks.pop())
+                    elif roll < ScenarioGenerator.delayedShare + ScenarioGenerator.pinnedShare + \
+                            ScenarioGenerator.wrongAddressShare:
+                        note = "Wrong address listed"
+                        addressCorrections[pkgID] = [ScenarioGenerator.correctionTime,
+                                                     rng.choice([other for other in addresses[1:] if other != address]),
+                                                     "Salt Lake City", "UT", "84" + str(rng.randrange(100, 200))]
+
+                pkgWriter.writerow([pkgID, address, "Salt Lake City", "UT", "84" + str(rng.randrange(100, 200)),
+                                    deadline, rng.randrange(1, 90), note])
+        return addressCorrections
+
+    # reads the command line options and writes a scenario
+    @staticmethod
+    def main(args):
+        parser = argparse.ArgumentParser(description="Write a synthetic WGUPS delivery scenario")
+        parser.add_argument("outputDir", help="directory the scenario files are written to")
+        parser.add_argument("--packages", type=int, default=1000, help="number of packages (default: 1000)")
+        parser.add_argument("--locations", type=int, default=None,
+                            help="number of locations, including the Hub (default: scales with the packages)")
+        parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+        options = parser.parse_args(args)
+
+        ScenarioGenerator.generate(options.outputDir, options.packages, options.seed, options.locations)
+        print("Wrote a " + str(options.packages) + " package scenario to " + options.outputDir)
+
+
+if __name__ == "__main__":
+    ScenarioGenerator.main(sys.argv[1:])
@@ -0,0 +1,321 @@
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from Clock import Clock
+from Hub import Hub
+from DeliveryDay import DeliveryDay
+from DistanceMatrix import DistanceMatrix
+from LocationsInit import LocationsInit
+from PackageInit import PackageInit
+from PackageStore import PackageStore
+from ParallelRouteBuilder import ParallelRouteBuilder
+from ScenarioGenerator import ScenarioGenerator
+
+
+# the scenario sweep answers "what if" questions about a delivery day - what if truck 2 leaves at 9:00 AM instead of
+# 9:05 AM, or what if a third driver is hired - by running the day once for every combination in a grid of parameters,
+# spread over a pool of worker processes, and reporting the total mileage, late packages and runtime of every run in a
+# single table. A grid maps each parameter to the list of values to try. The parameters are:
+#
+#   a Hub setting   -   such as numDrivers, numPkgsAllowedPerTruck, maxMassPerTruck, dayStartTime or clusterStops
+#   numTrucks       -   the size of the fleet. Trucks added beyond the base fleet have no planned departure time, so
+#                       they leave as soon as a driver is free
+#   departure:N     -   the planned departure time of truck N, in minutes since midnight or 'H:MM <AM/PM>', or None
+#                       for a truck that leaves as soon as a driver is free
+#   routing         -   how the routes are built - one of the modes in routingModes
+#
+# the csv files are read once, before any day is run. The distance matrix is copied into a block of shared memory that
+# every worker maps, as in the parallel route builder, and the addresses and packages are handed to each worker once as
+# it starts - so a run reads nothing from disk, and only copies the package store, which its day changes
+class ScenarioSweep:
+
+    # the Hub settings each routing mode stands for
+    routingModes = {"default": {},
+                    "nearest-neighbor": {"exactRouteMaxStops": 0},
+                    "local-search": {"routeImprovementTimeBudget": 0.05},
+                    "deadline-aware": {"deadlineAwareRoutes": True},
+                    "deadline-aware+local-search": {"deadlineAwareRoutes": True, "routeImprovementTimeBudget": 0.05}}
+
+    # the columns of the results table that follow the parameters
+    resultColumns = ("totalMiles", "latePackages", "lastReturn", "runtime", "error")
+
+    # the distance matrix, location ID map and package store the days are run from, in a worker process or in this one
+    workerData = None
+
+    # runs the delivery day once for every combination of the grid's parameters, and returns a list with the results of
+    # each run, in grid order. The csv files are read once, and the runs are spread over the given number of worker
+    # processes - 0 uses one per CPU. Any Hub settings given are the base every run starts from, and any address
+    # corrections given are known ahead to every day, as in DeliveryDay
+    #
+    # time complexity = O(r * d / w), where r is the number of runs, d the time of one day, and w the number of
+    # workers. Space complexity = O(l^2 + n) shared by every worker, plus O(n) for each run in progress
+    @staticmethod
+    def runSweep(grid, distancePath='DistanceTable.csv', addressPath='DeliveryNamesAndAddresses.csv',
+                 packagePath='PackageData.csv', numTotalPackages=40, baseSettings=None, numWorkers=0,
+                 addressCorrections=None):
+        scenarios = ScenarioSweep.expandGrid(grid)
+        baseSettings = dict(baseSettings or {})
+        locationIDMap = LocationsInit.getLocationIDMap(addressPath)
+        distMatrix = LocationsInit.initMasterAdjacencyMatrix(distancePath)
+        store = PackageStore()
+        PackageInit.getPkgTable(locationIDMap, numTotalPackages, packagePath, store=store)
+
+        numWorkers = min(ParallelRouteBuilder.getNumWorkers(numWorkers), len(scenarios))
+        if numWorkers <= 1:
+            ScenarioSweep.workerData = (distMatrix, locationIDMap, store)
+            try:
+                return [ScenarioSweep.runScenario(index, parameters, baseSettings, numTotalPackages, addressCorrections)
+                        for index, parameters in enumerate(scenarios)]
+            finally:
+                ScenarioSweep.workerData = None
+
+        packedDistances = np.ascontiguousarray(distMatrix.packedDistances, dtype=DistanceMatrix.distanceType)
+        sharedMemory = shared_memory.SharedMemory(create=True, size=max(1, packedDistances.nbytes))
+        try:
+            np.ndarray(packedDistances.shape, dtype=DistanceMatrix.distanceType,
+                       buffer=sharedMemory.buf)[:] = packedDistances
+            with ProcessPoolExecutor(max_workers=numWorkers, initializer=ScenarioSweep.attachWorker,
+                                     initargs=(sharedMemory.name, len(packedDistances), distMatrix.version,
+                                               locationIDMap, store)) as pool:
+                futures = [pool.submit(ScenarioSweep.runScenario, index, parameters, baseSettings, numTotalPackages,
+                                       addressCorrections) for index, parameters in enumerate(scenarios)]
+
+                # results are gathered in grid order, not the order they finish in
+                return [future.result() for future in futures]
+        finally:
+            sharedMemory.close()
+            sharedMemory.unlink()
+
+    # returns every combination of the grid's parameters, as a list of dictionaries mapping each parameter to one of
+    # its values. Parameters vary in the order given, the last fastest. A value that is not a list is taken as the only
+    # value of its parameter, and an empty grid gives a single run with the base settings. A ValueError is raised for a
+    # parameter that is not known
+    #
+    # time and space complexity = O(r * p), where r is the number of runs and p the number of parameters
+    @staticmethod
+    def expandGrid(grid):
+        for name in grid:
+            ScenarioSweep.checkParameter(name)
+        names = list(grid)
+        valueLists = [grid[name] if isinstance(grid[name], list) else [grid[name]] for name in names]
+        return [dict(zip(names, values)) for values in itertools.product(*valueLists)]
+
+    # raises a ValueError if the given name is not a parameter a sweep can vary
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def checkParameter(name):
+        if name in ("routing", "numTrucks"):
+            return
+        if name.startswith("departure:"):
+            if not name[len("departure:"):].isdigit():
+                raise ValueError("Parameter '" + name + "' must name a truck ID, as in 'departure:2'")
+            return
+        if not hasattr(Hub, name) or isinstance(getattr(Hub, name), property) or callable(getattr(Hub, name)):
+            raise ValueError("Unknown parameter '" + name + "' - expected a Hub setting, numTrucks, departure:N or "
+                             "routing")
+
+    # returns the Hub settings for one run - the base settings, changed by the run's parameters. Routes are always
+    # built in the run's own process, and the route cache is never saved, so runs cannot affect one another. A
+    # ValueError is raised for a parameter value that does not apply
+    #
+    # time and space complexity = O(t + p)
+    @staticmethod
+    def getSettings(baseSettings, parameters):
+        settings = dict(baseSettings)
+        routing = parameters.get("routing", "default")
+        if routing not in ScenarioSweep.routingModes:
+            raise ValueError("Unknown routing mode '" + str(routing) + "' - expected one of " +
+                             ", ".join(ScenarioSweep.routingModes))
+        settings.update(ScenarioSweep.routingModes[routing])
+        for name, value in parameters.items():
+            if name not in ("routing", "numTrucks") and not name.startswith("departure:"):
+                settings[name] = value
+
+        departures = dict(settings.get("truckDepartureTimes", Hub.truckDepartureTimes))
+        if "numTrucks" in parameters:
+            numTrucks = parameters["numTrucks"]
+            if not isinstance(numTrucks, int) or numTrucks < 1:
+                raise ValueError("numTrucks must be a whole number of at least 1, got " + str(numTrucks))
+            departures = {truckID: departures.get(truckID) for truckID in range(1, numTrucks + 1)}
+        for name, value in parameters.items():
+            if name.startswith("departure:"):
+                truckID = int(name[len("departure:"):])
+                if truckID not in departures:
+                    raise ValueError("Truck " + str(truckID) + " is not in the fleet")
+                departures[truckID] = ScenarioSweep.parseDeparture(value)
+        settings["truckDepartureTimes"] = departures
+        settings["routeBuildWorkers"] = 1
+        settings["routeCachePath"] = None
+        return settings
+
+    # converts a departure time - minutes since midnight, a string in format 'H:MM <AM/PM>', or None - into minutes
+    # since midnight, or None. A ValueError is raised for any other value
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def parseDeparture(value):
+        if value is None or (isinstance(value, int) and not isinstance(value, bool) and 0 <= value < 1440):
+            return value
+        if isinstance(value, str) and Clock.getValidInput(value.strip()):
+            return Clock.convertTimeToInt(value.strip())
+        raise ValueError("A departure time must be minutes since midnight, 'H:MM <AM/PM>' or None, got " + str(value))
+
+    # runs once in each worker process as it starts, and maps the shared distance matrix
+    #
+    # time and space complexity = O(1), besides receiving the addresses and packages
+    @staticmethod
+    def attachWorker(memoryName, numDistances, version, locationIDMap, store):
+        ParallelRouteBuilder.attachWorker(memoryName, numDistances, version)
+        ScenarioSweep.workerData = (ParallelRouteBuilder.workerMatrix, locationIDMap, store)
+
+    # runs the delivery day for one combination of parameters, and returns its results. A run whose parameters do not
+    # apply, or whose packages cannot all be loaded, is given an error in place of its results. What the day writes to
+    # standard error, such as missed deadlines, is left out, since the late packages are counted in the results
+    #
+    # time and space complexity = that of the delivery day
+    @staticmethod
+    def runScenario(index, parameters, baseSettings, numTotalPackages, addressCorrections=None):
+        distMatrix, locationIDMap, store = ScenarioSweep.workerData
+        result = {"scenario": index, "parameters": parameters}
+        result.update(dict.fromkeys(ScenarioSweep.resultColumns))
+        startTime = time.perf_counter()
+        try:
+            hub = Hub(**ScenarioSweep.getSettings(baseSettings, parameters))
+            hub.useLoadedData(distMatrix, locationIDMap)
+            day = DeliveryDay(hub, numTotalPackages=numTotalPackages, addressCorrections=addressCorrections)
+            day.loadPackageStore(store)
+            with contextlib.redirect_stderr(io.StringIO()):
+                day.startDeliveryDay()
+            stranded = [truck.truckID for truck in day.trucks if truck.timeOfReturn is None]
+            if stranded:
+                raise ValueError("Trucks " + str(stranded) + " never left the Hub")
+        except (ValueError, TypeError) as error:
+            result["runtime"] = round(time.perf_counter() - startTime, 4)
+            result["error"] = str(error)
+            return result
+
+        result["runtime"] = round(time.perf_counter() - startTime, 4)
+        result["totalMiles"] = round(sum(truck.cumulativeMiles for truck in day.trucks), 1)
+        # a package held at the Hub for a wrong address that was never corrected is never delivered, and counts as late
+        result["latePackages"] = sum(1 for pkg in day.getAllPackages()
+                                     if pkg.timeDelivered is None or pkg.timeDelivered > pkg.deliveryDeadline)
+        result["lastReturn"] = Clock.convertIntToTime(max(truck.timeOfReturn for truck in day.trucks))
+        return result
+
+    # returns the results as rows of text, the first holding the column names - one column per parameter, followed by
+    # the result columns
+    #
+    # time and space complexity = O(r * c), where c is the number of columns
+    @staticmethod
+    def getTable(results):
+        parameterNames = list(dict.fromkeys(name for result in results for name in result["parameters"]))
+        rows = [["scenario"] + parameterNames + list(ScenarioSweep.resultColumns)]
+        for result in results:
+            rows.append([str(result["scenario"])] +
+                        [ScenarioSweep.formatValue(name, result["parameters"].get(name)) for name in parameterNames] +
+                        [ScenarioSweep.formatValue(column, result[column]) for column in ScenarioSweep.resultColumns])
+        return rows
+
+    # returns a parameter or result value as text. Departure times are shown as clock times
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def formatValue(name, value):
+        if value is None:
+            return ""
+        if name.startswith("departure:") and isinstance(value, int):
+            return Clock.convertIntToTime(value)
+        if isinstance(value, dict):
+            return json.dumps({str(key): item for key, item in value.items()})
+        return str(value)
+
+    # prints the results as a table with aligned columns
+    @staticmethod
+    def printResults(results, file=sys.stdout):
+        rows = ScenarioSweep.getTable(results)
+        widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+        for row in rows:
+            print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip(), file=file)
+
+    # saves the results table as a csv file
+    @staticmethod
+    def writeResults(results, outputPath):
+        with open(outputPath, 'w', newline='') as write_obj:
+            csv.writer(write_obj).writerows(ScenarioSweep.getTable(results))
+
+    # converts a value given on the command line - a number, true, false, null or None are read as such, and anything
+    # else is kept as text
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def parseValue(text):
+        if text.lower() == "none":
+            return None
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+
+    # reads the command line options, runs the sweep, and prints the results table
+    @staticmethod
+    def main(args):
+        parser = argparse.ArgumentParser(description="Run the WGUPS delivery day for every combination of a grid of "
+                                                     "parameters, and compare the results")
+        parser.add_argument("--param", nargs="+", action="append", default=[], metavar=("NAME", "VALUE"),
+                            help="a parameter and the values to try, such as '--param numDrivers 2 3' or "
+                                 "'--param departure:2 \"9:00 AM\" \"9:05 AM\"' - may be given more than once")
+        parser.add_argument("--grid", metavar="FILE",
+                            help="a JSON file mapping each parameter to the list of values to try")
+        parser.add_argument("--scenario-dir", metavar="DIR",
+                            help="run a scenario written by the scenario generator, with its Hub settings as the base")
+        parser.add_argument("--workers", type=int, default=0,
+                            help="worker processes that run the days - 0 uses one per CPU (default: 0)")
+        parser.add_argument("--output", metavar="FILE", help="also save the results table as a csv file")
+        options = parser.parse_args(args)
+
+        grid = dict()
+        if options.grid:
+            with open(options.grid, 'r') as read_obj:
+                grid = json.load(read_obj)
+            if not isinstance(grid, dict):
+                parser.error("--grid must hold a JSON object")
+        for param in options.param:
+            if len(param) < 2:
+                parser.error("--param needs a name and at least one value")
+            grid[param[0]] = [ScenarioSweep.parseValue(value) for value in param[1:]]
+
+        paths = ('DistanceTable.csv', 'DeliveryNamesAndAddresses.csv', 'PackageData.csv')
+        baseSettings = dict()
+        numTotalPackages = 40
+        addressCorrections = DeliveryDay.sampleAddressCorrections
+        if options.scenario_dir:
+            paths = tuple(os.path.join(options.scenario_dir, fileName)
+                          for fileName in (ScenarioGenerator.distanceFileName, ScenarioGenerator.addressFileName,
+                                           ScenarioGenerator.packageFileName))
+            baseSettings = ScenarioGenerator.loadSettings(options.scenario_dir)
+            numTotalPackages = baseSettings.pop("numTotalPackages")
+            addressCorrections = ScenarioGenerator.loadAddressCorrections(options.scenario_dir)
+        try:
+            results = ScenarioSweep.runSweep(grid, *paths, numTotalPackages, baseSettings, options.workers,
+                                             addressCorrections)
+        except ValueError as error:
+            parser.error(str(error))
+        ScenarioSweep.printResults(results)
+        if options.output:
+            ScenarioSweep.writeResults(results, options.output)
+
+
+if __name__ == "__main__":
+    ScenarioSweep.main(sys.argv[1:])
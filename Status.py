@@ -0,0 +1,16 @@
+from enum import IntEnum
+
+
+# the status codes a package can have over the course of the delivery day. Statuses are stored and compared as these
+# small integer codes, and only turned into human-readable text when they are displayed
+class PackageStatus(IntEnum):
+    AT_HUB = 0
+    EN_ROUTE = 1
+    DELIVERED = 2
+
+
+# the status codes a truck can have over the course of the delivery day
+class TruckStatus(IntEnum):
+    NOT_STARTED = 0
+    ON_ROUTE = 1
+    RETURNED = 2
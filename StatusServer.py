@@ -0,0 +1,216 @@
+import asyncio
+import json
+from types import MappingProxyType
+
+from BatchQuery import BatchQuery
+from Clock import Clock
+from Status import PackageStatus, TruckStatus
+
+
+# the status server answers status queries over a local socket, so support tools can ask about the day while it is
+# served, without the interactive menu. It listens on a TCP address given as 'HOST:PORT', or on a Unix socket given as
+# 'unix:PATH', and any number of clients may be connected at once. Each request is one line, and each answer is one line
+# of JSON, written in the order the requests were sent. A request is either a JSON object, or a line of words:
+#
+#   {"query": "package-status", "package_id": 9, "time": "10:25 AM"}   or   package 9 10:25 AM
+#   {"query": "truck-status", "truck_id": 2, "time": 625}              or   truck 2 10:25 AM
+#   {"query": "fleet-mileage", "time": "10:25 AM"}                     or   mileage 10:25 AM
+#
+# times are minutes since midnight or strings in format 'H:MM <AM/PM>', as in batch queries. A client ends its session
+# with the line 'quit', or by closing its connection.
+#
+# every query is answered from the snapshot the server holds at the time - a read-only copy of a simulated day that
+# is never changed once taken. A new snapshot is published by a single assignment, so a query sees either the old day
+# or the new one in full, and queries never wait on each other or on the day being simulated
+class StatusServer:
+
+    # the text commands, and the query each one stands for
+    commands = {"package": "package-status", "truck": "truck-status", "mileage": "fleet-mileage",
+                "fleet": "fleet-mileage"}
+
+    # answers are written out once this many bytes are waiting to be sent, so a client sending many requests at once
+    # is not made to wait for each answer in turn
+    writeBufferLimit = 64 * 1024
+
+    # most distinct time strings remembered for each client
+    maxCachedTimes = 4096
+
+    # the server is created holding the given snapshot, or none until one is published
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot
+        self.server = None
+
+    # replaces the snapshot queries are answered from. Queries already being answered finish with the old snapshot
+    #
+    # time and space complexity = O(1)
+    def publish(self, snapshot):
+        self.snapshot = snapshot
+
+    # starts listening on the given address - 'HOST:PORT' for TCP, or 'unix:PATH' for a Unix socket - and returns the
+    # asyncio server
+    async def start(self, address):
+        if address.startswith("unix:"):
+            self.server = await asyncio.start_unix_server(self.handleConnection, path=address[len("unix:"):])
+        else:
+            host, port = StatusServer.parseAddress(address)
+            self.server = await asyncio.start_server(self.handleConnection, host, port)
+        return self.server
+
+    # starts listening on the given address, and serves until the task is cancelled
+    async def serveForever(self, address):
+        server = await self.start(address)
+        async with server:
+            await server.serve_forever()
+
+    # returns (host, port) from an address in format 'HOST:PORT'. A ValueError is raised if it is not in that format
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def parseAddress(address):
+        host, separator, port = address.rpartition(":")
+        if not separator or not port.isdigit() or int(port) > 65535:
+            raise ValueError("Server address must be 'HOST:PORT' or 'unix:PATH', got '" + address + "'")
+        return host or "127.0.0.1", int(port)
+
+    # reads a client's requests a line at a time, and writes an answer to each, until the client quits or disconnects
+    #
+    # time complexity = O(r log n), where r is the number of requests, space complexity = O(1)
+    async def handleConnection(self, reader, writer):
+        timeCache = dict()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = line.decode(errors="replace").strip()
+                if not request:
+                    continue
+                if request.lower() == "quit":
+                    break
+                writer.write((json.dumps(self.answerRequest(request, timeCache)) + "\n").encode())
+                if writer.transport.get_write_buffer_size() > StatusServer.writeBufferLimit:
+                    await writer.drain()
+            await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            # every answer has already been drained, so the connection is closed without waiting on the client
+            writer.close()
+
+    # answers a single request line, returning the answer as a dictionary. A request that cannot be answered gives an
+    # answer with an "error" field
+    #
+    # time complexity = O(log n) for a package or truck, O(t log s) for the fleet, space complexity = O(t)
+    def answerRequest(self, request, timeCache):
+        snapshot = self.snapshot
+        if snapshot is None:
+            return {"error": "No delivery day has been published yet"}
+        query = StatusServer.parseRequest(request)
+        if query is None:
+            return {"error": "Request must be a JSON object with a 'query' field, or 'package ID TIME', "
+                             "'truck ID TIME' or 'mileage TIME'"}
+
+        queryType = query.get("query")
+        if len(timeCache) >= StatusServer.maxCachedTimes:
+            timeCache.clear()
+        minute = BatchQuery.parseTime(query.get("time"), timeCache)
+        if minute is None:
+            return {"query": queryType, "error": "Time must be minutes since midnight or a string in format "
+                                                 "'H:MM <AM/PM>'"}
+        if queryType == "package-status":
+            return snapshot.getPackageStatus(query.get("package_id"), minute)
+        if queryType == "truck-status":
+            return snapshot.getTruckStatus(query.get("truck_id"), minute)
+        if queryType == "fleet-mileage":
+            return snapshot.getFleetMileage(minute)
+        return {"query": queryType, "error": "Unknown query - expected one of package-status, truck-status, "
+                                             "fleet-mileage"}
+
+    # converts a request line into a query dictionary, or returns None if it is neither a JSON object nor a known
+    # command followed by its arguments
+    #
+    # time and space complexity = O(1)
+    @staticmethod
+    def parseRequest(request):
+        if request.startswith("{"):
+            try:
+                query = json.loads(request)
+            except ValueError:
+                return None
+            return query if isinstance(query, dict) else None
+
+        words = request.split(None, 1)
+        queryType = StatusServer.commands.get(words[0].lower())
+        if queryType is None or len(words) < 2:
+            return None
+        if queryType == "fleet-mileage":
+            return {"query": queryType, "time": StatusServer.parseTimeWord(words[1])}
+        idAndTime = words[1].split(None, 1)
+        if len(idAndTime) < 2 or not idAndTime[0].isdigit():
+            return None
+        idField = "package_id" if queryType == "package-status" else "truck_id"
+        return {"query": queryType, idField: int(idAndTime[0]), "time": StatusServer.parseTimeWord(idAndTime[1])}
+
+    # a time in a text command is read as minutes since midnight if it is a whole number, and otherwise left as text
+    @staticmethod
+    def parseTimeWord(timeWord):
+        return int(timeWord) if timeWord.isdigit() else timeWord
+
+
+# a read-only copy of everything the status server needs from a simulated day - the day's timeline, which is already
+# never changed once built, and the details of each package shown in its answers. Taken with StatusSnapshot.fromDay
+class StatusSnapshot:
+
+    # the package details are given as a mapping from each package ID to (address, city, zip code, delivery deadline)
+    def __init__(self, timeline, packageDetails):
+        self.timeline = timeline
+        self.packageDetails = MappingProxyType(packageDetails)
+
+    # takes a snapshot of the day's current timeline and packages
+    #
+    # time and space complexity = O(n)
+    @staticmethod
+    def fromDay(day):
+        return StatusSnapshot(day.timeline, {pkg.pkgID: (pkg.address, pkg.city, pkg.zip, pkg.deliveryDeadline)
+                                             for pkg in day.getAllPackages()})
+
+    # returns the answer to a package status query
+    #
+    # time complexity = O(log n), space complexity = O(1)
+    def getPackageStatus(self, pkgID, minute):
+        answer = {"query": "package-status", "package_id": pkgID, "time": Clock.convertIntToTime(minute)}
+        details = self.packageDetails.get(pkgID) if isinstance(pkgID, int) and not isinstance(pkgID, bool) else None
+        if details is None:
+            answer["error"] = "Unknown package ID"
+            return answer
+        status, truckID, statusTime = self.timeline.getPackageStatus(pkgID, minute)
+        answer["status"] = status.name.lower()
+        answer["truck"] = truckID
+        answer["status_since"] = Clock.convertIntToTime(statusTime) if status != PackageStatus.AT_HUB else None
+        answer["address"], answer["city"], answer["zip"] = details[0], details[1], details[2]
+        answer["delivery_deadline"] = Clock.convertIntToTime(details[3])
+        return answer
+
+    # returns the answer to a truck status query
+    #
+    # time complexity = O(log s), space complexity = O(1)
+    def getTruckStatus(self, truckID, minute):
+        answer = {"query": "truck-status", "truck_id": truckID, "time": Clock.convertIntToTime(minute)}
+        if not isinstance(truckID, int) or isinstance(truckID, bool) or truckID not in self.timeline.truckEvents:
+            answer["error"] = "Unknown truck ID"
+            return answer
+        status, miles, statusTime = self.timeline.getTruckStatus(truckID, minute)
+        answer["status"] = status.name.lower()
+        answer["miles"] = round(miles, 2)
+        answer["status_since"] = Clock.convertIntToTime(statusTime) if status != TruckStatus.NOT_STARTED else None
+        return answer
+
+    # returns the answer to a fleet mileage query - the miles each truck has driven, and their total
+    #
+    # time complexity = O(t log s), space complexity = O(t)
+    def getFleetMileage(self, minute):
+        truckMiles = {str(truckID): self.timeline.getTruckMileage(truckID, minute)
+                      for truckID in self.timeline.truckIDs}
+        return {"query": "fleet-mileage", "time": Clock.convertIntToTime(minute),
+                "trucks": {truckID: round(miles, 2) for truckID, miles in truckMiles.items()},
+                "total_miles": round(sum(truckMiles.values()), 2)}
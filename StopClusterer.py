@@ -0,0 +1,283 @@
+import math
+
+import numpy as np
+
+from Clock import Clock
+from LoadPlanner import LoadPlanner
+from RouteBuilder import RouteBuilder
+
+
+# the stop clusterer assigns packages to trucks by grouping stops that lie close together on the master distance
+# matrix, so each truck serves one compact area instead of stops scattered across the whole map. It is a form of
+# k-medoids clustering in which every truck has a limit on the packages and the mass it may carry:
+#
+#   seeding     -   each truck put to use is given a medoid - the delivery location at the centre of its area. Trucks
+#                   that packages are pinned to start at those packages' stops, and the rest are spread out by picking,
+#                   one at a time, the stop farthest from the Hub and from every medoid picked so far
+#   assignment  -   every group of packages goes to the nearest medoid whose truck still has room for it. The groups
+#                   that may use the fewest trucks are placed first, then those that would lose the most by missing
+#                   their nearest truck
+#   update      -   each truck's medoid moves to the stop in its area with the least total distance to the area's
+#                   packages
+#
+# the assignment and update steps repeat until the medoids stop moving. The groups are those of the load planner, so
+# packages that must travel together stay together, and the rest of the notes the load planner honors are kept by only
+# letting a group go on the trucks it may use - the truck it is pinned to, trucks that leave after it is ready, and,
+# for a group with a deadline, trucks with a planned departure early enough to reach its stop by that deadline.
+#
+# the distances from every group to every medoid are pulled from the matrix a block of rows at a time, and only each
+# group's nearest few trucks are kept, so a round of assignment takes O(g * k) vectorized work and O(g) steps in Python,
+# and the memory used stays the same however many groups and trucks there are
+class StopClusterer:
+
+    # most rounds of assignment and update before the clustering stops
+    maxIterations = 10
+
+    # fraction of trucks put to use beyond the fewest that could carry every package, so that an area does not have to
+    # be split up just because its nearest truck is full
+    spareTruckFraction = 0.1
+
+    # number of nearest trucks kept for each group in a round of assignment. A group whose nearest trucks are all full
+    # is compared against every truck it may use
+    numCandidates = 16
+
+    # most group-to-truck distances pulled from the matrix at once
+    blockSize = 1 << 22
+
+    # builds the load for every truck by clustering the packages' stops. truckDepartures maps each truck ID to the time
+    # in minutes since midnight at which it is planned to leave the Hub, or None for trucks that wait for a driver, and
+    # a truck may carry at most maxPkgsPerTruck packages and, if given, maxMassPerTruck kilograms. Returns a
+    # dictionary mapping each truck ID to the list of package IDs to load onto it, which is empty for trucks that are
+    # not needed - packages held at the Hub for a wrong address, as in the load planner, are not in any load. A
+    # ValueError is raised if the packages cannot all be loaded without breaking a constraint
+    #
+    # time complexity = O(i * g * k), where i is the number of rounds, g the number of groups and k the number of
+    # trucks in use. Space complexity = O(n + t)
+    @staticmethod
+    def clusterLoads(packages, truckDepartures, maxPkgsPerTruck, distMatrix, maxMassPerTruck=None,
+                     addressCorrectionTimes=None):
+        packagesByID = {pkg.pkgID: pkg for pkg in packages}
+        groups = [group for group in LoadPlanner.groupPackages(packagesByID, maxPkgsPerTruck, addressCorrectionTimes)
+                  if not LoadPlanner.isHeld(group, packagesByID, addressCorrectionTimes)]
+
+        # trucks are referred to by their position in order of departure, as in the load planner
+        truckOrder = sorted(truckDepartures, key=lambda truckID: (truckDepartures[truckID] is None,
+                                                                  truckDepartures[truckID] or 0, truckID))
+        positionOfTruck = {truckID: position for position, truckID in enumerate(truckOrder)}
+        departures = np.array([truckDepartures[truckID] if truckDepartures[truckID] is not None else math.inf
+                               for truckID in truckOrder], dtype=float)
+        if not groups:
+            return {truckID: [] for truckID in truckOrder}
+
+        # each group is described by its number of packages, its mass, the stop it is clustered by - that of its
+        # lowest package ID - and the times and truck it is held to
+        numGroups = len(groups)
+        sizes = np.array([len(group) for group in groups], dtype=np.int64)
+        masses = np.array([sum(packagesByID[pkgID].mass for pkgID in group) for group in groups], dtype=float)
+        locations = np.array([packagesByID[min(group)].deliveryLocationID for group in groups], dtype=np.int64)
+        pins = np.full(numGroups, -1, dtype=np.int64)
+        availableTimes = np.zeros(numGroups, dtype=float)
+        deadlines = np.zeros(numGroups, dtype=float)
+        for index, group in enumerate(groups):
+            pinnedTruck, availableTimes[index], deadlines[index] = LoadPlanner.describeGroup(
+                group, packagesByID, truckDepartures, addressCorrectionTimes)
+            if pinnedTruck is not None:
+                pins[index] = positionOfTruck[pinnedTruck]
+        if maxMassPerTruck is not None and masses.max() > maxMassPerTruck:
+            heaviest = groups[int(np.argmax(masses))]
+            raise ValueError("Packages " + str(sorted(heaviest)) + " weigh more than the " + str(maxMassPerTruck) +
+                             " kg a truck may carry")
+        limits = (sizes, masses, maxPkgsPerTruck, maxMassPerTruck)
+
+        # a group with a deadline is only met on time by a truck that leaves early enough to drive straight to its stop
+        # before the deadline
+        hubMinutes = RouteBuilder.getLegMinutes(distMatrix.subMatrix([0], locations)[0])
+        latestDepartures = np.where(deadlines >= Clock.convertTimeToInt("EOD"), math.inf, deadlines - hubMinutes)
+        groupTimes = (pins, availableTimes, latestDepartures, departures)
+
+        medoids = StopClusterer.seedMedoids(locations, groupTimes, limits, distMatrix)
+        assignment = None
+        for _ in range(StopClusterer.maxIterations):
+            assignment = StopClusterer.assignGroups(locations, groupTimes, limits, medoids, distMatrix)
+            newMedoids = StopClusterer.updateMedoids(locations, sizes, assignment, medoids, distMatrix)
+            if np.array_equal(newMedoids, medoids):
+                break
+            medoids = newMedoids
+
+        loads = [[] for _ in truckOrder]
+        for group, position in zip(groups, assignment.tolist()):
+            loads[position].extend(group)
+        return {truckID: sorted(loads[position]) for position, truckID in enumerate(truckOrder)}
+
+    # returns, for a block of groups, a boolean matrix with a row for each group and a column for each truck, marking
+    # the trucks the group may go on - those that leave after it is ready, and no later than the latest departure that
+    # can still meet its deadline. A group no truck can take in time may go on any truck that leaves after it is ready,
+    # and failing that only on the latest leaving truck, which will wait for it, so that no truck ahead of it in line
+    # is held up. A pinned group only ever goes on its own truck
+    #
+    # time and space complexity = O(b * t), where b is the number of groups in the block
+    @staticmethod
+    def getAllowedTrucks(rows, groupTimes):
+        pins, availableTimes, latestDepartures, departures = groupTimes
+        readyInTime = departures[None, :] >= availableTimes[rows, None]
+        allowed = readyInTime & (departures[None, :] <= latestDepartures[rows, None])
+        noTruck = ~allowed.any(axis=1)
+        allowed[noTruck] = readyInTime[noTruck]
+        allowed[~allowed.any(axis=1), -1] = True
+
+        pinned = np.flatnonzero(pins[rows] >= 0)
+        allowed[pinned] = False
+        allowed[pinned, pins[rows][pinned]] = True
+        return allowed
+
+    # picks the trucks to put to use and returns the starting medoid of each, as an array holding a location ID for
+    # every truck position, or -1 for a truck that is not used. The earliest leaving trucks are used, enough of them to
+    # carry every package with some to spare, along with every truck a group is pinned to and the first truck each
+    # group may use if none of the others will take it
+    #
+    # time complexity = O(g * t + k * l), where l is the number of distinct stops. Space complexity = O(b + l)
+    @staticmethod
+    def seedMedoids(locations, groupTimes, limits, distMatrix):
+        pins, _, _, departures = groupTimes
+        sizes, masses, maxPkgsPerTruck, maxMassPerTruck = limits
+        numTrucks = len(departures)
+        numNeeded = math.ceil(sizes.sum() / maxPkgsPerTruck)
+        if maxMassPerTruck is not None:
+            numNeeded = max(numNeeded, math.ceil(masses.sum() / maxMassPerTruck))
+        inUse = np.zeros(numTrucks, dtype=bool)
+        inUse[:min(numTrucks, math.ceil(numNeeded * (1 + StopClusterer.spareTruckFraction)))] = True
+        inUse[pins[pins >= 0]] = True
+
+        for rows in StopClusterer.getBlocks(len(locations), numTrucks):
+            allowed = StopClusterer.getAllowedTrucks(rows, groupTimes)
+            for row in np.flatnonzero(~allowed[:, inUse].any(axis=1)).tolist():
+                if not allowed[row, inUse].any():
+                    inUse[np.argmax(allowed[row])] = True
+
+        medoids = np.full(numTrucks, -1, dtype=np.int64)
+        stops = np.unique(locations)
+        nearestMedoid = distMatrix.subMatrix([0], stops)[0]
+        pinnedGroups = np.flatnonzero(pins >= 0)
+        for row in pinnedGroups.tolist():
+            if medoids[pins[row]] < 0:
+                medoids[pins[row]] = locations[row]
+                nearestMedoid = np.minimum(nearestMedoid, distMatrix.subMatrix([locations[row]], stops)[0])
+        for position in np.flatnonzero(inUse & (medoids < 0)).tolist():
+            farthest = int(stops[np.argmax(nearestMedoid)])
+            medoids[position] = farthest
+            nearestMedoid = np.minimum(nearestMedoid, distMatrix.subMatrix([farthest], stops)[0])
+        return medoids
+
+    # assigns every group to a truck, returning an array of the truck position of each group. Each group goes to the
+    # nearest medoid, among the trucks it may use, whose truck still has room - a truck that is not yet used is only
+    # taken once none of the trucks in use has room
+    #
+    # time complexity = O(g * k) vectorized, plus O(g * c) in Python, where c is numCandidates. Space complexity =
+    # O(g * c + b * k)
+    @staticmethod
+    def assignGroups(locations, groupTimes, limits, medoids, distMatrix):
+        pins = groupTimes[0]
+        sizes, masses, maxPkgsPerTruck, maxMassPerTruck = limits
+        numGroups = len(locations)
+        inUse = np.flatnonzero(medoids >= 0)
+        numCandidates = min(StopClusterer.numCandidates, len(inUse))
+
+        # the nearest trucks of each group are found a block of groups at a time, nearest first, with the trucks a group
+        # may not use counted as infinitely far away
+        candidates = np.empty((numGroups, numCandidates), dtype=np.int64)
+        candidateCosts = np.empty((numGroups, numCandidates), dtype=float)
+        numAllowed = np.empty(numGroups, dtype=np.int64)
+        for rows in StopClusterer.getBlocks(numGroups, len(inUse)):
+            allowed = StopClusterer.getAllowedTrucks(rows, groupTimes)[:, inUse]
+            numAllowed[rows] = allowed.sum(axis=1)
+            costs = distMatrix.subMatrix(locations[rows], medoids[inUse])
+            costs[~allowed] = math.inf
+            nearest = np.argpartition(costs, numCandidates - 1, axis=1)[:, :numCandidates]
+            nearestCosts = np.take_along_axis(costs, nearest, axis=1)
+            order = np.argsort(nearestCosts, axis=1, kind="stable")
+            candidates[rows] = inUse[np.take_along_axis(nearest, order, axis=1)]
+            candidateCosts[rows] = np.take_along_axis(nearestCosts, order, axis=1)
+
+        # pinned groups are placed first, then the groups that may use the fewest trucks - such as those with an early
+        # deadline - so they claim truck space before it runs out. Among the rest, the groups with the most to lose by
+        # missing their nearest truck - the extra distance to their second nearest - go first, larger groups ahead of
+        # smaller ones
+        if numCandidates > 1:
+            regret = candidateCosts[:, 1] - candidateCosts[:, 0]
+            regret[np.isinf(candidateCosts[:, 1])] = math.inf
+        else:
+            regret = np.full(numGroups, math.inf)
+        placementOrder = np.lexsort((np.arange(numGroups), -sizes, -regret, numAllowed, pins < 0))
+
+        # plain lists are used in the placement loop, since indexing them one element at a time is much faster than
+        # indexing NumPy arrays
+        numTrucks = len(medoids)
+        loadSizes = [0] * numTrucks
+        loadMasses = [0.0] * numTrucks
+        sizeList = sizes.tolist()
+        massList = masses.tolist()
+        candidateList = candidates.tolist()
+        costList = candidateCosts.tolist()
+        massLimit = maxMassPerTruck if maxMassPerTruck is not None else math.inf
+        assignment = np.empty(numGroups, dtype=np.int64)
+        for row in placementOrder.tolist():
+            size = sizeList[row]
+            mass = massList[row]
+            chosen = None
+            for position, cost in zip(candidateList[row], costList[row]):
+                if cost == math.inf:
+                    break
+                if loadSizes[position] + size <= maxPkgsPerTruck and loadMasses[position] + mass <= massLimit:
+                    chosen = position
+                    break
+            if chosen is None:
+                roomy = np.flatnonzero((np.array(loadSizes) + size <= maxPkgsPerTruck) &
+                                       (np.array(loadMasses) + mass <= massLimit))
+                chosen = StopClusterer.findNearestWithRoom(row, roomy, locations, groupTimes, medoids, distMatrix)
+            loadSizes[chosen] += size
+            loadMasses[chosen] += mass
+            assignment[row] = chosen
+        return assignment
+
+    # returns the truck position for a group whose nearest trucks are all full - the nearest of the trucks in use with
+    # room that it may go on, or else the first unused truck with room that it may go on. If none of the trucks it may
+    # go on has room, a group that is not pinned is left to the latest leaving truck with room, which will wait for it
+    # as in the load planner. A ValueError is raised if no truck has room
+    #
+    # time and space complexity = O(t)
+    @staticmethod
+    def findNearestWithRoom(row, roomy, locations, groupTimes, medoids, distMatrix):
+        allowed = StopClusterer.getAllowedTrucks(np.array([row]), groupTimes)[0]
+        allowedRoomy = roomy[allowed[roomy]]
+        inUse = allowedRoomy[medoids[allowedRoomy] >= 0]
+        if len(inUse):
+            return int(inUse[np.argmin(distMatrix.subMatrix([locations[row]], medoids[inUse])[0])])
+        if len(allowedRoomy):
+            return int(allowedRoomy[0])
+        if len(roomy) and groupTimes[0][row] < 0:
+            return int(roomy[-1])
+        raise ValueError("No truck has room for the packages at location " + str(locations[row]))
+
+    # returns the new medoid of every truck - the stop among its groups with the least total distance to its packages.
+    # A truck with no groups keeps its medoid, and an unused truck that was given groups becomes used
+    #
+    # time complexity = O(g log g + t * s^2), where s is the number of stops on a truck. Space complexity = O(g + s^2)
+    @staticmethod
+    def updateMedoids(locations, sizes, assignment, medoids, distMatrix):
+        newMedoids = medoids.copy()
+        byTruck = np.argsort(assignment, kind="stable")
+        positions, starts = np.unique(assignment[byTruck], return_index=True)
+        for position, members in zip(positions.tolist(), np.split(byTruck, starts[1:])):
+            stops, stopOfMember = np.unique(locations[members], return_inverse=True)
+            numPackages = np.bincount(stopOfMember, weights=sizes[members])
+            newMedoids[position] = stops[np.argmin(distMatrix.subMatrix(stops) @ numPackages)]
+        return newMedoids
+
+    # returns the slices that split the given number of groups into blocks, so that a block's distances to the given
+    # number of trucks hold no more than blockSize entries
+    #
+    # time and space complexity = O(g / b)
+    @staticmethod
+    def getBlocks(numGroups, numTrucks):
+        rowsPerBlock = max(1, StopClusterer.blockSize // max(1, numTrucks))
+        return [slice(start, min(start + rowsPerBlock, numGroups)) for start in range(0, numGroups, rowsPerBlock)]
@@ -1,36 +1,65 @@
+from PackageStore import PackageStore
+from Status import PackageStatus
+
+
+# returns a property that reads and writes one column of the package store at the package's row. Columns that record a
+# value not known until later in the day - a time or truck - give None in place of the store's "no value" marker
+def storeColumn(column, optional=False, convert=None):
+    def getValue(pkg):
+        value = getattr(pkg.store, column)[pkg.row]
+        if optional and value == PackageStore.noValue:
+            return None
+        return value if convert is None else convert(value)
+
+    def setValue(pkg, value):
+        if optional and value is None:
+            value = PackageStore.noValue
+        getattr(pkg.store, column)[pkg.row] = value
+
+    return property(getValue, setValue)
+
+
 # the package class is used to instantiate package objects that store the data relevant to a particular package.
 # these packages objects are placed in the master package hash table, where they can be easily located by their
 # ID numbers, and can be passed to other objects and manipulated further
+#
+# the package's data is kept in a row of a columnar package store - a package object is only a small view holding the
+# store and the row, and reading or setting one of its attributes reads or sets that row of the matching column
 class WGUPSPackage:
-    pkgID = int
-    nameOnAddress = str
-    address = str
-    city = str
-    state = str
-    zip = str
-    deliveryLocationID = int
-    deliveryDeadline = int
-    mass = int
-    notes = str
-    timeDelivered = int
-    timeLoaded = int
-    truckLoadedOnto = int
-    status = str
-
-    # no get / set methods needed for these - with exception to status, they do not change
-    def __init__(self, name, pid, adr, locID, cit, sta, zc, dd, kg, note):
-        self.nameOnAddress = name
-        self.pkgID = pid
-        self.address = adr
-        self.city = cit
-        self.state = sta
-        self.zip = zc
-        self.deliveryLocationID = locID
-        self.deliveryDeadline = dd
-        self.mass = kg
-        self.notes = note
-        self.status = "At Hub"
-
-    # set status used by dispatcher to assign proper status based on user time query
+    __slots__ = ("store", "row")
+
+    pkgID = storeColumn("pkgIDs")
+    nameOnAddress = storeColumn("names")
+    address = storeColumn("addresses")
+    city = storeColumn("cities")
+    state = storeColumn("states")
+    zip = storeColumn("zips")
+    deliveryLocationID = storeColumn("locationIDs")
+    deliveryDeadline = storeColumn("deadlines")
+    mass = storeColumn("masses")
+    notes = storeColumn("notes")
+    timeDelivered = storeColumn("timesDelivered", optional=True)
+    timeLoaded = storeColumn("timesLoaded", optional=True)
+    truckLoadedOnto = storeColumn("truckIDs", optional=True)
+
+    # the package's status code, from the Status module
+    status = storeColumn("statuses", convert=PackageStatus)
+
+    # the package's data is added as a new row of the given store, or of a store of its own if none is given
+    def __init__(self, name, pid, adr, locID, cit, sta, zc, dd, kg, note, store=None):
+        self.store = PackageStore() if store is None else store
+        self.row = self.store.addPackage(name, pid, adr, locID, cit, sta, zc, dd, kg, note)
+
+    # returns a view of a package already in the given store
+    #
+    # time and space complexity = Big O(1)
+    @staticmethod
+    def fromRow(store, row):
+        pkg = WGUPSPackage.__new__(WGUPSPackage)
+        pkg.store = store
+        pkg.row = row
+        return pkg
+
+    # set status used to assign a package its status code
     def setStatus(self, status):
         self.status = status
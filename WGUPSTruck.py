@@ -1,9 +1,13 @@
-from Clock import Clock
+from Status import PackageStatus
 
 
 # truck objects will be used to facilitate the delivery of their associated packages by accounting for drive time
 # between stops and updating package information upon delivery
 class WGUPSTruck:
+
+    # the average speed of every truck, in miles per hour
+    averageSpeed = 18
+
     truckID = int
     routeStartTime = int
 
@@ -11,7 +15,9 @@ class WGUPSTruck:
     # completion time
     currentTime = int
 
+    # the time the truck arrived back at the Hub, which is None until it has returned, and whether it has left the Hub
     timeOfReturn = int
+    hasDeparted = bool
 
     # original list of package objects is analyzed to find packages with same delivery location ID - and these are
     # grouped together and mapped in a dictionary
@@ -27,27 +33,88 @@ class WGUPSTruck:
     # in miles to the next stop. This is initialized by the RouteBuilder class before a truck begins its route
     route = []
 
+    # name of the algorithm that determined the truck's route, and the time in seconds it took to determine it. Both
+    # are recorded by the RouteBuilder
+    routeSolver = str
+    routeSolveTime = float
+
+    # the stops of a deadline-aware route that the truck is expected to reach after their deadline, as (location ID,
+    # deadline, expected arrival) in minutes since midnight. Recorded by the RouteBuilder
+    missedDeadlines = []
+
+    # prefix arrays recorded as the truck drives its route - the time of arrival at each stop, the cumulative miles
+    # driven on arrival, and the location ID of the stop. Index 0 is the departure from the Hub, and the last index is
+    # the return to the Hub. A truck held up on its route records the time it stopped and the time it moved on again
+    # as two stops at the same miles. Because the times and miles never decrease, the truck's position and mileage at
+    # any time can be found by binary search
+    stopTimes = []
+    stopMiles = []
+    stopLocations = []
+
     # reads index[1] of the current position in the truck route, adds that distance to the truck's cumulative miles,
     # moves the truck's clock forward by calculating the time taken to travel that distance, and then removes the prior
-    # location from the truck's route
+    # location from the truck's route. The arrival is recorded in the truck's prefix arrays
     #
     # time and space complexity = Big O(1)
     def driveToNextLocation(self):
         deliveryMiles = self.route[0][1]
         self.cumulativeMiles += deliveryMiles
-        self.currentTime += round((deliveryMiles / 18) * 60)
+        self.currentTime += self.getNextLegMinutes()
         self.route.pop(0)
+        self.stopTimes.append(self.currentTime)
+        self.stopMiles.append(self.cumulativeMiles)
+        self.stopLocations.append(self.route[0][0] if self.route else 0)
+
+    # the time in whole minutes the truck takes to drive the leg ahead of it, at an average speed of 18 mph
+    #
+    # time and space complexity = Big O(1)
+    def getNextLegMinutes(self):
+        return round((self.route[0][1] / WGUPSTruck.averageSpeed) * 60)
 
     # gets the packages to be delivered at the current stop from the truck's package-to-location map, marks them as
-    # delivered and records the time at which delivery took place, and removes those packages from the truck
+    # delivered and records the time at which delivery took place, and removes those packages from the truck. A stop
+    # may have no packages left, if its only package's address was corrected after the truck set off for it
     #
     # time and space complexity = Big O(n)
     def deliverAtLocation(self):
-        packagesAtCurrentStop = self.pkgLocationMap.get(self.route[0][0])
+        packagesAtCurrentStop = self.pkgLocationMap.pop(self.route[0][0], [])
         for i in packagesAtCurrentStop:
             i.timeDelivered = self.currentTime
-            i.status = "Delivered at " + Clock.convertIntToTime(i.timeDelivered)
-        self.pkgLocationMap.pop(self.route[0][0])
+            i.status = PackageStatus.DELIVERED
+
+    # moves a package on the truck from one delivery location to another in the truck's package-to-location map, after
+    # its address has been corrected. A location left with no packages is removed from the map
+    #
+    # time and space complexity = Big O(n)
+    def movePackage(self, pkg, fromLocationID, toLocationID):
+        packagesAtLocation = self.pkgLocationMap.get(fromLocationID, [])
+        if pkg in packagesAtLocation:
+            packagesAtLocation.remove(pkg)
+        if not packagesAtLocation:
+            self.pkgLocationMap.pop(fromLocationID, None)
+        self.pkgLocationMap.setdefault(toLocationID, []).append(pkg)
+
+    # holds the truck where it is on the leg it is driving for the given number of minutes from the given minute, such
+    # as while it is repaired after a breakdown. The point it stopped at is recorded as a stop with the miles it had
+    # driven by then, interpolated as for a status query, along with the location it was driving toward. A second stop
+    # at the same miles is recorded when it moves on, so its mileage stays flat while it is held. A truck already held
+    # up is held for longer from the time it was due to move on. The truck's clock is put back by the delay, so it
+    # reaches its next stop that much later
+    #
+    # time and space complexity = Big O(1)
+    def holdInPlace(self, minute, delayMinutes):
+        heldFrom = max(minute, self.stopTimes[-1])
+        if heldFrom > self.stopTimes[-1]:
+            legEndTime = self.currentTime + self.getNextLegMinutes()
+            legEndMiles = self.cumulativeMiles + self.route[0][1]
+            legFraction = (heldFrom - self.stopTimes[-1]) / (legEndTime - self.stopTimes[-1])
+            self.stopTimes.append(heldFrom)
+            self.stopMiles.append(self.stopMiles[-1] + legFraction * (legEndMiles - self.stopMiles[-1]))
+            self.stopLocations.append(self.route[1][0] if len(self.route) > 1 else 0)
+        self.stopTimes.append(heldFrom + delayMinutes)
+        self.stopMiles.append(self.stopMiles[-1])
+        self.stopLocations.append(self.stopLocations[-1])
+        self.currentTime += delayMinutes
 
     # when a truck completes its route and finishes driving back to the Hub, the time of return is marked, so it can
     # later be referenced by the dispatcher
@@ -62,6 +129,7 @@ class WGUPSTruck:
     #
     # time and space complexity = Big O(n)
     def beginRoute(self):
+        self.hasDeparted = True
         while True:
             self.driveToNextLocation()
             if not self.route:
@@ -69,6 +137,16 @@ class WGUPSTruck:
                 break
             self.deliverAtLocation()
 
+    # sets the time in minutes since midnight at which the truck leaves the Hub, for trucks whose start time is not
+    # known until a driver takes them
+    #
+    # time and space complexity = Big O(1)
+    def departHub(self, startTime):
+        self.routeStartTime = startTime
+        self.currentTime = startTime
+        self.stopTimes = [startTime]
+        self.hasDeparted = True
+
     # truck is initialized with its ID number, and the time in minutes since midnight at which it will depart the Hub.
     # truck status and mileage will be dynamically calculated by the dispatcher at time of user query
     def __init__(self, truckNumber, startTime):
@@ -76,4 +154,12 @@ class WGUPSTruck:
         self.routeStartTime = startTime
         self.currentTime = startTime
         self.cumulativeMiles = 0.0
+        self.timeOfReturn = None
+        self.hasDeparted = False
         self.routeLocations = []
+        self.pkgLocationMap = dict()
+        self.route = []
+        self.missedDeadlines = []
+        self.stopTimes = [startTime]
+        self.stopMiles = [0.0]
+        self.stopLocations = [0]
@@ -1,19 +1,18 @@
 # Lucas Ross
 # Student ID: 009968598
 #
-# Welcome to WGUPS time reporting service. This program consists of 10 code files and 3 csv data files, whose purpose
+# Welcome to WGUPS time reporting service. This program consists of 30 code files and 3 csv data files, whose purpose
 # and functionality are outlined below.
 #
 # Code Files:
 #
-#   1. main.py  -  The program entry point. Main's job is to initialize the environment by calling the Hub's
-#                  startup method, and to take in user input at the program menu. Once the data has been verified as
+#   1. main.py  -  The program entry point. Main's job is to initialize the environment by starting a delivery
+#                  day at the Hub, and to take in user input at the program menu. Once the data has been verified as
 #                  valid, the Dispatcher class is called to act upon it.
 #
-#   2. Hub.py  -   The Hub class contains methods for initializing the delivery environment. The Hub is responsible
-#                  for storing the data read from csv files, specifying the packages to be loaded onto each truck,
-#                  initializing, loading, and sending off trucks, and specifying the total number of packages to be
-#                  delivered.
+#   2. Hub.py  -   The Hub class holds the delivery environment that stays the same from day to day - the distance
+#                  and address data, read from their csv files on first use, and the settings for the fleet of
+#                  trucks.
 #
 #   3. Dispatcher.py   -   The dispatcher responds to user queries from the main program interface, and displays current
 #                           delivery environment statuses based on a given time
@@ -25,7 +24,8 @@
 #   5. RouteBuilder.py   -   The core algorithm of the program that determines the order in which a truck will visit
 #                            the locations on its route.
 #
-#   6. WGUPSPackage.py   -   Blueprint for package objects - which are simply containers for storing package data
+#   6. WGUPSPackage.py   -   Blueprint for package objects - which are lightweight views onto a package's row of the
+#                            package store
 #
 #   7. Clock.py   -   The clock converts between integer and human-readable string representations of time, and is also
 #                     responsible for asserting properly formatted time input from the user.
@@ -38,6 +38,62 @@
 #   10. LocationsInit.py   -   The locations initializer class has two responsibilities - to initialize the data
 #                              structure mapping an address to its location ID, and to initialize the master adjacency
 #                              matrix
+#   11. RouteImprover.py   -   Optional route improvement stage that shortens a truck's route with 2-opt and Or-opt
+#                              local search moves, within a time budget, after the route builder has determined it.
+#   12. LoadPlanner.py   -   Builds each truck's load automatically from the special notes on each package - truck
+#                            restrictions, packages that must be delivered together, delayed packages and wrong
+#                            addresses - while respecting the package limit per truck.
+#   13. DeliveryTimeline.py   -   Immutable, time-sorted record of every package and truck status change over the day,
+#                                 which the dispatcher searches to answer status queries without changing any package or
+#                                 truck.
+#   14. Status.py   -   Status codes for packages and trucks.
+#   15. BatchQuery.py   -   Non-interactive query mode - reads package status queries as JSON Lines from a file or
+#                           standard input, and writes one JSON result per query. Run with 'python main.py --batch
+#                           [FILE] [--output FILE]'.
+#   16. DeliverySimulator.py   -   Event-driven simulation of the delivery day. Trucks depart, arrive, deliver and
+#                                  return as events in a priority queue, so any number of trucks and drivers can be
+#                                  simulated in a single pass.
+#   17. DistanceMatrix.py   -   Compact distance matrix that stores only the lower triangle of distances as a packed
+#                               float64 array, cached in a binary DistanceTable.csv.packed file that is memory-mapped on
+#                               later startups and rebuilt whenever DistanceTable.csv changes.
+#   18. DeliveryDay.py   -   Holds the packages, truck loads, trucks and timeline of one delivery day at a Hub, and
+#                            simulates the day. Packages are read from their csv file on first use.
+#   19. PackageStore.py   -   Columnar store of package data - typed arrays for the numeric fields and status codes, and
+#                             interned strings for the text fields. Package objects are small views onto a row of the
+#                             store.
+#   20. ScenarioGenerator.py   -   Seeded generator of synthetic delivery scenarios of any size, written in the same csv
+#                                  formats as the real data files, along with the Hub settings for their trucks and
+#                                  drivers. Run with 'python ScenarioGenerator.py DIR --packages N [--seed S]'.
+#   21. Benchmark.py   -   Times each stage of the delivery day on generated scenarios of 10^2 to 10^5 packages, saves
+#                          the results as JSON, and reports stages slower than a saved baseline. Run with 'python
+#                          Benchmark.py [--sizes N ...] [--output FILE] [--baseline FILE]'.
+#   22. Instrumentation.py   -   Optional per-stage and per-truck instrumentation of the delivery day - wall time, call
+#                                counts and peak allocations, written as a JSON summary with optional cProfile and
+#                                tracemalloc dumps. Turned on with 'python main.py --instrument [MODES]' or the
+#                                WGUPS_INSTRUMENT environment variable.
+#   23. ParallelRouteBuilder.py   -   Builds a single truck's route, and builds every truck's route ahead of the
+#                                     simulation in a pool of worker processes that share the distance matrix through
+#                                     shared memory. Turned on with the Hub's routeBuildWorkers setting.
+#   24. RouteCache.py   -   LRU cache of truck routes keyed by a hash of the sorted stop set and the distance table
+#                           version, with hit, miss and eviction counts, optionally saved to a JSON file between runs.
+#   25. EventStream.py   -   Live event stream ingestion - applies time-ordered package-arrives, address-corrected,
+#                            truck-breakdown and new-package events from a file, a pipe or an asyncio queue to the day
+#                            as it is simulated, and refreshes only the changed parts of the timeline. Run with 'python
+#                            main.py --events FILE'.
+#   26. StatusServer.py   -   Asyncio status query server on a TCP or Unix socket, answering package-status, truck-
+#                             status and fleet-mileage queries as JSON lines from a read-only snapshot of the day that
+#                             is swapped in whole when a new day is published. Run with 'python main.py --serve
+#                             HOST:PORT' or '--serve unix:PATH'.
+#   27. StopClusterer.py   -   Clusters the stops on the distance matrix to assign packages to trucks within their
+#                              package and mass limits.
+#   28. ScenarioSweep.py   -   Runs the delivery day for every combination of a grid of what-if parameters on a process
+#                              pool, and reports the results in one table.
+#   29. DayArchive.py   -   Stores finished delivery days in a SQLite file with indexed status queries, so they can be
+#                           queried later without simulating them again. Save with 'python main.py --save-day FILE',
+#                           and answer queries from a saved day with '--load-day FILE'.
+#   30. FleetStatusMatrix.py   -   Writes the status of every package and the miles of every truck at every time step of
+#                                  the day, calculated by NumPy broadcasting, as csv or a directory of .npy columns for
+#                                  dashboards. Run with 'python main.py --status-matrix FILE'.
 #
 # Data Files:
 #
@@ -55,29 +111,41 @@
 #   Overall program time complexity is O(n^2), and overall space complexity is O(n). Please see class and
 #   method-specific comments for space-time complexities of individual code blocks.
 
+import argparse
+import asyncio
+import sqlite3
+import sys
+
 from Clock import Clock
 from Hub import Hub
+from DeliveryDay import DeliveryDay
 from Dispatcher import Dispatcher
+from BatchQuery import BatchQuery
+from EventStream import EventStream
+from StatusServer import StatusServer, StatusSnapshot
+from DayArchive import DayArchive, ArchivedDay
+from FleetStatusMatrix import FleetStatusMatrix
+from Instrumentation import Instrumentation
 
 
 # program entry
 #
 # since this method encompasses the entire life of the program, time complexity of this method is the time complexity
 # of the overall program - which is Big O(n^2). Space complexity is also that of the entire program - O(n).
-def runProgram():
+def runProgram(day):
 
-    # initialize the packages and locations by reading the csv files, load packages onto trucks,
-    # determine routes for trucks to take based on package delivery locations, and have trucks execute their routes
-    Hub.startDeliveryDay()
+    # if instrumentation is on, its summary covers starting the day, not the time spent waiting at the menu
+    Instrumentation.finish()
     programUIBorder = ""
     print("\n" + programUIBorder.ljust(100, '*') + "\nWelcome to WGUPS Daily Time Reports!")
 
     # main menu - program will loop to allow for multiple queries until user enters 'x' to break out
     while True:
         pkgToCheck = input("\nPlease enter the numeric ID of the package you would like to check (1-" +
-                           str(Hub.numTotalPackages) + ") or enter 'x' to exit: ")
-        while (not pkgToCheck.isdigit() or not 0 < int(pkgToCheck) < 41) and not pkgToCheck.casefold() == "x":
-            pkgToCheck = input("\nError - please input valid numeric ID 1-" + str(Hub.numTotalPackages) + ": ")
+                           str(day.numTotalPackages) + ") or enter 'x' to exit: ")
+        while (not pkgToCheck.isdigit() or int(pkgToCheck) not in day.masterPkgTable) and \
+                not pkgToCheck.casefold() == "x":
+            pkgToCheck = input("\nError - please input valid numeric ID 1-" + str(day.numTotalPackages) + ": ")
 
         if pkgToCheck.casefold() == "x":
             break
@@ -91,9 +159,186 @@ def runProgram():
         if userTime.casefold() == "x":
             break
         # upon receiving valid time input, the dispatcher is called to retrieve data for all packages at that time
-        Dispatcher.getStatus(pkgToCheck, userTime, Hub.masterPkgTable, Hub.trucks)
+        Dispatcher.getStatus(pkgToCheck, userTime, day.masterPkgTable, day.timeline)
 
     print("\nThank you for using our service!\n" + programUIBorder.ljust(100, '*'))
 
 
-runProgram()
+# batch program entry - the delivery day is simulated once, then every query in the input file (or standard input, if
+# the file is '-') is answered in order as a line of JSON written to the output file (or standard output)
+#
+# time complexity = O(n log n + q log n), where q is the number of queries. Space complexity = O(n)
+def runBatchProgram(day, inputPath, outputPath):
+    inputStream = sys.stdin if inputPath == "-" else open(inputPath, 'r')
+    outputStream = sys.stdout if outputPath == "-" else open(outputPath, 'w')
+    try:
+        with Instrumentation.stage("batchQueries"):
+            BatchQuery.runBatch(inputStream, outputStream, day.masterPkgTable, day.timeline)
+    finally:
+        if inputStream is not sys.stdin:
+            inputStream.close()
+        if outputStream is not sys.stdout:
+            outputStream.close()
+        Instrumentation.finish()
+
+
+# server program entry - the delivery day is simulated once, and a snapshot of it is then served to status queries on
+# the given address until the program is interrupted
+#
+# time complexity = O(n log n + q log n), where q is the number of queries served. Space complexity = O(n)
+def runServerProgram(day, address):
+    Instrumentation.finish()
+    snapshot = day.getStatusSnapshot() if isinstance(day, ArchivedDay) else StatusSnapshot.fromDay(day)
+    server = StatusServer(snapshot)
+    print("Serving status queries on " + address + " - press Ctrl+C to stop", file=sys.stderr)
+    try:
+        asyncio.run(server.serveForever(address))
+    except KeyboardInterrupt:
+        pass
+
+
+# status matrix program entry - the status of every package and the miles of every truck at every step of the given
+# number of minutes across the day are written to the output path, as csv (a file, or standard output if '-') or as a
+# directory of columns
+#
+# time complexity = O(m * (n + t log s)), where m is the number of time steps, space complexity = O(n + s)
+def runStatusMatrixProgram(day, outputPath, outputFormat, step):
+    try:
+        with Instrumentation.stage("statusMatrix"):
+            FleetStatusMatrix.export(day.timeline, outputPath, outputFormat, step)
+    finally:
+        Instrumentation.finish()
+
+
+# simulates the delivery day and returns it. If an events file is given (or '-', for standard input), the events in it
+# are applied to the day as it is simulated. The finished day is saved to the day archive at savePath, if one is given
+#
+# time complexity = O(n log n + v log n), where v is the number of events, space complexity = O(n)
+def startDay(eventsPath=None, savePath=None, dayLabel=None):
+    day = DeliveryDay(Hub(), addressCorrections=DeliveryDay.sampleAddressCorrections)
+    if eventsPath is None:
+        day.startDeliveryDay()
+    else:
+        eventStream = sys.stdin if eventsPath == "-" else open(eventsPath, 'r')
+        try:
+            with Instrumentation.stage("startDeliveryDay"):
+                day.openDeliveryDay()
+                with Instrumentation.stage("applyEvents"):
+                    EventStream.ingest(day, eventStream)
+                day.closeDeliveryDay()
+        finally:
+            if eventStream is not sys.stdin:
+                eventStream.close()
+
+    if savePath is not None:
+        with Instrumentation.stage("saveDay"), DayArchive(savePath) as archive:
+            dayLabel = archive.saveDay(day, dayLabel)
+        print("Saved the day as '" + dayLabel + "' in " + savePath, file=sys.stderr)
+    return day
+
+
+# opens a day saved in the day archive at loadPath, instead of simulating the day again
+#
+# time complexity = O(t log t), space complexity = O(t)
+def openSavedDay(loadPath, dayLabel=None):
+    with Instrumentation.stage("openSavedDay"):
+        return DayArchive(loadPath).openDay(dayLabel)
+
+
+# prints the days saved in the day archive at the given path
+def listSavedDays(archivePath):
+    with DayArchive(archivePath) as archive:
+        for savedDay in archive.listDays():
+            print(savedDay["label"].ljust(24) + "saved " + savedDay["savedAt"] + "   packages: " +
+                  str(savedDay["packages"]).ljust(8) + "trucks: " + str(savedDay["trucks"]).ljust(6) + "total miles: " +
+                  str(savedDay["totalMiles"]))
+
+
+# reads the command line options and starts the interactive menu, the batch query mode, the status server or the
+# status matrix export
+def main(args):
+    parser = argparse.ArgumentParser(description="WGUPS Daily Time Reports")
+    parser.add_argument("--batch", nargs="?", const="-", metavar="FILE",
+                        help="answer JSON Lines queries of the form {\"package_id\": 9, \"time\": \"10:25 AM\"} from "
+                             "FILE (or standard input if FILE is omitted or '-') instead of showing the menu")
+    parser.add_argument("--serve", default=None, metavar="ADDRESS",
+                        help="serve package-status, truck-status and fleet-mileage queries on ADDRESS - "
+                             "'HOST:PORT' for TCP or 'unix:PATH' for a Unix socket - instead of showing the menu")
+    parser.add_argument("--status-matrix", default=None, metavar="PATH",
+                        help="write the status of every package and the miles of every truck at every time step of "
+                             "the day to PATH instead of showing the menu - a csv file (or standard output if '-'), or "
+                             "a directory of .npy columns with --matrix-format columns")
+    parser.add_argument("--matrix-format", default="csv", choices=FleetStatusMatrix.formats,
+                        help="format the status matrix is written in (default: csv)")
+    parser.add_argument("--matrix-step", default=1, type=int, metavar="MINUTES",
+                        help="minutes between the time steps of the status matrix (default: 1)")
+    parser.add_argument("--output", default="-", metavar="FILE",
+                        help="file the batch results are written to (default: standard output)")
+    parser.add_argument("--instrument", nargs="?", const="summary", metavar="MODES",
+                        help="record the time spent in each stage of the day, as a comma separated list of modes: "
+                             "summary, memory (adds peak allocations and a tracemalloc dump), cprofile (adds a cProfile "
+                             "dump). Defaults to the " + Instrumentation.environmentVariable + " environment variable")
+    parser.add_argument("--instrument-output", default=None, metavar="FILE",
+                        help="file the instrumentation summary is written to (default: " +
+                             Instrumentation.defaultOutputPath + ")")
+    parser.add_argument("--events", default=None, metavar="FILE",
+                        help="apply the JSON Lines events in FILE (or standard input if '-') to the day as it is "
+                             "simulated - package-arrives, address-corrected, truck-breakdown and new-package")
+    parser.add_argument("--save-day", default=None, metavar="FILE",
+                        help="save the finished day to the SQLite day archive FILE, so it can be queried later without "
+                             "being simulated again")
+    parser.add_argument("--load-day", default=None, metavar="FILE",
+                        help="answer queries from a day saved in the SQLite day archive FILE instead of simulating "
+                             "the day")
+    parser.add_argument("--day-label", default=None, metavar="LABEL",
+                        help="the label a day is saved under or loaded from (default: today's date when saving, the "
+                             "most recently saved day when loading)")
+    parser.add_argument("--list-days", default=None, metavar="FILE",
+                        help="list the days saved in the SQLite day archive FILE and exit")
+    options = parser.parse_args(args)
+
+    try:
+        Instrumentation.configure(options.instrument, options.instrument_output)
+    except ValueError as error:
+        parser.error(str(error))
+    if sum(mode is not None for mode in (options.batch, options.serve, options.status_matrix)) > 1:
+        parser.error("--batch, --serve and --status-matrix cannot be used together")
+    if options.events == "-" and options.batch in (None, "-") and options.serve is None and \
+            options.status_matrix is None:
+        parser.error("--events - reads standard input, so it needs --batch FILE, --serve or --status-matrix")
+    if options.matrix_step < 1:
+        parser.error("--matrix-step must be at least 1 minute")
+    if options.status_matrix == "-" and options.matrix_format == "columns":
+        parser.error("--matrix-format columns writes a directory, so --status-matrix needs a PATH rather than '-'")
+    if options.serve is not None and not options.serve.startswith("unix:"):
+        try:
+            StatusServer.parseAddress(options.serve)
+        except ValueError as error:
+            parser.error(str(error))
+
+    if options.load_day is not None and (options.events is not None or options.save_day is not None):
+        parser.error("--load-day answers from a day already saved, so it cannot be used with --events or --save-day")
+
+    if options.list_days is not None:
+        listSavedDays(options.list_days)
+        return
+    if options.load_day is not None:
+        try:
+            day = openSavedDay(options.load_day, options.day_label)
+        except (ValueError, sqlite3.Error) as error:
+            parser.error(str(error))
+    else:
+        day = startDay(options.events, options.save_day, options.day_label)
+
+    if options.serve is not None:
+        runServerProgram(day, options.serve)
+    elif options.status_matrix is not None:
+        runStatusMatrixProgram(day, options.status_matrix, options.matrix_format, options.matrix_step)
+    elif options.batch is None:
+        runProgram(day)
+    else:
+        runBatchProgram(day, options.batch, options.output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
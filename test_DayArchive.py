@@ -0,0 +1,63 @@
+import unittest
+
+from DayArchive import DayArchive
+from DeliveryDay import DeliveryDay
+from Dispatcher import Dispatcher
+from Hub import Hub
+
+
+# checks that the sample day saved to an in-memory archive and opened again answers every query as the simulated day
+class DayArchiveTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.day = DeliveryDay(Hub(), addressCorrections=DeliveryDay.sampleAddressCorrections)
+        cls.day.startDeliveryDay()
+
+    def setUp(self):
+        self.archive = DayArchive(":memory:")
+        self.archive.saveDay(self.day, "sample")
+        self.archivedDay = self.archive.openDay("sample")
+
+    def tearDown(self):
+        self.archive.close()
+
+    @staticmethod
+    def describe(packages):
+        return [(pkg.pkgID, pkg.address, pkg.deliveryLocationID, pkg.notes, pkg.truckLoadedOnto, pkg.timeLoaded,
+                 pkg.timeDelivered, pkg.status) for pkg in packages]
+
+    def testPackagesRoundTrip(self):
+        self.assertEqual(len(self.archivedDay), len(self.day.masterPkgTable))
+        self.assertEqual(self.describe(self.archivedDay.getAllPackages()), self.describe(self.day.getAllPackages()))
+        self.assertIsNone(self.archivedDay.lookup(999))
+        self.assertNotIn(999, self.archivedDay)
+
+    def testIndexedQueries(self):
+        for truck in self.day.trucks:
+            loaded = [pkg for pkg in self.day.getAllPackages() if pkg.truckLoadedOnto == truck.truckID]
+            self.assertEqual(sorted(self.describe(self.archivedDay.lookupByTruck(truck.truckID))),
+                             sorted(self.describe(loaded)))
+        delivered = sorted((pkg for pkg in self.day.getAllPackages() if 540 <= pkg.timeDelivered < 600),
+                           key=lambda pkg: (pkg.timeDelivered, pkg.pkgID))
+        self.assertEqual(self.describe(self.archivedDay.lookupDeliveredBetween(540, 600)), self.describe(delivered))
+
+    def testStatusQueriesMatchSimulatedDay(self):
+        for minute in range(470, 760, 15):
+            for pkgID in self.day.masterPkgTable.getKeys():
+                self.assertEqual(Dispatcher.getPackageStatusText(self.archivedDay.timeline, pkgID, minute),
+                                 Dispatcher.getPackageStatusText(self.day.timeline, pkgID, minute))
+            for truck in self.day.trucks:
+                self.assertEqual(Dispatcher.getTruckStatusText(self.archivedDay.timeline, truck.truckID, minute),
+                                 Dispatcher.getTruckStatusText(self.day.timeline, truck.truckID, minute))
+
+    def testSavingAgainReplacesDay(self):
+        self.archive.saveDay(self.day, "sample")
+        self.assertEqual([stored["label"] for stored in self.archive.listDays()], ["sample"])
+        self.assertTrue(self.archive.deleteDay("sample"))
+        with self.assertRaises(ValueError):
+            self.archive.openDay("sample")
+
+
+if __name__ == "__main__":
+    unittest.main()
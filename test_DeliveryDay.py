@@ -0,0 +1,55 @@
+import unittest
+
+from DeliveryDay import DeliveryDay
+from Hub import Hub
+
+
+# checks of changes made to an open delivery day, on the sample data files and their known address correction
+class DeliveryDayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.day = DeliveryDay(Hub(), addressCorrections=DeliveryDay.sampleAddressCorrections)
+        self.day.openDeliveryDay()
+
+    def testArrivalDoesNotReleasePackageAwaitingCorrection(self):
+        with self.assertRaises(ValueError):
+            self.day.receivePackage(9, 560)
+        self.assertEqual(self.day.simulatedUntil, 0)
+
+        self.day.closeDeliveryDay()
+        pkg = self.day.masterPkgTable.lookup(9)
+        self.assertEqual(pkg.address, "410 S State St")
+        self.assertGreaterEqual(self.day.getTruck(pkg.truckLoadedOnto).routeStartTime, 620)
+
+    def testArrivalReleasesDelayedPackage(self):
+        self.day.receivePackage(6, 530)
+        self.day.closeDeliveryDay()
+        pkg = self.day.masterPkgTable.lookup(6)
+        self.assertLessEqual(self.day.getTruck(pkg.truckLoadedOnto).routeStartTime, 545)
+
+    def testCorrectionRevisesOnlyRestOfRoute(self):
+        unchangedDay = DeliveryDay(Hub(), addressCorrections=DeliveryDay.sampleAddressCorrections)
+        unchangedDay.startDeliveryDay()
+
+        # package 19 is the only package for its stop on truck 1, which at 8:50 AM has visited five stops
+        self.day.correctAddress(19, 530, "1060 Dalton Ave S")
+        self.day.closeDeliveryDay()
+        for truck, unchangedTruck in zip(self.day.trucks, unchangedDay.trucks):
+            if truck.truckID == 1:
+                visited = sum(1 for stopTime in unchangedTruck.stopTimes if stopTime <= 530)
+                self.assertEqual(truck.stopTimes[:visited], unchangedTruck.stopTimes[:visited])
+                self.assertEqual(truck.stopLocations[:visited], unchangedTruck.stopLocations[:visited])
+                self.assertNotIn(4, truck.stopLocations[visited:])
+                self.assertIn(1, truck.stopLocations[visited:])
+            else:
+                self.assertEqual(truck.stopTimes, unchangedTruck.stopTimes)
+                self.assertEqual(truck.stopLocations, unchangedTruck.stopLocations)
+                self.assertEqual(truck.stopMiles, unchangedTruck.stopMiles)
+
+        pkg = self.day.masterPkgTable.lookup(19)
+        self.assertEqual(pkg.deliveryLocationID, 1)
+        self.assertIsNotNone(pkg.timeDelivered)
+
+
+if __name__ == "__main__":
+    unittest.main()
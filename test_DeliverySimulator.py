@@ -0,0 +1,62 @@
+import unittest
+
+from DeliverySimulator import DeliverySimulator
+from WGUPSTruck import WGUPSTruck
+
+
+# checks of the delivery simulator on small made-up days. Every truck drives out 6 miles to a single stop and back,
+# which takes 20 minutes each way at the trucks' average speed
+class DeliverySimulatorTest(unittest.TestCase):
+
+    @staticmethod
+    def loadTruck(truck):
+        truck.route = [[0, 6.0], [1, 6.0]]
+
+    def addTrucks(self, simulator, *startTimes):
+        trucks = [WGUPSTruck(truckID, startTime) for truckID, startTime in enumerate(startTimes, 1)]
+        for truck in trucks:
+            simulator.addTruck(truck, truck.routeStartTime, [truck.truckID])
+        return trucks
+
+    def testThirdTruckWaitsForFirstDriverToReturn(self):
+        simulator = DeliverySimulator(2, self.loadTruck)
+        first, second, third = self.addTrucks(simulator, 480, 490, 480)
+        simulator.run()
+        self.assertEqual([truck.routeStartTime for truck in (first, second, third)], [480, 490, 520])
+        self.assertEqual(first.timeOfReturn, 520)
+        self.assertEqual(third.timeOfReturn, 560)
+
+    def testTruckWaitsForDelayedPackages(self):
+        simulator = DeliverySimulator(2, self.loadTruck)
+        first, second = self.addTrucks(simulator, 480, 480)
+        simulator.addPackageArrival(545, second.truckID)
+        self.assertTrue(simulator.isPackageDue(second.truckID))
+        simulator.run()
+        self.assertFalse(simulator.isPackageDue(second.truckID))
+        self.assertEqual(first.routeStartTime, 480)
+        self.assertEqual(second.routeStartTime, 545)
+
+    def testDelayedTruckAtHubLeavesWhenRepaired(self):
+        simulator = DeliverySimulator(1, self.loadTruck)
+        first, second = self.addTrucks(simulator, 480, 480)
+        simulator.run(490)
+        self.assertTrue(simulator.isTruckWaiting(second))
+        simulator.delayTruck(second, 490, 60)
+        simulator.run()
+        self.assertEqual(second.routeStartTime, 550)
+
+    def testDelayedTruckOnRouteHoldsItsMileage(self):
+        simulator = DeliverySimulator(1, self.loadTruck)
+        truck, = self.addTrucks(simulator, 480)
+        simulator.run(490)
+        simulator.delayTruck(truck, 490, 30)
+        simulator.run()
+        self.assertEqual(truck.stopTimes, [480, 490, 520, 530, 550])
+        self.assertEqual(truck.stopMiles, [0.0, 3.0, 3.0, 6.0, 12.0])
+        self.assertEqual(truck.timeOfReturn, 550)
+        with self.assertRaises(ValueError):
+            simulator.delayTruck(truck, 560, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from DeliveryDay import DeliveryDay
+from FleetStatusMatrix import FleetStatusMatrix
+from Hub import Hub
+
+
+# checks of the time steps the fleet status matrix is exported at, on the sample day
+class FleetStatusMatrixTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        day = DeliveryDay(Hub(), addressCorrections=DeliveryDay.sampleAddressCorrections)
+        day.startDeliveryDay()
+        cls.matrix = FleetStatusMatrix(day.timeline)
+
+    def testStepsIncludeLastMinute(self):
+        self.assertEqual(self.matrix.getMinutes(15, 480, 500).tolist(), [480, 495, 500])
+        self.assertEqual(self.matrix.getMinutes(10, 480, 500).tolist(), [480, 490, 500])
+        self.assertEqual(self.matrix.getMinutes(30, 480, 480).tolist(), [480])
+
+    def testDefaultStepsCoverWholeDay(self):
+        minutes = self.matrix.getMinutes(7)
+        self.assertEqual(minutes[0], self.matrix.firstMinute)
+        self.assertEqual(minutes[-1], self.matrix.lastMinute)
+
+
+if __name__ == "__main__":
+    unittest.main()
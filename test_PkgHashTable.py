@@ -0,0 +1,34 @@
+import unittest
+
+from PkgHashTable import PkgHashTable
+
+
+# regression checks for the package hash table. The empty and removed slot markers are negative numbers kept in the
+# same array as the keys, so a negative key must never be taken for one of them
+class PkgHashTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = PkgHashTable(4)
+        for key in (1, 2, 9):
+            self.table.insert(key, "package " + str(key))
+
+    def testMarkerKeysAreNotMembers(self):
+        for key in (PkgHashTable.emptySlot, PkgHashTable.removedSlot):
+            self.assertNotIn(key, self.table)
+            self.assertIsNone(self.table.lookup(key))
+            self.assertIsNone(self.table.remove(key))
+
+    def testMarkerKeysAreNotMembersAfterRemoval(self):
+        self.table.remove(2)
+        self.assertNotIn(PkgHashTable.removedSlot, self.table)
+        self.assertNotIn(2, self.table)
+        self.assertIn(9, self.table)
+        self.assertEqual(len(self.table), 2)
+
+    def testNegativeKeysCannotBeInserted(self):
+        with self.assertRaises(ValueError):
+            self.table.insert(-1, "package -1")
+
+
+if __name__ == "__main__":
+    unittest.main()
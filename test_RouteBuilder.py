@@ -0,0 +1,55 @@
+import math
+import unittest
+
+import numpy as np
+
+from RouteBuilder import RouteBuilder
+from WGUPSTruck import WGUPSTruck
+
+
+# checks of the deadline-aware routes. Stops are points on a grid measured in miles, with the Hub at location 0, and
+# every truck leaves the Hub at 8:00 AM - minute 480 - driving a mile every 3 1/3 minutes
+class RouteBuilderTest(unittest.TestCase):
+
+    @staticmethod
+    def makeTruck(points):
+        points = np.asarray(points, dtype=float)
+        distances = np.sqrt(((points[:, None] - points[None, :]) ** 2).sum(axis=-1))
+        truck = WGUPSTruck(1, 480)
+        truck.routeLocations = list(range(len(points)))
+        return truck, distances
+
+    @staticmethod
+    def getStops(truck):
+        return [stop[0] for stop in truck.route]
+
+    def testInsertionRouteMeetsDeadlineShortestRouteMisses(self):
+        truck, distances = self.makeTruck([(0, 0), (6, 0), (6, 6), (0, 6)])
+        RouteBuilder.solveRoute(truck, distances, 15)
+        self.assertEqual(self.getStops(truck), [0, 3, 2, 1])
+
+        truck, distances = self.makeTruck([(0, 0), (6, 0), (6, 6), (0, 6)])
+        RouteBuilder.solveDeadlineRoute(truck, distances, 15, {1: 500})
+        self.assertEqual(self.getStops(truck), [0, 1, 2, 3])
+        self.assertEqual(truck.routeSolver, RouteBuilder.deadlineSolver)
+        self.assertEqual(truck.missedDeadlines, [])
+
+    def testUnreachableStopIsPlacedLast(self):
+        truck, distances = self.makeTruck([(0, 0), (6, 0), (30, 0), (0, 6)])
+        legMinutes = RouteBuilder.getLegMinutes(distances)
+        deadlines = RouteBuilder.getStopDeadlines(truck, {1: 500, 2: 490, 3: 540})
+        RouteBuilder.determineDeadlineRoute(truck, distances, legMinutes, deadlines)
+        self.assertEqual(self.getStops(truck), [0, 1, 3, 2])
+        self.assertEqual(RouteBuilder.findMissedDeadlines(truck, legMinutes, deadlines), [(2, 490, 630)])
+
+    def testUpdateTimesIgnoresStopsAlreadyLate(self):
+        minutes = np.array([[0, 20, 40, 0], [20, 0, 20, 20], [40, 20, 0, 40], [0, 20, 40, 0]], dtype=float)
+        arrival = np.array([480.0, 0.0, 0.0, 0.0])
+        slack = np.full(4, math.inf)
+        RouteBuilder.updateTimes([0, 1, 2, 3], minutes, np.array([math.inf, 510, 515, math.inf]), arrival, slack)
+        self.assertEqual(arrival.tolist(), [480, 500, 520, 560])
+        self.assertEqual(slack.tolist(), [10, 10, math.inf, math.inf])
+
+
+if __name__ == "__main__":
+    unittest.main()